@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from src.blockchain import Block
+from src.codec import decode_block, decode_transaction, encode_block, encode_transaction
+from src.consensus.pow import ProofOfWork
+from src.consensus.vectorized import is_available as numpy_available
+from src.difficulty import difficulty_to_target
+
+# Phiên bản định dạng kết quả (tăng khi thay đổi cấu trúc JSON)
+BENCH_VERSION = 2
+
+# Thời điểm cố định của mọi template để kết quả lặp lại được
+BENCH_TIMESTAMP = datetime(2024, 1, 1)
+
+DEFAULT_TX_COUNTS = (0, 10, 100, 1000)
+
+# Target không hash nào đạt được, dùng để đo thông lượng thuần
+UNREACHABLE_TARGET = 0
+
+# Số địa chỉ ví khác nhau trong dữ liệu benchmark định dạng lưu trữ
+CODEC_ADDRESSES = 16
+
+# Thời gian chạy thử tối đa trước khi đo (giây), kể cả chờ pool tiến trình khởi động
+WARMUP_TIMEOUT = 60
+
+
+def make_transactions(count):
+    """
+    Tạo danh sách giao dịch cố định (giống nhau ở mọi lần chạy).
+
+    Args:
+        count: Số giao dịch
+
+    Returns:
+        list: Danh sách giao dịch
+    """
+    return [
+        {
+            "sender": f"bench-sender-{i}",
+            "receiver": f"bench-receiver-{i}",
+            "amount": i + 1,
+            "timestamp": str(BENCH_TIMESTAMP)
+        }
+        for i in range(count)
+    ]
+
+
+def make_template(tx_count, trial):
+    """
+    Tạo dữ liệu cố định cho một khối cần đào.
+
+    Mỗi lần thử dùng previous_hash khác nhau để thời gian tìm nonce phân bố
+    như khi đào thật, nhưng các lần chạy benchmark luôn cho cùng một nonce.
+
+    Args:
+        tx_count: Số giao dịch trong khối
+        trial: Số thứ tự lần thử
+
+    Returns:
+        tuple: (index, timestamp, transactions, previous_hash)
+    """
+    previous_hash = hashlib.sha256(f"tucoin-bench-{trial}".encode()).hexdigest()
+    return trial + 1, BENCH_TIMESTAMP, make_transactions(tx_count), previous_hash
+
+
+class PowStrategy:
+    """Đào bằng ProofOfWork.proof_of_work với số tiến trình và backend cho trước"""
+
+    def __init__(self, workers=1, backend="hashlib"):
+        self.consensus = ProofOfWork(workers=workers, backend=backend)
+
+    def _run(self, template, target, should_stop=None):
+        before = self.consensus.stats.hashes
+        start = time.perf_counter()
+        self.consensus.proof_of_work(*template, should_stop=should_stop, target=target)
+        return self.consensus.stats.hashes - before, time.perf_counter() - start
+
+    def throughput(self, template, duration):
+        deadline = time.perf_counter() + duration
+        return self._run(template, UNREACHABLE_TARGET, lambda: time.perf_counter() >= deadline)
+
+    def warm_up(self, template, duration):
+        """
+        Chạy thử trước khi đo. Pool tiến trình (spawn) có thể mất hơn một giây
+        để khởi động, nên thời gian chạy thử chỉ được tính từ lúc có kết quả
+        đầu tiên trả về, để các worker còn lại cũng kịp khởi động.
+        """
+        before = self.consensus.stats.hashes
+        start = time.perf_counter()
+        first_result = None
+
+        def should_stop():
+            nonlocal first_result
+            now = time.perf_counter()
+            if first_result is None and self.consensus.stats.hashes > before:
+                first_result = now
+            if now - start >= WARMUP_TIMEOUT:
+                return True
+            return first_result is not None and now - first_result >= duration
+
+        self._run(template, UNREACHABLE_TARGET, should_stop)
+
+    def solve(self, template, target):
+        return self._run(template, target)
+
+    def close(self):
+        self.consensus.close()
+
+
+def get_strategies(max_workers):
+    """
+    Liệt kê các chiến lược đào có thể chạy trên máy hiện tại.
+
+    Returns:
+        dict: {tên: hàm tạo chiến lược}
+    """
+    strategies = {
+        "pow-serial": lambda: PowStrategy(1, "hashlib")
+    }
+    if max_workers > 1:
+        strategies["pow-parallel"] = lambda: PowStrategy(max_workers, "hashlib")
+    if numpy_available():
+        strategies["numpy-serial"] = lambda: PowStrategy(1, "numpy")
+        if max_workers > 1:
+            strategies["numpy-parallel"] = lambda: PowStrategy(max_workers, "numpy")
+    return strategies
+
+
+def summarize(times, hashes):
+    """
+    Tóm tắt phân bố thời gian tìm nonce của các lần thử.
+
+    Returns:
+        dict: Thống kê thời gian (giây), số hash và hashrate trung bình
+    """
+    ordered = sorted(times)
+    p90 = ordered[min(len(ordered) - 1, int(round(0.9 * (len(ordered) - 1))))]
+    return {
+        "trials": len(times),
+        "mean": statistics.mean(times),
+        "median": statistics.median(times),
+        "p90": p90,
+        "min": ordered[0],
+        "max": ordered[-1],
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "hashes": hashes,
+        "hashes_per_sec": sum(hashes) / sum(times) if sum(times) > 0 else 0.0
+    }
+
+
+def bench_strategy(strategy, tx_counts, difficulty, trials, duration):
+    """
+    Đo thông lượng và thời gian tìm nonce của một chiến lược.
+
+    Returns:
+        tuple: (thông lượng theo số giao dịch, phân bố thời gian theo số giao dịch)
+    """
+    target = difficulty_to_target(difficulty)
+
+    # Chạy thử để khởi động tiến trình worker / bộ đệm trước khi đo
+    strategy.warm_up(make_template(tx_counts[0], 0), min(duration, 0.2))
+
+    throughput = {}
+    solutions = {}
+    for tx_count in tx_counts:
+        hashes, seconds = strategy.throughput(make_template(tx_count, 0), duration)
+        throughput[str(tx_count)] = hashes / seconds if seconds > 0 else 0.0
+
+        times = []
+        trial_hashes = []
+        for trial in range(trials):
+            hashes, seconds = strategy.solve(make_template(tx_count, trial), target)
+            times.append(seconds)
+            trial_hashes.append(hashes)
+        solutions[str(tx_count)] = summarize(times, trial_hashes)
+    return throughput, solutions
+
+
+def bench_scaling(max_workers, duration, backend="hashlib", tx_count=0):
+    """
+    Đo hashrate của ProofOfWork với 1..max_workers tiến trình.
+
+    Returns:
+        list: Kết quả theo số tiến trình (hashrate, tăng tốc, hiệu suất)
+    """
+    results = []
+    base_rate = None
+    template = make_template(tx_count, 0)
+    for workers in range(1, max_workers + 1):
+        strategy = PowStrategy(workers, backend)
+        try:
+            strategy.warm_up(template, min(duration, 0.2))
+            hashes, seconds = strategy.throughput(template, duration)
+        finally:
+            strategy.close()
+
+        rate = hashes / seconds if seconds > 0 else 0.0
+        if base_rate is None:
+            base_rate = rate or 1.0
+        results.append({
+            "workers": workers,
+            "hashes_per_sec": rate,
+            "speedup": rate / base_rate,
+            "efficiency": rate / base_rate / workers
+        })
+    return results
+
+
+def make_chain_data(block_count, tx_count):
+    """
+    Tạo dữ liệu chain cố định giống chain thật (địa chỉ ví, số tiền thực,
+    giao dịch thưởng) để đo định dạng lưu trữ.
+
+    Args:
+        block_count: Số khối
+        tx_count: Số giao dịch (ngoài giao dịch thưởng) trong mỗi khối
+
+    Returns:
+        list: Các khối dạng dict (Block.to_dict())
+    """
+    addresses = [hashlib.sha256(f"bench-address-{i}".encode()).hexdigest()[:40]
+                 for i in range(CODEC_ADDRESSES)]
+    target = difficulty_to_target(4)
+    blocks = []
+    previous_hash = "0"
+    for index in range(block_count):
+        moment = BENCH_TIMESTAMP + timedelta(seconds=10 * index)
+        transactions = [
+            {
+                "sender": addresses[(index + i) % CODEC_ADDRESSES],
+                "receiver": addresses[(index + i + 1) % CODEC_ADDRESSES],
+                "amount": (i + 1) * 1.25,
+                "timestamp": str(moment + timedelta(microseconds=i + 1))
+            }
+            for i in range(tx_count)
+        ]
+        transactions.append({"sender": "0", "receiver": addresses[index % CODEC_ADDRESSES],
+                             "amount": 100, "timestamp": str(moment)})
+        block = Block(index, moment, transactions, previous_hash, proof=index * 7919, target=target)
+        blocks.append(block.to_dict())
+        previous_hash = block.hash
+    return blocks
+
+
+def bench_codec(block_count, tx_count):
+    """
+    So sánh định dạng nhị phân (src.codec) với JSON: tốc độ mã hóa/giải mã
+    và kích thước, đồng thời kiểm tra mọi khối đều giải mã lại đúng.
+
+    Returns:
+        dict: Kích thước (byte), số khối/giây và kết quả kiểm tra round-trip
+    """
+    blocks = make_chain_data(block_count, tx_count)
+
+    def timed(func, items):
+        start = time.perf_counter()
+        results = [func(item) for item in items]
+        return results, time.perf_counter() - start
+
+    json_data, json_encode = timed(lambda block: json.dumps(block).encode(), blocks)
+    _, json_decode = timed(json.loads, json_data)
+    binary_data, binary_encode = timed(encode_block, blocks)
+    decoded, binary_decode = timed(decode_block, binary_data)
+
+    round_trip = decoded == blocks and all(
+        decode_transaction(encode_transaction(tx)) == tx
+        for block in blocks for tx in block["transactions"])
+
+    json_size = sum(len(data) for data in json_data)
+    binary_size = sum(len(data) for data in binary_data)
+    # Kích thước file theo định dạng của Blockchain.save_to_file
+    file_size = len(json.dumps({"chain": blocks, "pending_transactions": []}, indent=4).encode())
+
+    def rate(seconds):
+        return block_count / seconds if seconds > 0 else 0.0
+
+    return {
+        "blocks": block_count,
+        "transactions_per_block": tx_count + 1,
+        "round_trip": round_trip,
+        "size": {
+            "json_file": file_size,
+            "json": json_size,
+            "binary": binary_size,
+            "json_to_binary": json_size / binary_size if binary_size else 0.0
+        },
+        "blocks_per_sec": {
+            "json_encode": rate(json_encode),
+            "json_decode": rate(json_decode),
+            "binary_encode": rate(binary_encode),
+            "binary_decode": rate(binary_decode)
+        }
+    }
+
+
+def main():
+    """Chạy benchmark đào và in kết quả dạng JSON"""
+    parser = argparse.ArgumentParser(description='TuCoin mining benchmark')
+    parser.add_argument('--difficulty', type=float, default=4,
+                        help='Độ khó cố định khi đo thời gian tìm nonce (mặc định: 4)')
+    parser.add_argument('--trials', type=int, default=10,
+                        help='Số lần tìm nonce cho mỗi cấu hình (mặc định: 10)')
+    parser.add_argument('--duration', type=float, default=2.0,
+                        help='Thời gian đo thông lượng mỗi cấu hình (giây, mặc định: 2)')
+    parser.add_argument('--tx-counts', type=str, default=",".join(map(str, DEFAULT_TX_COUNTS)),
+                        help='Các số lượng giao dịch trong template, cách nhau bởi dấu phẩy')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1,
+                        help='Số tiến trình tối đa khi đo khả năng mở rộng (mặc định: số lõi CPU)')
+    parser.add_argument('--strategies', type=str,
+                        help='Chỉ chạy các chiến lược này (cách nhau bởi dấu phẩy)')
+    parser.add_argument('--no-scaling', action='store_true', help='Bỏ qua phần đo khả năng mở rộng')
+    parser.add_argument('--codec-blocks', type=int, default=1000,
+                        help='Số khối dùng khi đo định dạng lưu trữ (mặc định: 1000)')
+    parser.add_argument('--codec-txs', type=int, default=10,
+                        help='Số giao dịch mỗi khối khi đo định dạng lưu trữ (mặc định: 10)')
+    parser.add_argument('--no-codec', action='store_true', help='Bỏ qua phần đo định dạng lưu trữ')
+    parser.add_argument('--codec-only', action='store_true',
+                        help='Chỉ đo định dạng lưu trữ (bỏ qua phần đào)')
+    parser.add_argument('--output', type=str, help='Ghi kết quả JSON ra file thay vì stdout')
+    args = parser.parse_args()
+
+    tx_counts = [int(count) for count in args.tx_counts.split(",")]
+    strategies = get_strategies(args.max_workers)
+    if args.strategies:
+        selected = args.strategies.split(",")
+        unknown = [name for name in selected if name not in strategies]
+        if unknown:
+            parser.error(f"Chiến lược không khả dụng: {', '.join(unknown)} "
+                         f"(có thể chọn: {', '.join(strategies)})")
+        strategies = {name: strategies[name] for name in selected}
+
+    report = {
+        "version": BENCH_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "difficulty": args.difficulty,
+        "trials": args.trials,
+        "duration": args.duration,
+        "tx_counts": tx_counts,
+        "throughput": {},
+        "time_to_solution": {},
+        "scaling": None,
+        "codec": None
+    }
+
+    if args.codec_only:
+        strategies = {}
+        args.no_scaling = True
+
+    for name, factory in strategies.items():
+        print(f"Đang đo {name}...", file=sys.stderr)
+        strategy = factory()
+        try:
+            throughput, solutions = bench_strategy(strategy, tx_counts, args.difficulty,
+                                                   args.trials, args.duration)
+        finally:
+            strategy.close()
+        report["throughput"][name] = throughput
+        report["time_to_solution"][name] = solutions
+
+    if not args.no_scaling:
+        print(f"Đang đo khả năng mở rộng 1..{args.max_workers} tiến trình...", file=sys.stderr)
+        report["scaling"] = {
+            "backend": "hashlib",
+            "results": bench_scaling(args.max_workers, args.duration)
+        }
+
+    if not args.no_codec:
+        print("Đang đo định dạng lưu trữ (JSON và nhị phân)...", file=sys.stderr)
+        report["codec"] = bench_codec(args.codec_blocks, args.codec_txs)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"Đã ghi kết quả vào {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+
+
+def atomic_write(filename, data):
+    """
+    Ghi file theo kiểu nguyên tử: ghi ra file tạm, fsync rồi đổi tên, nên
+    file không bao giờ ở trạng thái ghi dở khi bị crash.
+
+    File tạm có tên riêng cho mỗi lần ghi (cùng thư mục với file đích để đổi
+    tên được), nên nhiều thread cùng ghi một file không ghi đè lên file tạm
+    của nhau.
+
+    Args:
+        filename: Đường dẫn file
+        data: Nội dung (bytes)
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_filename = tempfile.mkstemp(dir=directory, prefix=os.path.basename(filename) + ".",
+                                        suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp tạo file chỉ chủ sở hữu đọc được: giữ quyền của file cũ nếu có
+        if os.path.exists(filename):
+            shutil.copymode(filename, tmp_filename)
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+
+    # fsync thư mục để việc đổi tên cũng bền vững (không hỗ trợ trên Windows)
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(os.path.dirname(os.path.abspath(filename)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,151 @@
+import threading
+from collections import OrderedDict
+
+# Số khối đã xác thực được giữ lại mặc định
+DEFAULT_CACHE_SIZE = 10000
+
+
+def same_header(block, other):
+    """
+    Kiểm tra hai khối có cùng header (cùng các trường tham gia tính hash).
+
+    Args:
+        block: Khối thứ nhất
+        other: Khối thứ hai
+
+    Returns:
+        bool: True nếu header giống hệt nhau
+    """
+    return (block.index == other.index
+            and str(block.timestamp) == str(other.timestamp)
+            and block.merkle_root == other.merkle_root
+            and block.previous_hash == other.previous_hash
+            and block.proof == other.proof
+            and block.target == other.target)
+
+
+class ValidatedBlockCache:
+    """
+    Cache LRU các khối đã qua xác thực, theo hash của khối.
+
+    Một khối nằm trong cache nghĩa là hash của nó đã được tính lại và đúng,
+    và khối đã qua toàn bộ các bước xác thực. Khi gặp lại, chỉ cần so sánh
+    header với khối đã lưu thay vì băm lại. Với dữ liệu nhận từ node khác,
+    khối đã lưu được dùng thay cho dữ liệu nhận được, nên node khác không
+    thể gửi kèm nội dung giả với một hash đã biết.
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        """
+        Khởi tạo cache.
+
+        Args:
+            max_size: Số khối tối đa được giữ lại
+        """
+        self.max_size = max_size
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def __contains__(self, block_hash):
+        return block_hash in self._blocks
+
+    def get(self, block_hash):
+        """
+        Lấy khối đã xác thực theo hash.
+
+        Args:
+            block_hash: Hash của khối
+
+        Returns:
+            Block: Khối đã xác thực, None nếu không có trong cache
+        """
+        with self._lock:
+            block = self._blocks.get(block_hash)
+            if block is None:
+                self.misses += 1
+                return None
+            self._blocks.move_to_end(block_hash)
+            self.hits += 1
+            return block
+
+    def contains_block(self, block):
+        """
+        Kiểm tra một đối tượng Block đã được xác thực hay chưa.
+
+        Args:
+            block: Khối cần kiểm tra
+
+        Returns:
+            bool: True nếu khối (cùng header) đã có trong cache
+        """
+        cached = self.get(block.hash)
+        return cached is not None and (cached is block or same_header(cached, block))
+
+    def lookup(self, block_data):
+        """
+        Tìm khối đã xác thực tương ứng với dữ liệu khối (dạng dict) nhận được.
+
+        Các trường dùng khi kiểm tra liên kết (index, previous_hash, timestamp,
+        target) phải khớp với khối đã lưu.
+
+        Args:
+            block_data: Dữ liệu khối dạng dict
+
+        Returns:
+            Block: Khối đã xác thực dùng thay cho block_data, None nếu không có
+        """
+        cached = self.get(block_data["hash"])
+        if cached is None:
+            return None
+        target = block_data.get("target")
+        if (cached.index != block_data["index"]
+                or cached.previous_hash != block_data["previous_hash"]
+                or str(cached.timestamp) != str(block_data["timestamp"])
+                or (target is not None and cached.target != int(target, 16))):
+            return None
+        return cached
+
+    def add(self, block):
+        """
+        Đánh dấu một khối đã qua xác thực.
+
+        Args:
+            block: Khối đã xác thực
+        """
+        with self._lock:
+            self._blocks[block.hash] = block
+            self._blocks.move_to_end(block.hash)
+            while len(self._blocks) > self.max_size:
+                self._blocks.popitem(last=False)
+
+    def discard(self, block_hash):
+        """Xóa một khối khỏi cache (nếu có)"""
+        with self._lock:
+            self._blocks.pop(block_hash, None)
+
+    def clear(self):
+        """Xóa toàn bộ cache"""
+        with self._lock:
+            self._blocks.clear()
+
+    def stats(self):
+        """
+        Lấy số liệu của cache.
+
+        Returns:
+            dict: Kích thước, số lần trúng/trượt và tỷ lệ trúng
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._blocks),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -1,125 +1,530 @@
 import hashlib
+import itertools
 import json
+import threading
 import time
+from collections.abc import Sequence
 from datetime import datetime
 
+from src.atomic_file import atomic_write
+from src.block_cache import ValidatedBlockCache
+from src.difficulty import (Retargeter, block_timestamp, hash_meets_target, target_to_hex,
+                            timestamp_to_seconds)
+from src.merkle import compute_merkle_root
+
+# Tên các quy tắc xác thực khối (kết quả trả về của Blockchain.check_block)
+RULE_INDEX = "index"
+RULE_PREVIOUS_HASH = "previous_hash"
+RULE_HASH = "hash"
+RULE_TARGET = "target"
+RULE_PROOF = "proof"
+RULE_TIMESTAMP = "timestamp"
+RULE_MERKLE_ROOT = "merkle_root"
+RULE_TRANSACTIONS = "transactions"
+
+# Timestamp của khối không được vượt quá thời gian hiện tại quá 2 giờ
+MAX_FUTURE_DRIFT = 2 * 60 * 60
+
+# Số khối gần nhất dùng để tính median timestamp
+MEDIAN_TIME_SPAN = 11
+
+# Phần thưởng tối đa của một giao dịch thưởng (sender "0")
+MAX_BLOCK_REWARD = 100
+
+# Các trường bắt buộc của một giao dịch
+TRANSACTION_FIELDS = ("sender", "receiver", "amount", "timestamp")
+
+
+def header_hash(index, timestamp, merkle_root, previous_hash, proof, target):
+    """
+    Tính hash của header khối.
+    
+    Header có kích thước cố định: giao dịch chỉ tham gia qua Merkle root,
+    nên chi phí băm (đào và xác thực) không phụ thuộc số giao dịch.
+    
+    Returns:
+        str: Chuỗi hash của khối
+    """
+    header_string = json.dumps({
+        "index": index,
+        "timestamp": str(timestamp),
+        "merkle_root": merkle_root,
+        "previous_hash": previous_hash,
+        "proof": proof,
+        "target": target_to_hex(target)
+    }, sort_keys=True).encode()
+    
+    return hashlib.sha256(header_string).hexdigest()
+
+def median_time_past(history):
+    """
+    Tính median timestamp của MEDIAN_TIME_SPAN khối gần nhất.
+    
+    Args:
+        history: Các khối (hoặc header) liên tiếp kết thúc ở khối trước đó
+        
+    Returns:
+        float: Median timestamp (giây)
+    """
+    times = sorted(timestamp_to_seconds(block.timestamp) for block in history[-MEDIAN_TIME_SPAN:])
+    return times[len(times) // 2]
+
+
+def check_linkage(header, previous_block, history, now=None):
+    """
+    Kiểm tra các quy tắc rẻ của header: index, liên kết previous_hash và
+    timestamp hợp lý (lớn hơn median timestamp các khối gần nhất, không vượt
+    quá thời gian hiện tại MAX_FUTURE_DRIFT giây).
+    
+    Args:
+        header: Khối hoặc header cần kiểm tra
+        previous_block: Khối trước đó
+        history: Các khối liên tiếp kết thúc ở previous_block
+        now: Thời gian hiện tại (giây, mặc định: time.time())
+        
+    Returns:
+        str: Tên quy tắc bị vi phạm, None nếu hợp lệ
+    """
+    # Kiểm tra index
+    if header.index != previous_block.index + 1:
+        return RULE_INDEX
+    
+    # Kiểm tra liên kết với khối trước
+    if header.previous_hash != previous_block.hash:
+        return RULE_PREVIOUS_HASH
+    
+    # Kiểm tra timestamp: so sánh số giây tính từ epoch (UTC), không so sánh
+    # giờ địa phương, để node ở múi giờ khác không từ chối khối hợp lệ
+    try:
+        seconds = timestamp_to_seconds(header.timestamp)
+    except (TypeError, ValueError):
+        return RULE_TIMESTAMP
+    if seconds > (now if now is not None else time.time()) + MAX_FUTURE_DRIFT:
+        return RULE_TIMESTAMP
+    if history and seconds <= median_time_past(history):
+        return RULE_TIMESTAMP
+    
+    return None
+
+
+def check_transactions(transactions):
+    """
+    Kiểm tra cấu trúc danh sách giao dịch của một khối: đủ trường, số tiền
+    dương, không trùng lặp và phần thưởng không vượt quá MAX_BLOCK_REWARD.
+    
+    Args:
+        transactions: Danh sách giao dịch (dạng dict)
+        
+    Returns:
+        str: RULE_TRANSACTIONS nếu không hợp lệ, None nếu hợp lệ
+    """
+    if not isinstance(transactions, list):
+        return RULE_TRANSACTIONS
+    
+    seen = set()
+    for tx in transactions:
+        if not isinstance(tx, dict) or any(field not in tx for field in TRANSACTION_FIELDS):
+            return RULE_TRANSACTIONS
+        amount = tx["amount"]
+        if isinstance(amount, bool) or not isinstance(amount, (int, float)) or not amount > 0:
+            return RULE_TRANSACTIONS
+        if tx["sender"] == "0" and amount > MAX_BLOCK_REWARD:
+            return RULE_TRANSACTIONS
+        
+        key = json.dumps(tx, sort_keys=True)
+        if key in seen:
+            return RULE_TRANSACTIONS
+        seen.add(key)
+    
+    return None
+
+
 class Block:
-    def __init__(self, index, timestamp, transactions, previous_hash, proof=0):
+    # Target mặc định cho các khối không ghi target (khối genesis)
+    DEFAULT_TARGET = Retargeter().initial_target
+    
+    def __init__(self, index, timestamp, transactions, previous_hash, proof=0, target=None,
+                 merkle_root=None, block_hash=None):
         self.index = index
         self.timestamp = timestamp
         self.transactions = transactions
         self.previous_hash = previous_hash
         self.proof = proof
-        self.hash = self.calculate_hash()
+        self.target = target if target is not None else self.DEFAULT_TARGET
+        # Merkle root được tính một lần cho mỗi khối (hoặc lấy từ dữ liệu đã
+        # được xác thực)
+        self.merkle_root = merkle_root if merkle_root is not None else compute_merkle_root(transactions)
+        # Hash lấy từ dữ liệu (chưa xác thực) thì không băm lại ở đây: việc
+        # kiểm tra hash là của check_header, mỗi khối chỉ được băm một lần.
+        # Hash tự tính từ chính header thì check_header dùng lại luôn
+        self._hash_computed = block_hash is None
+        self.hash = self.calculate_hash() if block_hash is None else block_hash
     
-    def calculate_hash(self):
-        block_string = json.dumps({
-            "index": self.index,
-            "timestamp": str(self.timestamp),
-            "transactions": self.transactions,
-            "previous_hash": self.previous_hash,
-            "proof": self.proof
-        }, sort_keys=True).encode()
+    @classmethod
+    def from_dict(cls, block_data, verified=False):
+        """
+        Tạo đối tượng Block từ dict (dữ liệu từ file hoặc từ node khác).
         
-        return hashlib.sha256(block_string).hexdigest()
+        Args:
+            block_data: Dữ liệu khối dạng dict
+            verified: True nếu Merkle root trong dữ liệu đã được xác thực
+                      (dùng lại thay vì tính lại từ giao dịch)
+            
+        Returns:
+            Block: Khối với hash được lấy từ dữ liệu (chưa xác thực)
+        """
+        block = cls(
+            block_data["index"],
+            block_data["timestamp"],
+            block_data["transactions"],
+            block_data["previous_hash"],
+            block_data["proof"],
+            int(block_data["target"], 16) if "target" in block_data else None,
+            block_data.get("merkle_root") if verified else None,
+            block_data["hash"]
+        )
+        return block
+    
+    def calculate_hash(self):
+        return header_hash(self.index, self.timestamp, self.merkle_root,
+                           self.previous_hash, self.proof, self.target)
     
     def to_dict(self):
         return {
             "index": self.index,
             "timestamp": str(self.timestamp),
             "transactions": self.transactions,
+            "merkle_root": self.merkle_root,
             "previous_hash": self.previous_hash,
             "proof": self.proof,
+            "target": target_to_hex(self.target),
             "hash": self.hash
         }
 
+class ChainSnapshot(Sequence):
+    """
+    Ảnh chụp bất biến của chain và danh sách giao dịch chờ tại một thời điểm.
+    
+    Chain chỉ được thêm khối vào cuối, hoặc được thay bằng một danh sách mới
+    (reorg, tải lại); danh sách giao dịch chờ cũng vậy. Vì thế ảnh chụp chỉ
+    cần giữ tham chiếu tới các danh sách hiện tại cùng độ dài của chúng: các
+    khối được dùng chung, không sao chép, và nội dung ảnh chụp không đổi dù
+    các thread khác tiếp tục thêm khối hay giao dịch.
+    """
+    
+    def __init__(self, chain, pending_transactions, mempool_version):
+        self._chain = chain
+        self._length = len(chain)
+        self._pending = pending_transactions
+        self._pending_length = len(pending_transactions)
+        self.mempool_version = mempool_version
+    
+    def __len__(self):
+        return self._length
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._chain[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Chỉ số khối vượt quá độ dài chain")
+        return self._chain[index]
+    
+    def __iter__(self):
+        return itertools.islice(iter(self._chain), self._length)
+    
+    @property
+    def tip(self):
+        """Khối cuối của ảnh chụp"""
+        return self._chain[self._length - 1]
+    
+    @property
+    def pending_transactions(self):
+        """Bản sao danh sách giao dịch chờ tại thời điểm chụp"""
+        return self._pending[:self._pending_length]
+    
+    def is_current(self, chain):
+        """Kiểm tra chain có đúng là chain đã chụp và chưa thêm khối nào không"""
+        return chain is self._chain and len(chain) == self._length
+
+
 class Blockchain:
-    def __init__(self):
+    def __init__(self, retargeter=None, store=None, prune_depth=None):
         self.chain = []
         self.pending_transactions = []
         self.nodes = set()
         
+        # Khóa các thao tác ghi (thêm khối, giao dịch, thay chain) và snapshot();
+        # chỉ giữ trong thời gian cập nhật tham chiếu, không bao giờ khi ghi đĩa
+        self._lock = threading.RLock()
+        
+        # Tăng mỗi khi danh sách giao dịch chờ thay đổi (để làm mới block template)
+        self.mempool_version = 0
+        
+        # Điều chỉnh độ khó tự động theo thời gian tạo các khối gần nhất
+        self.retargeter = retargeter or Retargeter()
+        
+        # Các khối đã qua xác thực, tránh băm lại khi gặp lại cùng một khối
+        self.validated_blocks = ValidatedBlockCache()
+        
+        # Nơi lưu chain trên đĩa (ChainStore), None = dùng file JSON
+        self.store = store
+        
+        # Chế độ pruning: chỉ giữ đầy đủ giao dịch của prune_depth khối cuối
+        # (cần store), None = giữ toàn bộ chain
+        self.prune_depth = prune_depth
+        
         # Tạo khối genesis
         self.create_genesis_block()
     
     def create_genesis_block(self):
-        genesis_block = Block(0, datetime.now(), [], "0", 0)
-        genesis_block.hash = genesis_block.calculate_hash()
+        genesis_block = Block(0, block_timestamp(), [], "0", 0)
         self.chain.append(genesis_block)
     
     def get_last_block(self):
         return self.chain[-1]
     
-    def add_transaction(self, sender, receiver, amount):
-        self.pending_transactions.append({
+    @property
+    def pruned_height(self):
+        """Số khối đầu tiên chỉ còn header (không thể reorg qua các khối này)"""
+        return self.store.pruned_height if self.store is not None else 0
+    
+    def snapshot(self):
+        """
+        Lấy ảnh chụp nhất quán của chain và giao dịch chờ (chi phí O(1)).
+        
+        Returns:
+            ChainSnapshot: Ảnh chụp để đọc/ghi ra đĩa trong khi các thread
+                           khác tiếp tục cập nhật blockchain
+        """
+        with self._lock:
+            return ChainSnapshot(self.chain, self.pending_transactions, self.mempool_version)
+    
+    def create_transaction(self, sender, receiver, amount):
+        """
+        Tạo một giao dịch mới (chưa thêm vào danh sách chờ).
+        
+        Returns:
+            dict: Giao dịch vừa tạo
+        """
+        return {
             "sender": sender,
             "receiver": receiver,
             "amount": amount,
             "timestamp": str(datetime.now())
-        })
+        }
+    
+    def add_transaction(self, sender, receiver, amount):
+        self.add_pending_transaction(self.create_transaction(sender, receiver, amount))
         return self.get_last_block().index + 1
     
-    def proof_of_work(self, last_proof):
-        proof = 0
-        while self.valid_proof(last_proof, proof) is False:
-            proof += 1
-        return proof
-    
-    def valid_proof(self, last_proof, proof):
-        guess = f'{last_proof}{proof}'.encode()
-        guess_hash = hashlib.sha256(guess).hexdigest()
-        return guess_hash[:4] == "0000"
-    
-    def mine_block(self, miner_address):
-        # Thêm giao dịch thưởng cho người đào
-        self.add_transaction("0", miner_address, 100)
-        
-        last_block = self.get_last_block()
-        last_proof = last_block.proof
-        proof = self.proof_of_work(last_proof)
-        
-        previous_hash = last_block.hash
-        block = Block(
-            index=last_block.index + 1,
-            timestamp=datetime.now(),
-            transactions=self.pending_transactions,
-            previous_hash=previous_hash,
-            proof=proof
-        )
+    def add_pending_transaction(self, transaction):
+        """
+        Thêm một giao dịch (tạo tại node này hoặc nhận từ node khác) vào danh sách chờ.
         
-        # Reset danh sách giao dịch đang chờ
-        self.pending_transactions = []
-        self.chain.append(block)
-        return block
+        Args:
+            transaction: Giao dịch dạng dict
+            
+        Returns:
+            bool: True nếu giao dịch được thêm, False nếu đã tồn tại
+        """
+        with self._lock:
+            if transaction in self.pending_transactions:
+                return False
+            self.pending_transactions.append(transaction)
+            self.mempool_version += 1
+            return True
     
-    def is_valid_block(self, block, previous_block):
+    def add_block(self, block):
         """
-        Xác thực một khối mới.
+        Thêm một khối đã xác thực vào cuối chain và xóa các giao dịch
+        đã được xác nhận khỏi danh sách chờ.
+        
+        Khối được xác thực với đỉnh chain ngoài khóa, nên đỉnh được kiểm tra
+        lại cùng lúc với việc thêm: nếu chain đã đổi (khối khác từ mạng, reorg)
+        thì khối không được thêm.
+        
+        Args:
+            block: Khối cần thêm
+            
+        Returns:
+            bool: True nếu đã thêm, False nếu khối không còn nối tiếp đỉnh chain
+        """
+        with self._lock:
+            last_block = self.chain[-1]
+            if block.previous_hash != last_block.hash or block.index != len(self.chain):
+                return False
+            self.chain.append(block)
+            self.pending_transactions = [
+                tx for tx in self.pending_transactions if tx not in block.transactions
+            ]
+            self.mempool_version += 1
+            return True
+    
+    def replace_chain(self, new_blocks, height=0):
+        """
+        Thay các khối từ độ cao height trở đi bằng new_blocks (khi đồng bộ với
+        chain dài hơn). Phần đầu chung không bị sao chép hay giải mã lại: nếu
+        chain chỉ dài thêm thì các khối mới được nối vào chain hiện tại.
+        
+        Args:
+            new_blocks: Danh sách Block đã xác thực, nối tiếp khối height - 1
+            height: Độ dài phần đầu chung với chain hiện tại (0 = thay toàn bộ)
+            
+        Returns:
+            bool: True nếu đã thay, False nếu chain đã thay đổi trong lúc xác
+                  thực (không còn khớp tại height hoặc không còn ngắn hơn)
+        """
+        with self._lock:
+            chain = self.chain
+            if height > len(chain) or height + len(new_blocks) <= len(chain):
+                return False
+            if height and new_blocks[0].previous_hash != chain[height - 1].hash:
+                return False
+            
+            # Các khối bị bỏ do reorg không còn được coi là đã xác thực
+            for index in range(height, len(chain)):
+                self.validated_blocks.discard(chain[index].hash)
+            
+            if height < len(chain):
+                # Reorg: tạo chain mới (ảnh chụp cũ vẫn đọc chain cũ); chain đọc
+                # từ store giữ nguyên phần đầu trong store thay vì sao chép
+                chain = chain.fork(height) if hasattr(chain, "fork") else chain[:height]
+            for block in new_blocks:
+                chain.append(block)
+            self.chain = chain
+            return True
+    
+    def get_history(self, block):
+        """
+        Lấy các khối gần nhất (kết thúc ở block) cần để tính target tiếp theo.
+        
+        Args:
+            block: Khối cuối của lịch sử (phải nằm trong chain)
+            
+        Returns:
+            list: Tối đa window + 1 khối liên tiếp
+        """
+        end = block.index + 1
+        # So sánh theo hash: chain đọc từ store có thể giải mã lại cùng một khối
+        if end > len(self.chain) or self.chain[block.index].hash != block.hash:
+            return [block]
+        return self.chain[max(0, end - self.retargeter.window - 1):end]
+    
+    def get_next_target(self, previous_block=None):
+        """
+        Tính target yêu cầu cho khối nối tiếp previous_block.
+        
+        Args:
+            previous_block: Khối trước đó (mặc định là khối cuối chain)
+            
+        Returns:
+            int: Target của khối tiếp theo
+        """
+        if previous_block is None:
+            previous_block = self.get_last_block()
+        return self.retargeter.next_target(self.get_history(previous_block))
+    
+    def check_header(self, header, previous_block, consensus=None):
+        """
+        Xác thực header của khối (giai đoạn 1): index, liên kết, timestamp,
+        hash của header và proof của cơ chế đồng thuận. Không cần đến danh
+        sách giao dịch nên có thể loại bỏ khối rác trước khi xử lý phần thân.
+        
+        Header được serialize và băm đúng một lần (hoặc không lần nào nếu
+        khối đã có trong cache); kết quả băm được dùng cho cả việc kiểm tra
+        hash và kiểm tra proof của cơ chế đồng thuận.
+        
+        Args:
+            header: Khối hoặc header (có index, timestamp, merkle_root,
+                    previous_hash, proof, target, hash)
+            previous_block: Khối trước đó
+            consensus: Cơ chế đồng thuận kiểm tra proof (mặc định: Proof of
+                       Work theo target, xem check_work)
+            
+        Returns:
+            str: Tên quy tắc bị vi phạm (RULE_*), None nếu header hợp lệ
+        """
+        rule = check_linkage(header, previous_block, self.get_history(previous_block))
+        if rule is not None:
+            return rule
+        
+        # Kiểm tra hash của header; khối đã xác thực trước đó (cùng header)
+        # hoặc có hash vừa được tính từ chính header (khối tạo tại node này)
+        # không cần băm lại. Dữ liệu cũ không có Merkle root thì hash được
+        # kiểm tra ở giai đoạn thân khối
+        if (header.merkle_root is not None and not getattr(header, "_hash_computed", False)
+                and not self.validated_blocks.contains_block(header)):
+            if header_hash(header.index, header.timestamp, header.merkle_root,
+                           header.previous_hash, header.proof, header.target) != header.hash:
+                return RULE_HASH
+        
+        # Kiểm tra proof theo cơ chế đồng thuận, dùng lại hash vừa kiểm tra
+        if consensus is None:
+            return self.check_work(header, header.hash, previous_block)
+        return consensus.check_proof(header, header.hash, self, previous_block)
+    
+    def check_block(self, block, previous_block, consensus=None):
+        """
+        Xác thực một khối theo từng quy tắc và cho biết quy tắc bị vi phạm.
+        
+        Gồm giai đoạn header (check_header) và giai đoạn thân khối (kiểm tra
+        các giao dịch, xem check_transactions).
         
         Args:
             block: Khối cần xác thực
             previous_block: Khối trước đó
+            consensus: Cơ chế đồng thuận kiểm tra proof (mặc định: Proof of Work)
             
         Returns:
-            bool: True nếu khối hợp lệ, False nếu không
+            str: Tên quy tắc bị vi phạm (RULE_*), None nếu khối hợp lệ
         """
-        # Kiểm tra index
-        if block.index != previous_block.index + 1:
-            return False
+        rule = self.check_header(block, previous_block, consensus)
+        if rule is not None:
+            return rule
         
-        # Kiểm tra liên kết với khối trước
-        if block.previous_hash != previous_block.hash:
-            return False
+        rule = check_transactions(block.transactions)
+        if rule is not None:
+            return rule
         
-        # Kiểm tra hash của khối
-        if block.hash != block.calculate_hash():
-            return False
+        self.validated_blocks.add(block)
+        return None
+    
+    def check_work(self, block, block_hash, previous_block):
+        """
+        Kiểm tra proof of work của khối.
         
-        # Kiểm tra proof of work
-        if not self.valid_proof(previous_block.proof, block.proof):
-            return False
+        Args:
+            block: Khối cần kiểm tra
+            block_hash: Hash đã tính của khối
+            previous_block: Khối trước đó
+            
+        Returns:
+            str: Tên quy tắc bị vi phạm, None nếu hợp lệ
+        """
+        # Kiểm tra target được ghi trong khối đúng với kết quả điều chỉnh độ khó
+        if block.target != self.get_next_target(previous_block):
+            return RULE_TARGET
         
-        return True
+        # Kiểm tra proof of work: hash phải không lớn hơn target
+        if not hash_meets_target(block_hash, block.target):
+            return RULE_PROOF
+        
+        return None
+    
+    def is_valid_block(self, block, previous_block):
+        """
+        Xác thực một khối mới.
+        
+        Args:
+            block: Khối cần xác thực
+            previous_block: Khối trước đó
+            
+        Returns:
+            bool: True nếu khối hợp lệ, False nếu không
+        """
+        return self.check_block(block, previous_block) is None
     
     def is_chain_valid(self):
         for i in range(1, len(self.chain)):
@@ -131,33 +536,80 @@ class Blockchain:
         
         return True
     
-    def save_to_file(self, filename="data/blockchain.json"):
+    def save_to_file(self, filename="data/blockchain.json", snapshot=None):
+        if snapshot is None:
+            snapshot = self.snapshot()
         data = {
-            "chain": [block.to_dict() for block in self.chain],
-            "pending_transactions": self.pending_transactions
+            "chain": [block.to_dict() for block in snapshot],
+            "pending_transactions": snapshot.pending_transactions
         }
         
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=4)
+        atomic_write(filename, json.dumps(data, indent=4).encode())
     
     def load_from_file(self, filename="data/blockchain.json"):
         try:
             with open(filename, 'r') as f:
                 data = json.load(f)
                 
-            self.chain = []
-            for block_data in data["chain"]:
-                block = Block(
-                    block_data["index"],
-                    block_data["timestamp"],
-                    block_data["transactions"],
-                    block_data["previous_hash"],
-                    block_data["proof"]
-                )
-                block.hash = block_data["hash"]
-                self.chain.append(block)
-                
-            self.pending_transactions = data["pending_transactions"]
+            chain = [Block.from_dict(block_data) for block_data in data["chain"]]
+            with self._lock:
+                self.chain = chain
+                self.validated_blocks.clear()
+                self.pending_transactions = data["pending_transactions"]
+                self.mempool_version += 1
             return True
         except (FileNotFoundError, json.JSONDecodeError):
             return False
+    
+    def save(self, snapshot=None):
+        """
+        Lưu blockchain. Với store, chỉ các khối mới (hoặc thay đổi sau reorg)
+        được ghi; nếu không có store thì ghi lại toàn bộ file JSON.
+        
+        Việc ghi dùng một ảnh chụp của chain nên không cần khóa blockchain:
+        các thread đào và mạng vẫn thêm khối bình thường trong lúc ghi.
+        
+        Args:
+            snapshot: Ảnh chụp cần lưu (mặc định: chụp trạng thái hiện tại)
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+        if self.store is None:
+            self.save_to_file(snapshot=snapshot)
+            return
+        written = self.store.sync(snapshot, snapshot.pending_transactions)
+        if written:
+            print(f"Đã ghi {written} khối mới vào {type(self.store).__name__}")
+        
+        if self.prune_depth:
+            pruned = self.store.prune(self.prune_depth)
+            if pruned:
+                print(f"Đã pruning {pruned} khối (chỉ giữ header trước khối {self.store.pruned_height})")
+        
+        # Các khối đã lưu được đọc lại từ store khi cần, nên chain trong bộ nhớ
+        # (ví dụ chain vừa nhận từ node khác) không lớn dần theo độ dài chain
+        with self._lock:
+            if written and snapshot.is_current(self.chain) and self.store.height == len(snapshot):
+                self.chain = self.store.open_chain()
+    
+    def load(self):
+        """
+        Tải blockchain từ store (hoặc file JSON nếu không có store).
+        
+        Returns:
+            bool: True nếu tải thành công
+        """
+        if self.store is None:
+            return self.load_from_file()
+        if not self.store.height:
+            return False
+        
+        # Các khối chỉ được đọc và giải mã từ store khi được truy cập
+        chain = self.store.open_chain()
+        pending_transactions = self.store.load_pending()
+        with self._lock:
+            self.chain = chain
+            self.validated_blocks.clear()
+            self.pending_transactions = pending_transactions
+            self.mempool_version += 1
+        return True
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import struct
+import zlib
+
+from src.codec import decode_block, encode_block
+from src.validation import ChainValidator, block_header
+
+# Đầu file bootstrap: magic, phiên bản định dạng, số khối
+BOOTSTRAP_MAGIC = b"TUCOINBS"
+BOOTSTRAP_VERSION = 1
+FILE_HEADER = struct.Struct(">8sBQ")
+
+# Mỗi khối là một bản ghi: độ dài rồi dữ liệu nhị phân (src/codec.py)
+RECORD_LENGTH = struct.Struct(">I")
+
+# Mức nén zlib khi xuất
+COMPRESS_LEVEL = 6
+
+# Kích thước mỗi lần đọc file (byte)
+READ_SIZE = 1 << 20
+
+# Số khối được xác thực và ghi vào store trong mỗi lô khi nhập
+IMPORT_BATCH = 5000
+
+
+def export_bootstrap(store, filename, on_progress=None, progress_interval=IMPORT_BATCH):
+    """
+    Xuất toàn bộ chain trong store ra file bootstrap (dùng để dựng node mới).
+
+    Định dạng: header (magic, phiên bản, số khối), sau đó là luồng zlib chứa
+    các bản ghi (độ dài + khối mã hóa nhị phân), cuối file là SHA-256 của
+    toàn bộ các bản ghi chưa nén. File được ghi ra file tạm rồi mới đổi tên.
+
+    Args:
+        store: ChainStore chứa chain
+        filename: Đường dẫn file bootstrap
+        on_progress: Hàm nhận số khối đã xuất (tùy chọn)
+        progress_interval: Số khối giữa hai lần gọi on_progress
+
+    Returns:
+        int: Số khối đã xuất
+
+    Raises:
+        ValueError: Store đã pruning (không còn đủ giao dịch của các khối cũ)
+    """
+    if store.pruned_height:
+        raise ValueError(f"Các khối trước khối {store.pruned_height} đã bị pruning, "
+                         f"không thể xuất chain đầy đủ")
+
+    tmp_filename = filename + ".tmp"
+    digest = hashlib.sha256()
+    compressor = zlib.compressobj(COMPRESS_LEVEL)
+    count = 0
+    try:
+        with open(tmp_filename, "wb") as f:
+            f.write(FILE_HEADER.pack(BOOTSTRAP_MAGIC, BOOTSTRAP_VERSION, store.height))
+            for block_data in store.iter_blocks():
+                payload = encode_block(block_data)
+                record = RECORD_LENGTH.pack(len(payload)) + payload
+                digest.update(record)
+                f.write(compressor.compress(record))
+                count += 1
+                if on_progress and count % progress_interval == 0:
+                    on_progress(count)
+            f.write(compressor.flush())
+            f.write(digest.digest())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+    return count
+
+
+def read_bootstrap_header(f):
+    """
+    Đọc và kiểm tra header của file bootstrap.
+
+    Args:
+        f: File đã mở ở chế độ nhị phân (đang ở đầu file)
+
+    Returns:
+        int: Số khối trong file
+
+    Raises:
+        ValueError: Không phải file bootstrap hoặc khác phiên bản
+    """
+    header = f.read(FILE_HEADER.size)
+    if len(header) < FILE_HEADER.size:
+        raise ValueError("File bootstrap bị cắt cụt")
+    magic, version, count = FILE_HEADER.unpack(header)
+    if magic != BOOTSTRAP_MAGIC:
+        raise ValueError("Không phải file bootstrap TuCoin")
+    if version != BOOTSTRAP_VERSION:
+        raise ValueError(f"Phiên bản file bootstrap không được hỗ trợ: {version}")
+    return count
+
+
+def iter_bootstrap(filename):
+    """
+    Đọc lần lượt các khối trong file bootstrap (giải nén theo từng đoạn, không
+    nạp cả file vào bộ nhớ).
+
+    SHA-256 và số khối được kiểm tra sau khi đọc hết, trước khi generator kết
+    thúc: người dùng phải coi các khối đã nhận là chưa đáng tin cho đến lúc đó.
+
+    Args:
+        filename: Đường dẫn file bootstrap
+
+    Yields:
+        dict: Dữ liệu từng khối
+
+    Raises:
+        ValueError: File hỏng, bị cắt cụt hoặc sai checksum
+    """
+    with open(filename, "rb") as f:
+        count = read_bootstrap_header(f)
+        decompressor = zlib.decompressobj()
+        digest = hashlib.sha256()
+        buffer = bytearray()
+        read = 0
+
+        while not decompressor.eof:
+            chunk = f.read(READ_SIZE)
+            if not chunk:
+                raise ValueError("File bootstrap bị cắt cụt")
+            try:
+                buffer += decompressor.decompress(chunk)
+            except zlib.error as e:
+                raise ValueError(f"Dữ liệu nén bị hỏng: {e}")
+
+            # Lấy ra các bản ghi đã đầy đủ, phần còn lại chờ đoạn tiếp theo
+            position = 0
+            while len(buffer) - position >= RECORD_LENGTH.size:
+                (length,) = RECORD_LENGTH.unpack_from(buffer, position)
+                end = position + RECORD_LENGTH.size + length
+                if end > len(buffer):
+                    break
+                record = bytes(buffer[position:end])
+                digest.update(record)
+                yield decode_block(record[RECORD_LENGTH.size:])
+                read += 1
+                position = end
+            del buffer[:position]
+
+        if buffer:
+            raise ValueError("Bản ghi cuối của file bootstrap bị cắt cụt")
+        if decompressor.unused_data + f.read() != digest.digest():
+            raise ValueError("Sai checksum SHA-256 của file bootstrap")
+        if read != count:
+            raise ValueError(f"File bootstrap có {read} khối, header ghi {count} khối")
+
+
+def import_bootstrap(store, filename, retargeter, validator=None, on_progress=None,
+                     batch_size=IMPORT_BATCH):
+    """
+    Nhập chain từ file bootstrap vào store.
+
+    Các khối được xử lý theo lô: header của cả lô được kiểm tra tuần tự, thân
+    khối được kiểm tra song song trên pool tiến trình của ChainValidator, rồi
+    cả lô được ghi bằng store.import_blocks (một lần ghi bền vững mỗi lô).
+    Các khối đã có trong store (cùng hash) được bỏ qua nên có thể nhập tiếp
+    sau khi bị ngắt. Nếu file hoặc khối nào không hợp lệ, store được cắt về
+    độ cao trước khi nhập.
+
+    Args:
+        store: ChainStore nhận các khối
+        filename: Đường dẫn file bootstrap
+        retargeter: Bộ điều chỉnh độ khó dùng để kiểm tra target
+        validator: ChainValidator dùng để xác thực (mặc định: tạo mới rồi đóng)
+        on_progress: Hàm nhận (số khối đã đọc, tổng số khối trong file)
+        batch_size: Số khối mỗi lô
+
+    Returns:
+        int: Số khối đã thêm vào store
+
+    Raises:
+        ValueError: File hỏng, khác chain đang lưu hoặc có khối không hợp lệ
+    """
+    with open(filename, "rb") as f:
+        total = read_bootstrap_header(f)
+
+    start_height = store.height
+    own_validator = validator is None
+    if own_validator:
+        validator = ChainValidator(retargeter)
+
+    # Header của các khối cuối đã lưu, cần cho kiểm tra liên kết và độ khó
+    history = [block_header(store.read(height))
+               for height in range(max(0, start_height - retargeter.window - 1), start_height)]
+    batch = []
+    height = 0
+    added = 0
+
+    def write_batch():
+        nonlocal history, added
+        invalid = validator.find_invalid(batch, history)
+        if invalid is not None:
+            raise ValueError(f"Khối #{batch[invalid]['index']} trong file bootstrap không hợp lệ")
+        store.import_blocks(batch)
+        added += len(batch)
+        history = (history + [block_header(block_data) for block_data in batch])[-(retargeter.window + 1):]
+        batch.clear()
+        if on_progress:
+            on_progress(height, total)
+
+    try:
+        for block_data in iter_bootstrap(filename):
+            if height < start_height:
+                if block_data["hash"] != store.block_hash(height):
+                    raise ValueError(f"File bootstrap khác chain đang lưu tại khối {height}")
+            else:
+                batch.append(block_data)
+            height += 1
+            if len(batch) >= batch_size:
+                write_batch()
+        # Lô cuối chỉ được ghi sau khi checksum của cả file đã được kiểm tra
+        if batch:
+            write_batch()
+    except BaseException:
+        store.truncate(start_height)
+        raise
+    finally:
+        if own_validator:
+            validator.close()
+    return added
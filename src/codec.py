@@ -0,0 +1,370 @@
+import math
+import struct
+from datetime import datetime, timedelta, timezone
+
+from src.blockchain import TRANSACTION_FIELDS
+
+# Phiên bản định dạng nhị phân (byte đầu tiên của dữ liệu đã mã hóa)
+CODEC_VERSION = 1
+
+# Số tiền dạng số thực được lưu dạng số nguyên với 8 chữ số thập phân
+AMOUNT_SCALE = 10 ** 8
+
+# Mốc thời gian của timestamp dạng nhị phân
+EPOCH = datetime(1970, 1, 1)
+
+# Thứ tự các trường của khối (giống Block.to_dict)
+BLOCK_FIELDS = ("index", "timestamp", "transactions", "merkle_root", "previous_hash",
+                "proof", "target", "hash")
+
+# Cách bố trí dữ liệu: các trường chuẩn, hoặc dict bất kỳ (mã hóa tổng quát)
+_LAYOUT_STANDARD = 0
+_LAYOUT_GENERIC = 1
+
+# Tag của giá trị tổng quát (mọi giá trị JSON)
+_TAG_NONE = 0
+_TAG_FALSE = 1
+_TAG_TRUE = 2
+_TAG_INT = 3
+_TAG_FLOAT = 4
+_TAG_STR = 5
+_TAG_LIST = 6
+_TAG_DICT = 7
+
+# Tag của các dạng gọn; giá trị không đúng dạng chuẩn dùng tag tổng quát ở trên
+_TAG_HASH = 16
+_TAG_ADDRESS = 17
+_TAG_AMOUNT = 18
+_TAG_TIME = 19
+_TAG_TIME_UTC = 20
+
+_HEX_DIGITS = frozenset("0123456789abcdef")
+_DOUBLE = struct.Struct(">d")
+
+
+# ----------------------------------------------------------------------
+# Ghi
+# ----------------------------------------------------------------------
+
+def _write_varint(out, value):
+    """Ghi số nguyên không âm dạng varint (7 bit mỗi byte)"""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_signed(out, value):
+    """Ghi số nguyên có dấu (zigzag: 0, -1, 1, -2, ... -> 0, 1, 2, 3, ...)"""
+    _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+
+
+def _write_bytes(out, data):
+    _write_varint(out, len(data))
+    out += data
+
+
+def _write_value(out, value):
+    """Ghi một giá trị JSON bất kỳ kèm tag kiểu"""
+    if value is None:
+        out.append(_TAG_NONE)
+    elif value is False:
+        out.append(_TAG_FALSE)
+    elif value is True:
+        out.append(_TAG_TRUE)
+    elif isinstance(value, int):
+        out.append(_TAG_INT)
+        _write_signed(out, value)
+    elif isinstance(value, float):
+        out.append(_TAG_FLOAT)
+        out += _DOUBLE.pack(value)
+    elif isinstance(value, str):
+        out.append(_TAG_STR)
+        _write_bytes(out, value.encode())
+    elif isinstance(value, (list, tuple)):
+        out.append(_TAG_LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            _write_value(out, item)
+    elif isinstance(value, dict):
+        out.append(_TAG_DICT)
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise ValueError(f"Khóa không phải chuỗi: {key!r}")
+            _write_bytes(out, key.encode())
+            _write_value(out, item)
+    else:
+        raise ValueError(f"Không mã hóa được giá trị kiểu {type(value).__name__}")
+
+
+def _is_hex(value, length):
+    return isinstance(value, str) and len(value) == length and _HEX_DIGITS.issuperset(value)
+
+
+def _write_hash(out, value):
+    """Hash 64 ký tự hex chữ thường -> 32 byte"""
+    if _is_hex(value, 64):
+        out.append(_TAG_HASH)
+        out += bytes.fromhex(value)
+    else:
+        _write_value(out, value)
+
+
+def _write_address(out, value):
+    """Địa chỉ ví 40 ký tự hex chữ thường -> 20 byte"""
+    if _is_hex(value, 40):
+        out.append(_TAG_ADDRESS)
+        out += bytes.fromhex(value)
+    else:
+        _write_value(out, value)
+
+
+def _write_amount(out, value):
+    """Số tiền thực -> số nguyên (8 chữ số thập phân) nếu đọc lại được đúng giá trị"""
+    if (isinstance(value, float) and math.isfinite(value)
+            and not (value == 0 and math.copysign(1, value) < 0)):
+        units = round(value * AMOUNT_SCALE)
+        if units / AMOUNT_SCALE == value:
+            out.append(_TAG_AMOUNT)
+            _write_signed(out, units)
+            return
+    _write_value(out, value)
+
+
+def _write_time(out, value):
+    """Timestamp dạng str(datetime) (không múi giờ hoặc UTC) -> số micro giây kể từ EPOCH"""
+    if isinstance(value, str):
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            moment = None
+        if moment is not None and str(moment) == value:
+            if moment.tzinfo is None:
+                out.append(_TAG_TIME)
+                _write_signed(out, (moment - EPOCH) // timedelta(microseconds=1))
+                return
+            if moment.tzinfo is timezone.utc:
+                out.append(_TAG_TIME_UTC)
+                _write_signed(out, (moment.replace(tzinfo=None) - EPOCH) // timedelta(microseconds=1))
+                return
+    _write_value(out, value)
+
+
+def _write_transaction(out, transaction):
+    if isinstance(transaction, dict) and transaction.keys() == set(TRANSACTION_FIELDS):
+        out.append(_LAYOUT_STANDARD)
+        _write_address(out, transaction["sender"])
+        _write_address(out, transaction["receiver"])
+        _write_amount(out, transaction["amount"])
+        _write_time(out, transaction["timestamp"])
+    else:
+        out.append(_LAYOUT_GENERIC)
+        _write_value(out, transaction)
+
+
+def encode_transaction(transaction):
+    """
+    Mã hóa một giao dịch (dict do Blockchain.create_transaction tạo) sang dạng nhị phân.
+
+    Args:
+        transaction: Giao dịch dạng dict
+
+    Returns:
+        bytes: Dữ liệu nhị phân (decode_transaction trả lại dict bằng với ban đầu)
+    """
+    out = bytearray([CODEC_VERSION])
+    _write_transaction(out, transaction)
+    return bytes(out)
+
+
+def encode_block(block_data):
+    """
+    Mã hóa một khối (Block.to_dict()) sang dạng nhị phân.
+
+    Hash, Merkle root và target được lưu dạng 32 byte, địa chỉ ví 20 byte,
+    số nguyên dạng varint, số tiền và timestamp dạng số nguyên. Giá trị
+    không đúng dạng chuẩn (ví dụ địa chỉ "0" của giao dịch thưởng) được lưu
+    nguyên vẹn, nên decode_block luôn trả lại dict bằng với ban đầu.
+
+    Args:
+        block_data: Dữ liệu khối dạng dict
+
+    Returns:
+        bytes: Dữ liệu nhị phân
+    """
+    out = bytearray([CODEC_VERSION])
+    if block_data.keys() != set(BLOCK_FIELDS) or not isinstance(block_data["transactions"], list):
+        out.append(_LAYOUT_GENERIC)
+        _write_value(out, block_data)
+        return bytes(out)
+
+    out.append(_LAYOUT_STANDARD)
+    _write_value(out, block_data["index"])
+    _write_time(out, block_data["timestamp"])
+    _write_hash(out, block_data["merkle_root"])
+    _write_hash(out, block_data["previous_hash"])
+    _write_value(out, block_data["proof"])
+    _write_hash(out, block_data["target"])
+    _write_hash(out, block_data["hash"])
+    _write_varint(out, len(block_data["transactions"]))
+    for transaction in block_data["transactions"]:
+        _write_transaction(out, transaction)
+    return bytes(out)
+
+
+# ----------------------------------------------------------------------
+# Đọc
+# ----------------------------------------------------------------------
+
+class _Reader:
+    """Đọc tuần tự dữ liệu nhị phân"""
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def byte(self):
+        if self.pos >= len(self.data):
+            raise ValueError("Dữ liệu nhị phân bị cắt cụt")
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def take(self, size):
+        end = self.pos + size
+        if end > len(self.data):
+            raise ValueError("Dữ liệu nhị phân bị cắt cụt")
+        chunk = self.data[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def varint(self):
+        value = 0
+        shift = 0
+        while True:
+            byte = self.byte()
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def signed(self):
+        value = self.varint()
+        return value >> 1 if value % 2 == 0 else -(value >> 1) - 1
+
+    def text(self):
+        return str(self.take(self.varint()), "utf-8")
+
+    def value(self, tag=None):
+        """Đọc một giá trị (tổng quát hoặc dạng gọn) theo tag"""
+        if tag is None:
+            tag = self.byte()
+        if tag == _TAG_NONE:
+            return None
+        if tag == _TAG_FALSE:
+            return False
+        if tag == _TAG_TRUE:
+            return True
+        if tag == _TAG_INT:
+            return self.signed()
+        if tag == _TAG_FLOAT:
+            return _DOUBLE.unpack(self.take(_DOUBLE.size))[0]
+        if tag == _TAG_STR:
+            return self.text()
+        if tag == _TAG_LIST:
+            return [self.value() for _ in range(self.varint())]
+        if tag == _TAG_DICT:
+            return {self.text(): self.value() for _ in range(self.varint())}
+        if tag == _TAG_HASH:
+            return self.take(32).hex()
+        if tag == _TAG_ADDRESS:
+            return self.take(20).hex()
+        if tag == _TAG_AMOUNT:
+            return self.signed() / AMOUNT_SCALE
+        if tag == _TAG_TIME:
+            return str(EPOCH + timedelta(microseconds=self.signed()))
+        if tag == _TAG_TIME_UTC:
+            return str((EPOCH + timedelta(microseconds=self.signed())).replace(tzinfo=timezone.utc))
+        raise ValueError(f"Tag không hợp lệ: {tag}")
+
+    def transaction(self):
+        layout = self.byte()
+        if layout == _LAYOUT_GENERIC:
+            return self.value()
+        if layout != _LAYOUT_STANDARD:
+            raise ValueError(f"Cách bố trí giao dịch không hợp lệ: {layout}")
+        return {
+            "sender": self.value(),
+            "receiver": self.value(),
+            "amount": self.value(),
+            "timestamp": self.value()
+        }
+
+    def version(self):
+        version = self.byte()
+        if version != CODEC_VERSION:
+            raise ValueError(f"Phiên bản định dạng không được hỗ trợ: {version}")
+
+    def end(self):
+        if self.pos != len(self.data):
+            raise ValueError("Dữ liệu nhị phân thừa ở cuối")
+
+
+def decode_transaction(data):
+    """
+    Giải mã giao dịch từ dữ liệu của encode_transaction.
+
+    Args:
+        data: Dữ liệu nhị phân
+
+    Returns:
+        dict: Giao dịch
+
+    Raises:
+        ValueError: Dữ liệu hỏng hoặc khác phiên bản
+    """
+    reader = _Reader(data)
+    reader.version()
+    transaction = reader.transaction()
+    reader.end()
+    return transaction
+
+
+def decode_block(data):
+    """
+    Giải mã khối từ dữ liệu của encode_block.
+
+    Args:
+        data: Dữ liệu nhị phân
+
+    Returns:
+        dict: Dữ liệu khối (dùng với Block.from_dict)
+
+    Raises:
+        ValueError: Dữ liệu hỏng hoặc khác phiên bản
+    """
+    reader = _Reader(data)
+    reader.version()
+    layout = reader.byte()
+    if layout == _LAYOUT_GENERIC:
+        block_data = reader.value()
+    elif layout == _LAYOUT_STANDARD:
+        block_data = {"index": reader.value(), "timestamp": reader.value()}
+        merkle_root = reader.value()
+        previous_hash = reader.value()
+        proof = reader.value()
+        target = reader.value()
+        block_hash = reader.value()
+        block_data["transactions"] = [reader.transaction() for _ in range(reader.varint())]
+        block_data.update({
+            "merkle_root": merkle_root,
+            "previous_hash": previous_hash,
+            "proof": proof,
+            "target": target,
+            "hash": block_hash
+        })
+    else:
+        raise ValueError(f"Cách bố trí khối không hợp lệ: {layout}")
+    reader.end()
+    return block_data
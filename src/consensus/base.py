@@ -7,16 +7,17 @@ class ConsensusAlgorithm(ABC):
     """
     
     @abstractmethod
-    def mine(self, blockchain, miner_address):
+    def mine(self, blockchain, miner_address, stop_event=None):
         """
         Đào một khối mới và thêm vào blockchain.
         
         Args:
             blockchain: Đối tượng blockchain hiện tại
             miner_address: Địa chỉ của người đào để nhận phần thưởng
+            stop_event: threading.Event dùng để hủy quá trình đào (tùy chọn)
             
         Returns:
-            Block: Khối mới được đào
+            Block: Khối mới được đào, None nếu bị hủy
         """
         pass
     
@@ -34,6 +35,23 @@ class ConsensusAlgorithm(ABC):
         """
         pass
     
+    @abstractmethod
+    def check_proof(self, block, block_hash, blockchain, previous_block):
+        """
+        Kiểm tra proof của khối theo cơ chế đồng thuận (bước cuối của
+        Blockchain.check_block, sau khi đã kiểm tra index, liên kết và hash).
+        
+        Args:
+            block: Khối cần kiểm tra
+            block_hash: Hash đã tính của khối
+            blockchain: Đối tượng blockchain hiện tại
+            previous_block: Khối trước đó
+            
+        Returns:
+            str: Tên quy tắc bị vi phạm, None nếu hợp lệ
+        """
+        pass
+    
     @abstractmethod
     def get_name(self):
         """
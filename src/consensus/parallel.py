@@ -0,0 +1,135 @@
+import itertools
+import multiprocessing as mp
+import os
+import threading
+
+from .template import get_search_backend
+
+# Thời gian chờ tối đa (giây) giữa hai lần kiểm tra tín hiệu hủy
+POLL_INTERVAL = 0.005
+
+# Biến toàn cục trong tiến trình worker (được gán bởi _init_worker)
+_current_job = None
+
+
+def _init_worker(current_job):
+    """
+    Khởi tạo tiến trình worker.
+
+    Args:
+        current_job: Giá trị dùng chung chứa mã công việc đang chạy
+    """
+    global _current_job
+    _current_job = current_job
+
+
+def _search_chunk(task):
+    """
+    Tìm nonce hợp lệ trong khoảng [start, end) cho một công việc.
+
+    Args:
+        task: Tuple (job_id, template, target, start, end, backend)
+
+    Returns:
+        tuple: (nonce hoặc None, số hash đã thử)
+    """
+    job_id, template, target, start, end, backend = task
+    search = get_search_backend(backend)
+
+    # Dừng sớm nếu công việc đã bị hủy (đã có worker khác tìm thấy)
+    return search(template, start, end, target,
+                  should_stop=lambda: _current_job.value != job_id)
+
+
+class ParallelMiner:
+    """
+    Tìm nonce song song bằng một pool tiến trình.
+
+    Không gian nonce được chia thành các khoảng liên tiếp, không chồng lấn,
+    có kích thước chunk_size. Kết quả được thu theo đúng thứ tự các khoảng nên
+    nonce trả về luôn là nonce hợp lệ nhỏ nhất, giống hệt đường đào tuần tự.
+    """
+
+    def __init__(self, workers=None, chunk_size=20000):
+        """
+        Khởi tạo bộ đào song song.
+
+        Args:
+            workers: Số tiến trình worker (mặc định: số lõi CPU)
+            chunk_size: Số nonce trong mỗi khoảng giao cho một worker
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._context = mp.get_context("spawn")
+        self._pool = None
+        self._current_job = None
+        self._job_counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        """Tạo pool worker ở lần dùng đầu tiên và giữ lại cho các lần sau"""
+        if self._pool is None:
+            self._current_job = self._context.RawValue('q', 0)
+            self._pool = self._context.Pool(
+                processes=self.workers,
+                initializer=_init_worker,
+                initargs=(self._current_job,)
+            )
+        return self._pool
+
+    def _generate_tasks(self, job_id, template, target, backend, stopped):
+        """Sinh lần lượt các khoảng nonce cho tới khi công việc kết thúc"""
+        start = 0
+        while not stopped.is_set():
+            yield (job_id, template, target, start, start + self.chunk_size, backend)
+            start += self.chunk_size
+
+    def search(self, template, target, should_stop=None, on_progress=None, backend="hashlib"):
+        """
+        Tìm nonce hợp lệ nhỏ nhất cho một block template.
+
+        Args:
+            template: BlockTemplate của khối cần đào
+            target: Target dạng số nguyên (hash hợp lệ nếu <= target)
+            should_stop: Hàm không tham số, trả về True nếu cần hủy tìm kiếm
+            on_progress: Hàm nhận số hash mỗi khi một khoảng nonce hoàn tất
+            backend: Backend tìm nonce dùng trong worker ("hashlib" hoặc "numpy")
+
+        Returns:
+            int: Giá trị nonce tìm được, None nếu bị hủy
+        """
+        with self._lock:
+            pool = self._get_pool()
+            job_id = next(self._job_counter)
+            self._current_job.value = job_id
+            stopped = threading.Event()
+
+            try:
+                tasks = self._generate_tasks(job_id, template, target, backend, stopped)
+                results = pool.imap(_search_chunk, tasks)
+                while True:
+                    try:
+                        nonce, hashes = results.next(timeout=POLL_INTERVAL)
+                    except mp.TimeoutError:
+                        nonce, hashes = None, 0
+
+                    if on_progress and hashes:
+                        on_progress(hashes)
+
+                    if nonce is not None:
+                        return nonce
+                    if should_stop and should_stop():
+                        return None
+            finally:
+                # Dừng sinh thêm khoảng mới và báo các worker bỏ khoảng đang chạy
+                stopped.set()
+                self._current_job.value = 0
+
+    def close(self):
+        """Dừng tất cả các tiến trình worker"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+                self._pool = None
+                self._current_job = None
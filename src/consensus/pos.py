@@ -1,9 +1,12 @@
 import hashlib
 import json
 import random
-from datetime import datetime
 from .base import ConsensusAlgorithm
 from ..blockchain import Block
+from ..difficulty import block_timestamp
+
+# Quy tắc xác thực riêng của PoS: validator phải có đủ stake
+RULE_STAKE = "stake"
 
 class ProofOfStake(ConsensusAlgorithm):
     """
@@ -102,13 +105,14 @@ class ProofOfStake(ConsensusAlgorithm):
         # Fallback nếu có lỗi
         return list(eligible_stakers.keys())[0]
     
-    def mine(self, blockchain, miner_address):
+    def mine(self, blockchain, miner_address, stop_event=None):
         """
         Tạo khối mới sử dụng Proof of Stake.
         
         Args:
             blockchain: Đối tượng blockchain hiện tại
             miner_address: Địa chỉ của người đào để nhận phần thưởng
+            stop_event: Không dùng (PoS tạo khối ngay, không cần hủy)
             
         Returns:
             Block: Khối mới được tạo
@@ -131,7 +135,7 @@ class ProofOfStake(ConsensusAlgorithm):
         
         # Chuẩn bị dữ liệu cho khối mới
         index = last_block.index + 1
-        timestamp = datetime.now()
+        timestamp = block_timestamp()
         transactions = blockchain.pending_transactions.copy()
         previous_hash = last_block.hash
         
@@ -141,15 +145,22 @@ class ProofOfStake(ConsensusAlgorithm):
         # Tạo khối mới
         block = Block(index, timestamp, transactions, previous_hash, proof)
         
-        # Reset danh sách giao dịch đang chờ
-        blockchain.pending_transactions = []
-        blockchain.chain.append(block)
+        # Thêm khối và xóa các giao dịch đã xác nhận khỏi danh sách chờ
+        if not blockchain.add_block(block):
+            raise ValueError("Đỉnh chain đã thay đổi trong lúc tạo khối")
         
         return block
     
+    def check_proof(self, block, block_hash, blockchain, previous_block):
+        # Kiểm tra validator có đủ stake không
+        validator = block.proof
+        if self.get_stake(validator) < self.min_stake:
+            return RULE_STAKE
+        return None
+    
     def validate_block(self, block, blockchain):
         """
-        Xác thực một khối mới.
+        Xác thực một khối mới nối tiếp đỉnh chain.
         
         Args:
             block: Khối cần xác thực
@@ -158,17 +169,4 @@ class ProofOfStake(ConsensusAlgorithm):
         Returns:
             bool: True nếu khối hợp lệ, False nếu không
         """
-        # Kiểm tra hash của khối
-        if block.hash != block.calculate_hash():
-            return False
-        
-        # Kiểm tra liên kết với khối trước
-        if block.previous_hash != blockchain.chain[-1].hash:
-            return False
-        
-        # Kiểm tra validator có đủ stake không
-        validator = block.proof
-        if self.get_stake(validator) < self.min_stake:
-            return False
-        
-        return True
\ No newline at end of file
+        return blockchain.check_block(block, blockchain.chain[-1], self) is None
@@ -1,23 +1,46 @@
-import hashlib
-import json
-from datetime import datetime
+import time
 from .base import ConsensusAlgorithm
-from ..blockchain import Block
+from ..blockchain import Block, header_hash
+from ..difficulty import block_timestamp, difficulty_to_target, MAX_TARGET
+from ..merkle import compute_merkle_root
+from .stats import MiningStats
+from .template import BlockTemplate, get_search_backend
+
+# Số nonce mỗi lần tìm tuần tự, sau mỗi khoảng cập nhật thống kê hashrate
+SERIAL_CHUNK_SIZE = 16384
+
+# Thời gian tối thiểu (giây) giữa hai lần dựng lại template khi có giao dịch mới
+TEMPLATE_REFRESH_INTERVAL = 5
+
+# Số giao dịch chờ thay đổi đủ để dựng lại template ngay lập tức
+TEMPLATE_REFRESH_TXS = 10
 
 class ProofOfWork(ConsensusAlgorithm):
     """
     Triển khai cơ chế đồng thuận Proof of Work.
     """
     
-    def __init__(self, difficulty=4):
+    def __init__(self, difficulty=4, workers=1, backend="hashlib"):
         """
         Khởi tạo cơ chế Proof of Work.
         
         Args:
-            difficulty: Số lượng số 0 đứng đầu chuỗi hash
+            difficulty: Độ khó, tương đương số lượng số 0 hex đứng đầu chuỗi
+                        hash (có thể là số thực để điều chỉnh mịn)
+            workers: Số tiến trình dùng để tìm nonce (1 = đào tuần tự)
+            backend: Cách băm nonce, "hashlib" (từng nonce) hoặc "numpy" (theo lô)
         """
         self.difficulty = difficulty
-        self.target = '0' * difficulty
+        self.target = difficulty_to_target(difficulty)
+        self.workers = workers
+        self.backend = backend
+        self._search = get_search_backend(backend)
+        self.template_refresh = TEMPLATE_REFRESH_INTERVAL
+        self.refresh_tx_threshold = TEMPLATE_REFRESH_TXS
+        self._parallel_miner = None
+        
+        # Thống kê quá trình đào (hashrate, template, thời gian mỗi khối)
+        self.stats = MiningStats()
     
     def get_name(self):
         return "Proof of Work"
@@ -27,76 +50,241 @@ class ProofOfWork(ConsensusAlgorithm):
     
     def set_difficulty(self, difficulty):
         self.difficulty = difficulty
-        self.target = '0' * difficulty
+        self.target = difficulty_to_target(difficulty)
+    
+    def get_workers(self):
+        return self.workers
+    
+    def set_workers(self, workers):
+        """
+        Thiết lập số tiến trình dùng để tìm nonce.
+        
+        Args:
+            workers: Số tiến trình worker (1 = đào tuần tự)
+        """
+        if workers < 1:
+            raise ValueError("Số tiến trình đào phải lớn hơn 0")
+        
+        if self._parallel_miner is not None and self._parallel_miner.workers != workers:
+            self._parallel_miner.close()
+            self._parallel_miner = None
+        self.workers = workers
+    
+    def get_backend(self):
+        return self.backend
+    
+    def set_backend(self, backend):
+        """
+        Chọn backend tìm nonce.
+        
+        Args:
+            backend: "hashlib" hoặc "numpy"
+        """
+        self._search = get_search_backend(backend)
+        self.backend = backend
+    
+    def set_template_refresh(self, interval=None, tx_threshold=None):
+        """
+        Cấu hình việc dựng lại template khi có giao dịch mới trong lúc đào.
+        
+        Args:
+            interval: Thời gian tối thiểu (giây) giữa hai lần dựng lại template
+            tx_threshold: Số giao dịch thay đổi đủ để dựng lại ngay
+        """
+        if interval is not None:
+            self.template_refresh = interval
+        if tx_threshold is not None:
+            self.refresh_tx_threshold = tx_threshold
+    
+    def template_outdated(self, blockchain, mempool_version, mempool_size, built_at):
+        """
+        Kiểm tra template có cần dựng lại để đưa giao dịch mới vào hay không.
+        
+        Args:
+            blockchain: Đối tượng blockchain hiện tại
+            mempool_version: blockchain.mempool_version lúc dựng template
+            mempool_size: Số giao dịch chờ lúc dựng template
+            built_at: Thời điểm dựng template (time.time())
+            
+        Returns:
+            bool: True nếu danh sách giao dịch chờ đã thay đổi đủ nhiều hoặc đủ lâu
+        """
+        if blockchain.mempool_version == mempool_version:
+            return False
+        if abs(len(blockchain.pending_transactions) - mempool_size) >= self.refresh_tx_threshold:
+            return True
+        return time.time() - built_at >= self.template_refresh
+    
+    def get_stats(self):
+        """
+        Lấy số liệu thống kê quá trình đào.
+        
+        Returns:
+            dict: Số hash, hashrate theo các cửa sổ trượt, số template,
+                  số template bị bỏ và thời gian đào mỗi khối
+        """
+        return self.stats.snapshot()
     
-    def calculate_hash(self, index, timestamp, transactions, previous_hash, proof):
+    def close(self):
+        """Giải phóng pool tiến trình đào song song (nếu có)"""
+        if self._parallel_miner is not None:
+            self._parallel_miner.close()
+            self._parallel_miner = None
+    
+    def calculate_hash(self, index, timestamp, transactions, previous_hash, proof, target=None):
         """
         Tính toán hash của một khối với nonce cụ thể.
         
         Returns:
             str: Chuỗi hash của khối
         """
-        block_string = json.dumps({
-            "index": index,
-            "timestamp": str(timestamp),
-            "transactions": transactions,
-            "previous_hash": previous_hash,
-            "proof": proof
-        }, sort_keys=True).encode()
-        
-        return hashlib.sha256(block_string).hexdigest()
+        if target is None:
+            target = self.target
+        return header_hash(index, timestamp, compute_merkle_root(transactions),
+                           previous_hash, proof, target)
     
-    def proof_of_work(self, index, timestamp, transactions, previous_hash):
+    def proof_of_work(self, index, timestamp, transactions, previous_hash, should_stop=None,
+                      target=None):
         """
         Thực hiện thuật toán Proof of Work để tìm nonce hợp lệ.
         
+        Args:
+            should_stop: Hàm không tham số, trả về True nếu cần hủy tìm kiếm
+            target: Target của khối (mặc định: target theo độ khó hiện tại)
+        
         Returns:
-            int: Giá trị nonce tìm được
+            int: Giá trị nonce tìm được, None nếu bị hủy
         """
-        proof = 0
+        if target is None:
+            target = self.target
+        
+        # Serialize khối một lần, mỗi lần thử chỉ băm thêm nonce
+        template = BlockTemplate(index, timestamp, transactions, previous_hash, target)
+        
+        if self.workers > 1:
+            return self._get_parallel_miner().search(
+                template, target, should_stop,
+                on_progress=self.stats.record_hashes, backend=self.backend
+            )
+        
+        start = 0
         while True:
-            hash = self.calculate_hash(index, timestamp, transactions, previous_hash, proof)
-            if hash.startswith(self.target):
+            proof, hashes = self._search(template, start, start + SERIAL_CHUNK_SIZE,
+                                         target, should_stop)
+            self.stats.record_hashes(hashes)
+            if proof is not None or hashes < SERIAL_CHUNK_SIZE:
                 return proof
-            proof += 1
+            start += SERIAL_CHUNK_SIZE
+    
+    def _get_parallel_miner(self):
+        """Tạo bộ đào song song ở lần dùng đầu tiên"""
+        if self._parallel_miner is None:
+            from .parallel import ParallelMiner
+            self._parallel_miner = ParallelMiner(workers=self.workers)
+        return self._parallel_miner
+    
+    def expected_hashes(self, target=None):
+        """
+        Số hash kỳ vọng để tìm được một nonce hợp lệ.
+        
+        Args:
+            target: Target cần đạt (mặc định: target theo độ khó hiện tại)
+        
+        Returns:
+            int: Số hash kỳ vọng
+        """
+        if target is None:
+            target = self.target
+        return (MAX_TARGET + 1) // (target + 1)
     
-    def mine(self, blockchain, miner_address):
+    def mine(self, blockchain, miner_address, stop_event=None):
         """
         Đào một khối mới sử dụng Proof of Work.
         
+        Nếu đỉnh chain thay đổi trong lúc đào (ví dụ nhận được khối mới từ
+        node khác), template cũ bị bỏ và quá trình đào bắt đầu lại trên đỉnh mới.
+        Nếu có giao dịch mới được thêm vào danh sách chờ, template được dựng
+        lại (theo template_refresh / refresh_tx_threshold) để các giao dịch đó
+        được đưa ngay vào khối đang đào; các tiến trình worker vẫn được giữ
+        nguyên, chỉ nhận công việc mới.
+        
         Args:
             blockchain: Đối tượng blockchain hiện tại
             miner_address: Địa chỉ của người đào để nhận phần thưởng
+            stop_event: threading.Event dùng để hủy quá trình đào (tùy chọn)
             
         Returns:
-            Block: Khối mới được đào
+            Block: Khối mới được đào, None nếu bị hủy
         """
-        # Thêm giao dịch thưởng cho người đào
-        blockchain.add_transaction("0", miner_address, 100)
-        
-        last_block = blockchain.get_last_block()
-        
-        # Chuẩn bị dữ liệu cho khối mới
-        index = last_block.index + 1
-        timestamp = datetime.now()
-        transactions = blockchain.pending_transactions.copy()
-        previous_hash = last_block.hash
+        # Giao dịch thưởng cho người đào, dùng lại nếu phải đào lại
+        reward = blockchain.create_transaction("0", miner_address, 100)
+        start_time = time.time()
         
-        # Tìm proof hợp lệ
-        proof = self.proof_of_work(index, timestamp, transactions, previous_hash)
-        
-        # Tạo khối mới
-        block = Block(index, timestamp, transactions, previous_hash, proof)
-        
-        # Reset danh sách giao dịch đang chờ
-        blockchain.pending_transactions = []
-        blockchain.chain.append(block)
+        while stop_event is None or not stop_event.is_set():
+            last_block = blockchain.get_last_block()
+            
+            # Chuẩn bị dữ liệu cho khối mới
+            index = last_block.index + 1
+            timestamp = block_timestamp()
+            mempool_version = blockchain.mempool_version
+            pending = blockchain.pending_transactions.copy()
+            transactions = pending + [reward]
+            previous_hash = last_block.hash
+            # Target được điều chỉnh theo thời gian tạo các khối gần nhất
+            target = blockchain.get_next_target(last_block)
+            built_at = time.time()
+            self.stats.record_template()
+            
+            def tip_changed():
+                return blockchain.get_last_block().hash != previous_hash
+            
+            def mempool_changed():
+                return self.template_outdated(blockchain, mempool_version, len(pending), built_at)
+            
+            def should_stop():
+                return ((stop_event is not None and stop_event.is_set())
+                        or tip_changed() or mempool_changed())
+            
+            # Tìm proof hợp lệ
+            proof = self.proof_of_work(index, timestamp, transactions, previous_hash,
+                                       should_stop, target)
+            
+            if tip_changed():
+                # Đỉnh chain đã đổi: khối này sẽ tạo fork, bỏ và đào lại. Do
+                # phân phối hình học không có trí nhớ, phần việc còn lại của
+                # template cũ kỳ vọng vẫn là expected_hashes()
+                self.stats.record_stale(self.expected_hashes(target) if proof is None else 0)
+                continue
+            
+            if proof is None:
+                if stop_event is not None and stop_event.is_set():
+                    return None
+                # Có giao dịch mới: dựng lại template, các hash đã thử không
+                # bị lãng phí vì mỗi nonce có xác suất thành công như nhau
+                self.stats.record_refresh()
+                continue
+            
+            # Tạo khối mới
+            block = Block(index, timestamp, transactions, previous_hash, proof, target)
+            
+            # Thêm khối và chỉ xóa các giao dịch đã được đưa vào khối khỏi danh sách chờ.
+            # Đỉnh chain có thể đổi ngay sau lần kiểm tra ở trên: khi đó khối bị
+            # bỏ và đào lại như một template cũ
+            if not blockchain.add_block(block):
+                self.stats.record_stale(0)
+                continue
+            self.stats.record_block(time.time() - start_time)
+            
+            return block
         
-        return block
+        return None
+    
+    def check_proof(self, block, block_hash, blockchain, previous_block):
+        return blockchain.check_work(block, block_hash, previous_block)
     
     def validate_block(self, block, blockchain):
         """
-        Xác thực một khối mới.
+        Xác thực một khối mới nối tiếp đỉnh chain.
         
         Args:
             block: Khối cần xác thực
@@ -105,21 +293,4 @@ class ProofOfWork(ConsensusAlgorithm):
         Returns:
             bool: True nếu khối hợp lệ, False nếu không
         """
-        # Kiểm tra hash của khối
-        if block.hash != block.calculate_hash():
-            return False
-        
-        # Kiểm tra liên kết với khối trước
-        if block.previous_hash != blockchain.chain[-1].hash:
-            return False
-        
-        # Kiểm tra proof of work
-        hash = self.calculate_hash(
-            block.index, 
-            block.timestamp, 
-            block.transactions, 
-            block.previous_hash, 
-            block.proof
-        )
-        
-        return hash.startswith(self.target)
\ No newline at end of file
+        return blockchain.check_block(block, blockchain.chain[-1], self) is None
@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import deque
+
+
+class MiningStats:
+    """
+    Bộ đếm thống kê quá trình đào (hashrate, template, thời gian mỗi khối).
+
+    Số hash được gom theo từng giây để tính hashrate trên các cửa sổ trượt.
+    Mọi phương thức đều an toàn khi gọi từ nhiều thread.
+    """
+
+    def __init__(self, windows=(10, 60, 300), max_block_times=100):
+        """
+        Khởi tạo bộ thống kê.
+
+        Args:
+            windows: Các cửa sổ trượt (giây) dùng để tính hashrate
+            max_block_times: Số khối gần nhất được giữ thời gian đào
+        """
+        self.windows = tuple(windows)
+        self._history_seconds = max(self.windows)
+        self._max_block_times = max_block_times
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Xóa toàn bộ số liệu thống kê"""
+        with self._lock:
+            self.started_at = time.time()
+            self.hashes = 0
+            self.templates_built = 0
+            self.template_refreshes = 0
+            self.stale_templates = 0
+            self.stale_hashes_avoided = 0
+            self.blocks_found = 0
+            self.block_times = deque(maxlen=self._max_block_times)
+            self._buckets = deque()  # [giây, số hash]
+
+    def record_hashes(self, count):
+        """
+        Ghi nhận số hash vừa thử.
+
+        Args:
+            count: Số hash
+        """
+        if count <= 0:
+            return
+
+        second = int(time.time())
+        with self._lock:
+            self.hashes += count
+            if self._buckets and self._buckets[-1][0] == second:
+                self._buckets[-1][1] += count
+            else:
+                self._buckets.append([second, count])
+            self._trim(second)
+
+    def record_template(self):
+        """Ghi nhận một block template mới được dựng"""
+        with self._lock:
+            self.templates_built += 1
+
+    def record_refresh(self):
+        """Ghi nhận một template được dựng lại do danh sách giao dịch chờ thay đổi"""
+        with self._lock:
+            self.template_refreshes += 1
+
+    def record_stale(self, hashes_avoided=0):
+        """
+        Ghi nhận một template bị bỏ do đỉnh chain thay đổi.
+
+        Args:
+            hashes_avoided: Số hash kỳ vọng đã tránh được
+        """
+        with self._lock:
+            self.stale_templates += 1
+            self.stale_hashes_avoided += hashes_avoided
+
+    def record_block(self, seconds):
+        """
+        Ghi nhận một khối được đào thành công.
+
+        Args:
+            seconds: Thời gian đào khối (giây)
+        """
+        with self._lock:
+            self.blocks_found += 1
+            self.block_times.append(seconds)
+
+    def _trim(self, now):
+        """Bỏ các bucket nằm ngoài cửa sổ lớn nhất (gọi khi đã giữ lock)"""
+        oldest = now - self._history_seconds
+        while self._buckets and self._buckets[0][0] < oldest:
+            self._buckets.popleft()
+
+    def hashrate(self, window=10):
+        """
+        Tính hashrate trung bình trong cửa sổ trượt gần nhất.
+
+        Args:
+            window: Độ dài cửa sổ (giây)
+
+        Returns:
+            float: Số hash mỗi giây
+        """
+        now = time.time()
+        with self._lock:
+            since = int(now) - window
+            total = sum(count for second, count in self._buckets if second > since)
+            elapsed = min(window, now - self.started_at)
+        return total / elapsed if elapsed > 0 else 0.0
+
+    def history(self, seconds=60):
+        """
+        Hashrate theo từng giây, dùng để vẽ biểu đồ.
+
+        Args:
+            seconds: Số giây gần nhất cần lấy
+
+        Returns:
+            list: Số hash của từng giây, cũ nhất đứng trước
+        """
+        now = int(time.time())
+        with self._lock:
+            counts = {second: count for second, count in self._buckets}
+        return [counts.get(second, 0) for second in range(now - seconds, now)]
+
+    def snapshot(self):
+        """
+        Lấy toàn bộ số liệu thống kê hiện tại.
+
+        Returns:
+            dict: Số liệu thống kê
+        """
+        rates = {f"hashrate_{window}s": self.hashrate(window) for window in self.windows}
+        with self._lock:
+            block_times = list(self.block_times)
+            data = {
+                "uptime": time.time() - self.started_at,
+                "hashes": self.hashes,
+                "templates_built": self.templates_built,
+                "template_refreshes": self.template_refreshes,
+                "stale_templates": self.stale_templates,
+                "stale_hashes_avoided": self.stale_hashes_avoided,
+                "blocks_found": self.blocks_found,
+                "last_block_time": block_times[-1] if block_times else None,
+                "avg_block_time": sum(block_times) / len(block_times) if block_times else None
+            }
+        data.update(rates)
+        return data
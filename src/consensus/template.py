@@ -0,0 +1,185 @@
+import hashlib
+import json
+
+from ..blockchain import Block
+from ..difficulty import target_to_hex
+from ..merkle import compute_merkle_root
+
+# Số nonce giữa hai lần kiểm tra tín hiệu dừng trong vòng lặp tìm nonce
+CHECK_INTERVAL = 1024
+
+
+class BlockTemplate:
+    """
+    Block template đã được serialize sẵn để băm nhanh trong vòng lặp PoW.
+
+    Chuỗi JSON của header (giống Block.calculate_hash) được tách thành phần
+    trước nonce (prefix) và phần sau nonce (suffix). Prefix được nạp sẵn vào
+    một đối tượng sha256 (midstate); mỗi lần thử chỉ cần .copy() midstate rồi
+    nạp thêm các byte của nonce và suffix, không phải dựng dict và gọi
+    json.dumps lại. Giao dịch chỉ tham gia qua Merkle root nên suffix có kích
+    thước cố định, không phụ thuộc số giao dịch.
+    """
+
+    def __init__(self, index, timestamp, transactions, previous_hash, target=None):
+        """
+        Khởi tạo template cho một khối sắp đào.
+
+        Args:
+            index: Số thứ tự của khối
+            timestamp: Thời gian tạo khối
+            transactions: Danh sách giao dịch
+            previous_hash: Hash của khối trước
+            target: Target ghi trong header (mặc định: Block.DEFAULT_TARGET)
+        """
+        self.index = index
+        self.timestamp = timestamp
+        self.transactions = transactions
+        self.previous_hash = previous_hash
+        self.target = target if target is not None else Block.DEFAULT_TARGET
+
+        self.merkle_root = compute_merkle_root(transactions)
+
+        header_string = json.dumps({
+            "index": index,
+            "timestamp": str(timestamp),
+            "merkle_root": self.merkle_root,
+            "previous_hash": previous_hash,
+            "proof": 0,
+            "target": target_to_hex(self.target)
+        }, sort_keys=True)
+
+        # Với sort_keys, "proof" đứng sau "index", "merkle_root" và
+        # "previous_hash" (chuỗi đã được escape) nên lần xuất hiện đầu tiên
+        # chính là khóa của nonce
+        prefix, marker, suffix = header_string.partition('"proof": 0')
+        self.prefix = (prefix + '"proof": ').encode()
+        self.suffix = suffix.encode()
+        self._prime()
+
+    @classmethod
+    def from_parts(cls, prefix, suffix):
+        """
+        Dựng lại template chỉ từ prefix/suffix (dùng ở worker từ xa).
+
+        Template này chỉ dùng để tìm nonce, không thể tạo Block.
+
+        Args:
+            prefix: Phần header trước nonce (bytes)
+            suffix: Phần header sau nonce (bytes)
+
+        Returns:
+            BlockTemplate: Template chỉ có dữ liệu để băm
+        """
+        template = cls.__new__(cls)
+        template.__setstate__({
+            "index": None,
+            "timestamp": None,
+            "transactions": None,
+            "previous_hash": None,
+            "target": None,
+            "merkle_root": None,
+            "prefix": prefix,
+            "suffix": suffix
+        })
+        return template
+
+    def _prime(self):
+        """Nạp sẵn prefix vào midstate sha256"""
+        self._midstate = hashlib.sha256(self.prefix)
+
+    def __getstate__(self):
+        # Đối tượng hashlib không pickle được, dựng lại sau khi gửi sang worker.
+        # Worker chỉ cần prefix/suffix nên không gửi kèm danh sách giao dịch
+        state = self.__dict__.copy()
+        del state["_midstate"]
+        state["transactions"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._prime()
+
+    def hash(self, proof):
+        """
+        Tính hash của khối với một nonce cụ thể.
+
+        Args:
+            proof: Giá trị nonce
+
+        Returns:
+            str: Chuỗi hash, bằng với Block.calculate_hash() của khối tương ứng
+        """
+        h = self._midstate.copy()
+        h.update(str(proof).encode())
+        h.update(self.suffix)
+        return h.hexdigest()
+
+    def search(self, start, end, target, should_stop=None):
+        """
+        Tìm nonce hợp lệ nhỏ nhất trong khoảng [start, end).
+
+        Args:
+            start: Nonce bắt đầu
+            end: Nonce kết thúc (không bao gồm), None = không giới hạn
+            target: Target dạng số nguyên (hash hợp lệ nếu <= target)
+            should_stop: Hàm không tham số, trả về True nếu cần dừng tìm
+
+        Returns:
+            tuple: (nonce hoặc None, số hash đã thử)
+        """
+        midstate = self._midstate
+        suffix = self.suffix
+        # So sánh digest dạng bytes big-endian tương đương so sánh số nguyên
+        target_bytes = target.to_bytes(32, "big")
+
+        proof = start
+        while end is None or proof < end:
+            if should_stop and (proof - start) % CHECK_INTERVAL == 0 and should_stop():
+                return None, proof - start
+
+            h = midstate.copy()
+            h.update(str(proof).encode())
+            h.update(suffix)
+            if h.digest() <= target_bytes:
+                return proof, proof - start + 1
+            proof += 1
+
+        return None, proof - start
+
+    def to_block(self, proof):
+        """
+        Tạo đối tượng Block từ template với nonce đã tìm được.
+
+        Args:
+            proof: Giá trị nonce
+
+        Returns:
+            Block: Khối hoàn chỉnh
+        """
+        # Merkle root đã tính khi dựng template, không tính lại
+        return Block(self.index, self.timestamp, self.transactions, self.previous_hash,
+                     proof, self.target, self.merkle_root)
+
+
+def get_search_backend(name):
+    """
+    Lấy hàm tìm nonce theo tên backend.
+
+    Mọi backend có cùng giao diện với BlockTemplate.search:
+    search(template, start, end, target, should_stop) -> (nonce, số hash).
+
+    Args:
+        name: "hashlib" (băm từng nonce) hoặc "numpy" (băm theo lô, vector hóa)
+
+    Returns:
+        function: Hàm tìm nonce
+    """
+    if name == "hashlib":
+        return BlockTemplate.search
+    if name == "numpy":
+        from .vectorized import is_available, search_vectorized
+        if not is_available():
+            raise ValueError("Backend 'numpy' cần cài đặt thư viện numpy")
+        return search_vectorized
+    raise ValueError(f"Backend đào không hợp lệ: {name}. Chỉ hỗ trợ 'hashlib' hoặc 'numpy'")
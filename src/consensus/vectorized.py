@@ -0,0 +1,307 @@
+"""
+Backend tìm nonce dùng SHA-256 vector hóa trên mảng NumPy uint32.
+
+Mỗi lô (batch) nonce được băm cùng lúc: phần prefix đầy đủ 64 byte của
+header được nén một lần thành midstate, phần còn lại (prefix dư + chữ số
+nonce + suffix + padding) được dựng thành ma trận (batch, 16) word và chạy
+hàm nén SHA-256 trên toàn bộ lô. Điều kiện độ khó được kiểm tra cho cả lô
+bằng một phép so sánh mảng.
+
+NumPy là phụ thuộc tùy chọn; nếu chưa cài, backend "numpy" không khả dụng.
+"""
+import hashlib
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - phụ thuộc tùy chọn
+    np = None
+
+from ..difficulty import MAX_TARGET
+from .template import CHECK_INTERVAL
+
+# Số nonce mặc định trong mỗi lô
+BATCH_SIZE = 16384
+
+_K = [
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+]
+
+_H0 = [
+    0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a,
+    0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19,
+]
+
+_K_NP = [np.uint32(k) for k in _K] if np is not None else None
+
+
+def is_available():
+    """Kiểm tra NumPy đã được cài đặt hay chưa"""
+    return np is not None
+
+
+def _rotr(x, n):
+    return (x >> np.uint32(n)) | (x << np.uint32(32 - n))
+
+
+def _compress(state, words):
+    """
+    Hàm nén SHA-256 cho một khối 64 byte, vector hóa theo lô.
+
+    Args:
+        state: List 8 mảng uint32 trạng thái hiện tại
+        words: List 16 mảng uint32; word không phụ thuộc nonce là mảng 1
+               phần tử (được broadcast), nên lịch thông điệp của chúng rất rẻ
+
+    Returns:
+        list: 8 mảng uint32 trạng thái mới
+    """
+    w = list(words)
+    for i in range(16, 64):
+        s0 = _rotr(w[i - 15], 7) ^ _rotr(w[i - 15], 18) ^ (w[i - 15] >> np.uint32(3))
+        s1 = _rotr(w[i - 2], 17) ^ _rotr(w[i - 2], 19) ^ (w[i - 2] >> np.uint32(10))
+        w.append(w[i - 16] + s0 + w[i - 7] + s1)
+
+    a, b, c, d, e, f, g, h = state
+    for i in range(64):
+        s1 = _rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)
+        ch = (e & f) ^ (~e & g)
+        t1 = h + s1 + ch + _K_NP[i] + w[i]
+        s0 = _rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)
+        maj = (a & b) ^ (a & c) ^ (b & c)
+        t2 = s0 + maj
+        h, g, f, e, d, c, b, a = g, f, e, d + t1, c, b, a, t1 + t2
+
+    return [x + y for x, y in zip(state, (a, b, c, d, e, f, g, h))]
+
+
+def _padding(message_length):
+    """Padding SHA-256 cho thông điệp dài message_length byte"""
+    pad = b"\x80" + b"\x00" * ((55 - message_length) % 64)
+    return pad + (message_length * 8).to_bytes(8, "big")
+
+
+def _target_words(target):
+    """
+    Chuyển target thành 8 word so sánh được với digest.
+
+    Args:
+        target: Target dạng số nguyên (hash hợp lệ nếu <= target)
+
+    Returns:
+        list: 8 giá trị uint32, hoặc None nếu mọi hash đều thỏa mãn
+    """
+    if target >= MAX_TARGET:
+        return None
+    return [np.uint32((target >> (224 - 32 * i)) & 0xffffffff) for i in range(8)]
+
+
+class _DigitGroup:
+    """
+    Phần dữ liệu cố định cho các nonce có cùng số chữ số.
+
+    Với d chữ số, thông điệp có độ dài cố định nên vị trí các chữ số nonce
+    và padding được tính một lần cho cả nhóm.
+    """
+
+    def __init__(self, template, digits, midstate, tail_offset):
+        message_length = len(template.prefix) + digits + len(template.suffix)
+        tail = (template.prefix[tail_offset:] + b"0" * digits + template.suffix
+                + _padding(message_length))
+        self.digits = digits
+        self.digit_offset = len(template.prefix) - tail_offset
+        self.tail = np.frombuffer(tail, dtype=np.uint8)
+        self.blocks = len(tail) // 64
+        self.midstate = midstate
+        self.powers = np.array([10 ** (digits - 1 - k) for k in range(digits)], dtype=np.uint64)
+
+        # Các word chứa chữ số nonce; mọi word khác là hằng số cho cả nhóm
+        first_word = self.digit_offset // 4
+        last_word = (self.digit_offset + digits - 1) // 4
+        self.word_start = first_word * 4
+        self.word_end = (last_word + 1) * 4
+        self.variable_words = range(first_word, last_word + 1)
+        constant = self.tail.view(">u4").astype(np.uint32)
+        self.constant_words = [constant[i:i + 1] for i in range(len(constant))]
+
+    def digests(self, nonces):
+        """Tính digest (8 mảng uint32) cho một mảng nonce cùng số chữ số"""
+        batch = len(nonces)
+
+        # Chỉ dựng các byte của những word chứa chữ số nonce
+        chunk = np.tile(self.tail[self.word_start:self.word_end], (batch, 1))
+        digits = (nonces[:, None] // self.powers[None, :]) % np.uint64(10) + np.uint64(48)
+        offset = self.digit_offset - self.word_start
+        chunk[:, offset:offset + self.digits] = digits.astype(np.uint8)
+        variable = chunk.view(">u4").astype(np.uint32)
+
+        words = list(self.constant_words)
+        for column, i in enumerate(self.variable_words):
+            words[i] = variable[:, column]
+
+        state = self.midstate
+        for block in range(self.blocks):
+            state = _compress(state, words[block * 16:(block + 1) * 16])
+        return state
+
+
+class VectorizedTemplate:
+    """Dữ liệu dùng lại giữa các lô của cùng một BlockTemplate"""
+
+    def __init__(self, template):
+        self.template = template
+
+        # Nén trước các khối 64 byte đầy đủ của prefix (midstate)
+        self.tail_offset = len(template.prefix) - len(template.prefix) % 64
+        # Trạng thái là các mảng 1 phần tử, tự broadcast theo kích thước lô
+        state = [np.array([x], dtype=np.uint32) for x in _H0]
+        if self.tail_offset:
+            words = np.frombuffer(template.prefix[:self.tail_offset], dtype=">u4")
+            words = words.astype(np.uint32).reshape(-1, 16)
+            for block in words:
+                state = _compress(state, [block[i:i + 1] for i in range(16)])
+        self.midstate = state
+        self._groups = {}
+
+    def group(self, digits):
+        if digits not in self._groups:
+            self._groups[digits] = _DigitGroup(self.template, digits, self.midstate, self.tail_offset)
+        return self._groups[digits]
+
+    def find(self, start, end, target_words):
+        """
+        Tìm nonce hợp lệ nhỏ nhất trong [start, end) (cùng số chữ số).
+
+        Returns:
+            int: Nonce tìm được hoặc None
+        """
+        if target_words is None:
+            return start
+
+        nonces = np.arange(start, end, dtype=np.uint64)
+        digest = self.group(len(str(start))).digests(nonces)
+
+        # So sánh từ điển 8 word của digest với target (digest <= target)
+        below = np.zeros(len(nonces), dtype=bool)
+        equal = np.ones(len(nonces), dtype=bool)
+        for word, target_word in zip(digest, target_words):
+            below |= equal & (word < target_word)
+            equal &= word == target_word
+
+        found = np.flatnonzero(below | equal)
+        return int(nonces[found[0]]) if len(found) else None
+
+
+# VectorizedTemplate gần nhất, dùng lại giữa các lần gọi cho cùng template
+_last_vectorized = None
+
+
+def _get_vectorized(template):
+    """Lấy (hoặc dựng) VectorizedTemplate cho template, theo prefix/suffix"""
+    global _last_vectorized
+    cached = _last_vectorized
+    if (cached is None or cached.template.prefix != template.prefix
+            or cached.template.suffix != template.suffix):
+        cached = _last_vectorized = VectorizedTemplate(template)
+    return cached
+
+
+def search_vectorized(template, start, end, target, should_stop=None, batch_size=BATCH_SIZE):
+    """
+    Tìm nonce hợp lệ nhỏ nhất trong khoảng [start, end) theo từng lô.
+
+    Cùng giao diện và cùng kết quả với BlockTemplate.search.
+
+    Args:
+        template: BlockTemplate của khối cần đào
+        start: Nonce bắt đầu
+        end: Nonce kết thúc (không bao gồm), None = không giới hạn
+        target: Target dạng số nguyên (hash hợp lệ nếu <= target)
+        should_stop: Hàm không tham số, trả về True nếu cần dừng tìm
+        batch_size: Số nonce mỗi lô
+
+    Returns:
+        tuple: (nonce hoặc None, số hash đã thử)
+    """
+    if np is None:
+        raise RuntimeError("Backend 'numpy' cần cài đặt thư viện numpy")
+
+    vectorized = _get_vectorized(template)
+    target_words = _target_words(target)
+
+    proof = start
+    next_check = start
+    while end is None or proof < end:
+        if should_stop and proof >= next_check:
+            if should_stop():
+                return None, proof - start
+            next_check = proof + CHECK_INTERVAL
+
+        # Mỗi lô chỉ gồm các nonce có cùng số chữ số
+        batch_end = min(proof + batch_size, 10 ** len(str(proof)))
+        if end is not None:
+            batch_end = min(batch_end, end)
+
+        nonce = vectorized.find(proof, batch_end, target_words)
+        if nonce is not None:
+            return nonce, nonce - start + 1
+        proof = batch_end
+
+    return None, proof - start
+
+
+def benchmark(seconds=3.0, transactions=100, batch_size=BATCH_SIZE):
+    """
+    So sánh hashrate giữa backend hashlib (từng nonce) và backend numpy.
+
+    Args:
+        seconds: Thời gian chạy mỗi backend (giây)
+        transactions: Số giao dịch trong block template
+        batch_size: Số nonce mỗi lô của backend numpy
+
+    Returns:
+        dict: Hashrate (H/s) của từng backend
+    """
+    from datetime import datetime
+    from .template import BlockTemplate
+
+    txs = [{"sender": "0", "receiver": f"{i:040x}", "amount": 1, "timestamp": str(i)}
+           for i in range(transactions)]
+    template = BlockTemplate(1, datetime(2025, 1, 1), txs, "0" * 64)
+    impossible = 0
+
+    results = {}
+    searchers = {"hashlib": template.search}
+    if np is not None:
+        searchers["numpy"] = lambda s, e, t: search_vectorized(template, s, e, t, batch_size=batch_size)
+
+    for name, search in searchers.items():
+        hashes = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            _, done = search(hashes, hashes + batch_size * 4, impossible)
+            hashes += done
+        results[name] = hashes / (time.perf_counter() - started)
+
+    # Kiểm tra chéo: hai backend phải cho cùng digest
+    if np is not None:
+        for nonce in (0, 9, 10, 12345):
+            group = VectorizedTemplate(template).group(len(str(nonce)))
+            digest = group.digests(np.array([nonce], dtype=np.uint64))
+            hex_digest = "".join(f"{int(word[0]):08x}" for word in digest)
+            assert hex_digest == template.hash(nonce) == hashlib.sha256(
+                template.prefix + str(nonce).encode() + template.suffix).hexdigest()
+
+    return results
+
+
+if __name__ == "__main__":
+    for backend, rate in benchmark().items():
+        print(f"{backend:8s} {rate:12,.0f} H/s")
@@ -0,0 +1,168 @@
+import math
+from datetime import datetime, timedelta, timezone
+from fractions import Fraction
+
+# Target lớn nhất có thể (mọi hash đều hợp lệ)
+MAX_TARGET = (1 << 256) - 1
+
+# Độ khó mặc định (tương đương 4 số 0 hex đứng đầu hash)
+DEFAULT_DIFFICULTY = 4
+
+# Thời gian mong muốn giữa hai khối (giây). Đây là quy tắc đồng thuận: target
+# của mỗi khối được tính từ giá trị này nên mọi node phải dùng cùng một giá trị
+BLOCK_INTERVAL = 10
+
+
+def difficulty_to_target(difficulty):
+    """
+    Chuyển độ khó sang target 256-bit.
+
+    Độ khó d tương đương với yêu cầu hash có d số 0 hex đứng đầu
+    (hash <= 2^(256 - 4d) - 1), nhưng d có thể là số thực để điều chỉnh mịn.
+
+    Args:
+        difficulty: Độ khó (số thực không âm)
+
+    Returns:
+        int: Target tương ứng
+    """
+    if difficulty <= 0:
+        return MAX_TARGET
+    return max(1, int(2 ** (256 - 4 * difficulty)) - 1)
+
+
+def target_to_difficulty(target):
+    """
+    Chuyển target 256-bit sang độ khó (số 0 hex tương đương).
+
+    Args:
+        target: Target dạng số nguyên
+
+    Returns:
+        float: Độ khó tương ứng
+    """
+    return (256 - math.log2(target + 1)) / 4
+
+
+def hash_meets_target(block_hash, target):
+    """
+    Kiểm tra hash (chuỗi hex) có đạt target hay không.
+
+    Returns:
+        bool: True nếu int(hash) <= target
+    """
+    return int(block_hash, 16) <= target
+
+
+def target_to_hex(target):
+    """Biểu diễn target dạng chuỗi hex 64 ký tự (dùng trong header khối)"""
+    return f"{target:064x}"
+
+
+def block_timestamp():
+    """
+    Thời điểm hiện tại dùng làm timestamp của khối mới.
+
+    Timestamp có múi giờ (UTC) nên mọi node quy đổi ra cùng một thời điểm,
+    không phụ thuộc múi giờ của máy tạo khối.
+
+    Returns:
+        datetime: Thời điểm hiện tại theo UTC
+    """
+    return datetime.now(timezone.utc)
+
+
+def timestamp_to_datetime(timestamp):
+    """
+    Chuyển timestamp của khối (datetime hoặc chuỗi) sang datetime có múi giờ.
+
+    Timestamp không có múi giờ (khối tạo trước khi dùng UTC) được hiểu là
+    UTC, không theo múi giờ của máy, vì kết quả được dùng trong các quy tắc
+    đồng thuận và phải giống nhau trên mọi node.
+
+    Returns:
+        datetime: Thời điểm có múi giờ
+    """
+    if not isinstance(timestamp, datetime):
+        timestamp = datetime.fromisoformat(str(timestamp))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
+
+
+def timestamp_to_seconds(timestamp):
+    """
+    Chuyển timestamp của khối (datetime hoặc chuỗi) sang số giây (xem
+    timestamp_to_datetime).
+
+    Returns:
+        float: Số giây tính từ epoch
+    """
+    return timestamp_to_datetime(timestamp).timestamp()
+
+
+class Retargeter:
+    """
+    Điều chỉnh target tự động để giữ thời gian tạo khối ổn định.
+
+    Target của khối tiếp theo = target trung bình của `window` khối gần nhất
+    nhân với tỷ lệ (thời gian thực tế / thời gian mong muốn) của cửa sổ đó.
+    Tỷ lệ điều chỉnh mỗi lần bị giới hạn trong [1/max_adjustment, max_adjustment].
+    """
+
+    def __init__(self, initial_difficulty=DEFAULT_DIFFICULTY, block_interval=BLOCK_INTERVAL,
+                 window=10, max_adjustment=4):
+        """
+        Khởi tạo bộ điều chỉnh độ khó.
+
+        Args:
+            initial_difficulty: Độ khó của các khối đầu tiên
+            block_interval: Thời gian mong muốn giữa hai khối (giây)
+            window: Số khối gần nhất dùng để tính lại target
+            max_adjustment: Hệ số điều chỉnh tối đa mỗi khối
+
+        Raises:
+            ValueError: block_interval không dương, window < 1 hoặc max_adjustment < 1
+        """
+        if block_interval <= 0:
+            raise ValueError(f"Thời gian giữa hai khối phải lớn hơn 0 (nhận được {block_interval})")
+        if window < 1:
+            raise ValueError(f"Cửa sổ điều chỉnh phải có ít nhất 1 khối (nhận được {window})")
+        if max_adjustment < 1:
+            raise ValueError(f"Hệ số điều chỉnh tối đa phải lớn hơn hoặc bằng 1 (nhận được {max_adjustment})")
+        self.initial_target = difficulty_to_target(initial_difficulty)
+        self.block_interval = block_interval
+        self.window = window
+        self.max_adjustment = max_adjustment
+
+    def next_target(self, history):
+        """
+        Tính target cho khối nối tiếp history.
+
+        Args:
+            history: Danh sách các khối liên tiếp kết thúc ở khối trước đó
+                     (chỉ cần window + 1 khối cuối)
+
+        Returns:
+            int: Target của khối tiếp theo
+        """
+        if len(history) <= self.window:
+            return self.initial_target
+
+        # Tính bằng phân số chính xác: kết quả là quy tắc đồng thuận nên không
+        # được phụ thuộc vào làm tròn số thực, và không bị chia cho 0 khi
+        # block_interval rất nhỏ. Khoảng thời gian lấy chính xác tới micro giây
+        recent = history[-(self.window + 1):]
+        elapsed = (timestamp_to_datetime(recent[-1].timestamp)
+                   - timestamp_to_datetime(recent[0].timestamp))
+        actual = Fraction(elapsed // timedelta(microseconds=1), 10 ** 6)
+        expected = self.window * Fraction(self.block_interval)
+        max_adjustment = Fraction(self.max_adjustment)
+
+        # Giới hạn biên độ điều chỉnh để tránh dao động mạnh
+        actual = min(max(actual, expected / max_adjustment), expected * max_adjustment)
+
+        average_target = sum(block.target for block in recent[1:]) // self.window
+        ratio = actual / expected
+        target = average_target * ratio.numerator // ratio.denominator
+        return min(max(target, 1), MAX_TARGET)
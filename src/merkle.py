@@ -0,0 +1,59 @@
+import hashlib
+import json
+
+# Merkle root của một khối không có giao dịch
+EMPTY_ROOT = "0" * 64
+
+
+def transaction_hash(transaction):
+    """
+    Tính hash của một giao dịch (dạng dict).
+
+    Args:
+        transaction: Giao dịch cần băm
+
+    Returns:
+        str: Chuỗi hash của giao dịch
+    """
+    tx_string = json.dumps(transaction, sort_keys=True).encode()
+    return hashlib.sha256(tx_string).hexdigest()
+
+
+def merkle_root(tx_hashes):
+    """
+    Tính Merkle root từ danh sách hash giao dịch.
+
+    Mỗi tầng ghép từng cặp hash liền kề rồi băm lại; nếu số phần tử lẻ thì
+    phần tử cuối được nhân đôi.
+
+    Args:
+        tx_hashes: Danh sách hash giao dịch (theo thứ tự trong khối)
+
+    Returns:
+        str: Merkle root
+    """
+    if not tx_hashes:
+        return EMPTY_ROOT
+
+    level = list(tx_hashes)
+    while len(level) > 1:
+        if len(level) % 2 == 1:
+            level.append(level[-1])
+        level = [
+            hashlib.sha256((level[i] + level[i + 1]).encode()).hexdigest()
+            for i in range(0, len(level), 2)
+        ]
+    return level[0]
+
+
+def compute_merkle_root(transactions):
+    """
+    Tính Merkle root của một danh sách giao dịch.
+
+    Args:
+        transactions: Danh sách giao dịch (dạng dict)
+
+    Returns:
+        str: Merkle root
+    """
+    return merkle_root([transaction_hash(tx) for tx in transactions])
@@ -5,6 +5,7 @@ import time
 import pickle
 from datetime import datetime
 from src.blockchain import Block
+from src.validation import ChainValidator, block_header, common_prefix_length
 
 class Network:
     def __init__(self, blockchain, port=5000):
@@ -14,6 +15,7 @@ class Network:
         self.server_socket = None
         self.is_listening = False
         self.node_id = self.get_local_ip() + ":" + str(port)
+        self.validator = ChainValidator(blockchain.retargeter, cache=blockchain.validated_blocks)
     
     def get_local_ip(self):
         """
@@ -136,12 +138,16 @@ class Network:
                     client_socket.sendall(pickle.dumps(response))
         
         elif message_type == "get_chain":
-            # Gửi blockchain hiện tại
-            if client_socket:
+            # Gửi blockchain hiện tại (node pruning không còn giao dịch của
+            # các khối cũ nên không thể gửi chain đầy đủ)
+            if client_socket and self.blockchain.pruned_height:
+                print("Node đang ở chế độ pruning, không gửi chain cho node khác")
+            elif client_socket:
+                snapshot = self.blockchain.snapshot()
                 response = {
                     "type": "chain",
-                    "chain": [block.to_dict() for block in self.blockchain.chain],
-                    "length": len(self.blockchain.chain)
+                    "chain": [block.to_dict() for block in snapshot],
+                    "length": len(snapshot)
                 }
                 client_socket.sendall(pickle.dumps(response))
         
@@ -152,65 +158,68 @@ class Network:
             
             # Kiểm tra xem chain nhận được có dài hơn không
             if chain_length > len(self.blockchain.chain):
-                # Xác thực chain nhận được
-                if self.validate_received_chain(received_chain):
-                    print(f"Nhận chain mới hợp lệ và dài hơn ({chain_length} khối)")
-                    # Chuyển đổi từ dict sang đối tượng Block
-                    new_chain = []
-                    for block_data in received_chain:
-                        block = Block(
-                            block_data["index"],
-                            block_data["timestamp"],
-                            block_data["transactions"],
-                            block_data["previous_hash"],
-                            block_data["proof"]
-                        )
-                        block.hash = block_data["hash"]
-                        new_chain.append(block)
-                    
-                    # Thay thế chain hiện tại
-                    self.blockchain.chain = new_chain
+                # Phần đầu trùng với chain cục bộ đã được xác thực, chỉ cần
+                # xác thực và dựng lại các khối phía sau
+                local_chain = self.blockchain.snapshot()
+                common = common_prefix_length(received_chain, local_chain)
+                if common < self.blockchain.pruned_height:
+                    print(f"Chain nhận được rẽ nhánh tại khối {common}, trước điểm pruning "
+                          f"{self.blockchain.pruned_height}, bỏ qua")
+                    return
+                
+                # Chỉ cần header của window + 1 khối trước điểm rẽ nhánh để
+                # kiểm tra liên kết và độ khó của phần phía sau
+                window = self.blockchain.retargeter.window
+                history = local_chain[max(0, common - window - 1):common]
+                
+                # Xác thực phần khác biệt; các khối đã xác thực trước đó
+                # (trong cache) được dùng lại thay vì dựng từ dữ liệu nhận được
+                new_blocks = self.validator.resolve(received_chain[common:], history)
+                if new_blocks is None:
+                    print("Chain nhận được không hợp lệ, bỏ qua")
+                elif self.blockchain.replace_chain(new_blocks, common):
+                    print(f"Nhận chain mới hợp lệ và dài hơn ({chain_length} khối, "
+                          f"{len(new_blocks)} khối mới)")
                     print("Đã cập nhật blockchain từ node khác")
                 else:
-                    print("Chain nhận được không hợp lệ, bỏ qua")
+                    print("Chain cục bộ đã thay đổi trong lúc xác thực, bỏ qua")
         
         elif message_type == "new_block":
             # Nhận khối mới từ node khác
             block_data = message.get("block")
+            last_block = self.blockchain.get_last_block()
             
-            # Kiểm tra xem khối có phải là khối tiếp theo không
-            if block_data["index"] == len(self.blockchain.chain):
-                # Tạo đối tượng Block từ dữ liệu nhận được
-                new_block = Block(
-                    block_data["index"],
-                    block_data["timestamp"],
-                    block_data["transactions"],
-                    block_data["previous_hash"],
-                    block_data["proof"]
-                )
-                new_block.hash = block_data["hash"]
+            # Kiểm tra xem khối có phải là khối tiếp theo không (khối cũ bị bỏ ngay)
+            if block_data["index"] == last_block.index + 1:
+                # Giai đoạn 1: xác thực header, chưa đọc danh sách giao dịch
+                rule = self.blockchain.check_header(block_header(block_data), last_block)
+                
+                # Giai đoạn 2: xác thực thân khối (giao dịch, Merkle root)
+                if rule is None:
+                    rule = self.validator.check_body(block_data)
                 
-                # Xác thực khối
-                if self.blockchain.is_valid_block(new_block, self.blockchain.chain[-1]):
-                    # Thêm khối vào blockchain
-                    self.blockchain.chain.append(new_block)
-                    # Xóa các giao dịch đã được xử lý khỏi pending_transactions
-                    for tx in new_block.transactions:
-                        if tx in self.blockchain.pending_transactions:
-                            self.blockchain.pending_transactions.remove(tx)
+                if rule is None:
+                    # Tạo đối tượng Block từ dữ liệu đã xác thực
+                    new_block = Block.from_dict(block_data, verified=True)
                     
-                    print(f"Đã thêm khối mới #{new_block.index} từ node khác")
+                    # Thêm khối vào blockchain, xóa các giao dịch đã được xử lý
+                    # khỏi pending_transactions. Đỉnh chain có thể đã đổi trong
+                    # lúc xác thực (khối khác cùng độ cao, đồng bộ chain); chỉ
+                    # khối đã được thêm mới được đưa vào cache khối đã xác thực
+                    if self.blockchain.add_block(new_block):
+                        self.blockchain.validated_blocks.add(new_block)
+                        print(f"Đã thêm khối mới #{new_block.index} từ node khác")
+                    else:
+                        print(f"Khối #{new_block.index} không còn nối tiếp đỉnh chain, bỏ qua")
                 else:
-                    print(f"Khối #{block_data['index']} không hợp lệ, bỏ qua")
+                    print(f"Khối #{block_data['index']} không hợp lệ (sai {rule}), bỏ qua")
         
         elif message_type == "new_transaction":
             # Nhận giao dịch mới từ node khác
             transaction = message.get("transaction")
             
-            # Kiểm tra xem giao dịch đã tồn tại trong pending_transactions chưa
-            if transaction not in self.blockchain.pending_transactions:
-                # Thêm vào pending_transactions
-                self.blockchain.pending_transactions.append(transaction)
+            # Thêm vào pending_transactions nếu giao dịch chưa tồn tại
+            if self.blockchain.add_pending_transaction(transaction):
                 print(f"Đã thêm giao dịch mới từ {transaction['sender']} đến {transaction['receiver']}")
         
         elif message_type == "get_nodes":
@@ -393,52 +402,24 @@ class Network:
             # Thử kết nối đến node
             threading.Thread(target=self.connect_to_node, args=(ip, self.port), daemon=True).start()
     
-    def validate_received_chain(self, chain):
+    def validate_received_chain(self, chain, history=()):
         """
         Xác thực một blockchain nhận được từ node khác.
         
+        Chain dài được băm song song trên pool tiến trình của ChainValidator
+        (xem src/validation.py).
+        
         Args:
-            chain: Blockchain cần xác thực (dạng list các dict)
+            chain: Các khối cần xác thực (dạng list các dict), cả chain hoặc
+                   phần sau đoạn đầu chung với chain cục bộ
+            history: Các khối cục bộ ngay trước chain (window + 1 khối cuối)
             
         Returns:
             bool: True nếu chain hợp lệ, False nếu không
         """
-        # Kiểm tra xem chain có rỗng không
-        if not chain:
-            return False
-        
-        # Kiểm tra khối genesis
-        if chain[0]["index"] != 0:
-            return False
-        
-        # Kiểm tra tính liên tục và hash của các khối
-        for i in range(1, len(chain)):
-            current = chain[i]
-            previous = chain[i-1]
-            
-            # Kiểm tra index
-            if current["index"] != previous["index"] + 1:
-                return False
-            
-            # Kiểm tra liên kết với khối trước
-            if current["previous_hash"] != previous["hash"]:
-                return False
-            
-            # Tạo đối tượng Block để tính toán hash
-            from datetime import datetime
-            block = Block(
-                current["index"],
-                current["timestamp"],
-                current["transactions"],
-                current["previous_hash"],
-                current["proof"]
-            )
-            
-            # Kiểm tra hash của khối
-            if block.calculate_hash() != current["hash"]:
-                return False
-        
-        return True
+        # Liên kết giữa các khối được kiểm tra tuần tự, hash của các khối
+        # được tính lại song song theo từng đoạn
+        return self.validator.validate(chain, history)
     
     def stop_server(self):
         """
@@ -448,4 +429,5 @@ class Network:
         if self.server_socket:
             self.server_socket.close()
             self.server_socket = None
+        self.validator.close()
 
@@ -0,0 +1,176 @@
+import threading
+
+# Thời gian gom các yêu cầu lưu liên tiếp thành một lần ghi (giây)
+COMMIT_DELAY = 0.5
+
+# Chu kỳ kiểm tra các thay đổi không được báo trước, ví dụ khối nhận từ mạng (giây)
+CHECK_INTERVAL = 5
+
+
+class PersistenceService:
+    """
+    Lưu blockchain và ví trên một thread nền duy nhất.
+
+    Các thread khác (đào, giao diện, mạng) chỉ gọi request_save() rồi chạy
+    tiếp, không phải chờ ghi đĩa. Các yêu cầu đến gần nhau được gom thành một
+    lần ghi, và chỉ phần có thay đổi (chain/giao dịch chờ hoặc ví) được ghi.
+    """
+
+    def __init__(self, blockchain, wallet, commit_delay=COMMIT_DELAY, check_interval=CHECK_INTERVAL):
+        """
+        Khởi tạo service (dữ liệu hiện tại được coi là đã lưu).
+
+        Args:
+            blockchain: Blockchain cần lưu (qua Blockchain.save())
+            wallet: Ví cần lưu (qua Wallet.save_to_file())
+            commit_delay: Thời gian gom yêu cầu trước khi ghi (giây)
+            check_interval: Chu kỳ tự kiểm tra thay đổi (giây)
+        """
+        self.blockchain = blockchain
+        self.wallet = wallet
+        self.commit_delay = commit_delay
+        self.check_interval = check_interval
+
+        self._condition = threading.Condition()
+        self._requested = 0
+        self._committed = 0
+        self._urgent = False
+        self._running = False
+        self._thread = None
+
+        self._saved_chain = self._chain_state()
+        self._saved_wallet = self._wallet_state()
+        # Trạng thái chain không thể lưu (lỗi không tự hết nếu thử lại)
+        self._failed_chain = None
+
+        # Lỗi khiến chain không được lưu, None nếu lần lưu gần nhất thành công
+        self.error = None
+
+        # Số liệu thống kê
+        self.requests = 0
+        self.commits = 0
+
+    def _chain_state(self, snapshot=None):
+        """Dấu hiệu thay đổi của chain và danh sách giao dịch chờ"""
+        if snapshot is None:
+            snapshot = self.blockchain.snapshot()
+        return len(snapshot), snapshot.tip.hash, snapshot.mempool_version
+
+    def _wallet_state(self):
+        """Dấu hiệu thay đổi của ví"""
+        return tuple(self.wallet.addresses), self.wallet.current_address
+
+    def is_dirty(self):
+        """
+        Kiểm tra có thay đổi chưa được lưu hay không.
+
+        Returns:
+            bool: True nếu chain, giao dịch chờ hoặc ví đã thay đổi
+        """
+        return self._chain_state() != self._saved_chain or self._wallet_state() != self._saved_wallet
+
+    def start(self):
+        """Khởi động thread ghi nền"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request_save(self):
+        """Báo có thay đổi cần lưu (trả về ngay, việc ghi diễn ra ở thread nền)"""
+        with self._condition:
+            self._requested += 1
+            self.requests += 1
+            self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Ghi ngay mọi thay đổi và chờ ghi xong.
+
+        Args:
+            timeout: Thời gian chờ tối đa (giây), None = chờ đến khi xong
+
+        Returns:
+            bool: True nếu đã ghi xong trong thời gian chờ
+        """
+        if not self._running:
+            self._commit()
+            return True
+
+        with self._condition:
+            self._requested += 1
+            target = self._requested
+            self._urgent = True
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: self._committed >= target or not self._running,
+                                            timeout)
+
+    def stop(self):
+        """Ghi nốt các thay đổi rồi dừng thread ghi nền"""
+        if self._running:
+            self.flush()
+            with self._condition:
+                self._running = False
+                self._condition.notify_all()
+            self._thread.join()
+            self._thread = None
+        else:
+            self._commit()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._requested == self._committed and self._running:
+                    self._condition.wait(self.check_interval)
+                if not self._running:
+                    return
+                pending = self._requested > self._committed and not self._urgent
+
+            # Chờ thêm một chút để gom các yêu cầu đến sau vào cùng lần ghi
+            if pending:
+                with self._condition:
+                    self._condition.wait_for(lambda: self._urgent or not self._running,
+                                             self.commit_delay)
+
+            with self._condition:
+                target = self._requested
+                self._urgent = False
+
+            self._commit()
+
+            with self._condition:
+                self._committed = target
+                self._condition.notify_all()
+
+    def _commit(self):
+        """Ghi phần đã thay đổi (gọi trên thread ghi nền)"""
+        try:
+            # Ghi từ ảnh chụp: thread đào và mạng không phải chờ trong lúc ghi
+            snapshot = self.blockchain.snapshot()
+            chain_state = self._chain_state(snapshot)
+            if chain_state != self._saved_chain and chain_state != self._failed_chain:
+                self.blockchain.save(snapshot)
+                self._saved_chain = chain_state
+                self._failed_chain = None
+                self.error = None
+                self.commits += 1
+        except ValueError as e:
+            # Store từ chối chain (ví dụ reorg qua điểm pruning): thử lại cũng
+            # lỗi như cũ nên chỉ thử lại khi chain thay đổi
+            self._failed_chain = chain_state
+            self.error = e
+            print(f"Không thể lưu blockchain: {e}")
+        except Exception as e:
+            # Trạng thái đã lưu không được cập nhật nên sẽ thử lại ở lần sau
+            self.error = e
+            print(f"Lỗi khi lưu dữ liệu: {e}")
+
+        try:
+            wallet_state = self._wallet_state()
+            if wallet_state != self._saved_wallet:
+                self.wallet.save_to_file()
+                self._saved_wallet = wallet_state
+                self.commits += 1
+        except Exception as e:
+            print(f"Lỗi khi lưu ví: {e}")
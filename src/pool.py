@@ -0,0 +1,422 @@
+import argparse
+import json
+import multiprocessing as mp
+import socket
+import threading
+import time
+
+from src.consensus.stats import MiningStats
+from src.consensus.template import BlockTemplate, get_search_backend
+from src.difficulty import block_timestamp, target_to_hex
+
+# Số nonce trong mỗi đơn vị công việc giao cho worker
+DEFAULT_RANGE_SIZE = 1 << 18
+
+# Số công việc cũ vẫn được giữ lại để nhận kết quả nộp trễ
+MAX_RECENT_JOBS = 4
+
+
+def send_message(sock, message):
+    """Gửi một message JSON (kết thúc bằng xuống dòng)"""
+    sock.sendall(json.dumps(message).encode() + b"\n")
+
+
+def error_message(reason):
+    """Message trả lời một yêu cầu không hợp lệ"""
+    return {"type": "error", "reason": reason}
+
+
+def is_count(value):
+    """Kiểm tra giá trị trong message JSON là số nguyên không âm (không tính bool)"""
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+class PoolJob:
+    """
+    Một công việc đào: block template trên đỉnh chain hiện tại cùng con trỏ
+    tới nonce chưa được giao. Mỗi đơn vị công việc là một khoảng nonce riêng
+    biệt nên không có hai worker nào băm trùng nhau.
+    """
+
+    def __init__(self, job_id, template, mempool_version=0, mempool_size=0):
+        self.job_id = job_id
+        self.template = template
+        self.mempool_version = mempool_version
+        self.mempool_size = mempool_size
+        self.next_nonce = 0
+        self.created_at = time.time()
+
+    def next_range(self, size):
+        """
+        Cấp khoảng nonce tiếp theo (gọi khi đã giữ lock của pool).
+
+        Returns:
+            tuple: (start, end)
+        """
+        start = self.next_nonce
+        self.next_nonce += size
+        return start, self.next_nonce
+
+    def to_message(self, start, end):
+        return {
+            "type": "work",
+            "job_id": self.job_id,
+            "prefix": self.template.prefix.hex(),
+            "suffix": self.template.suffix.hex(),
+            "target": target_to_hex(self.template.target),
+            "start": start,
+            "end": end
+        }
+
+
+class MiningPool:
+    """
+    Pool đào nội bộ: node dựng block template từ pending_transactions và chia
+    các khoảng nonce không chồng lấn cho các worker (cùng máy hoặc trong LAN)
+    qua giao thức JSON theo dòng trên TCP.
+
+    Giao thức (mỗi message một dòng JSON):
+        worker -> pool: {"type": "get_work", "worker": tên, "hashes": số hash đã thử}
+        pool -> worker: {"type": "work", "job_id", "prefix", "suffix", "target", "start", "end"}
+        worker -> pool: {"type": "submit", "worker": tên, "job_id", "nonce"}
+        pool -> worker: {"type": "result", "accepted": bool, "reason": str}
+        pool -> worker: {"type": "error", "reason": str} (message không hợp lệ)
+    """
+
+    def __init__(self, blockchain, network, consensus, miner_address,
+                 host="0.0.0.0", port=5600, range_size=DEFAULT_RANGE_SIZE):
+        """
+        Khởi tạo pool.
+
+        Args:
+            blockchain: Đối tượng blockchain hiện tại
+            network: Đối tượng Network dùng để broadcast khối mới
+            consensus: Cơ chế ProofOfWork dùng để xác thực kết quả
+            miner_address: Địa chỉ nhận phần thưởng của các khối do pool đào
+            host: Địa chỉ lắng nghe
+            port: Cổng lắng nghe của pool
+            range_size: Số nonce trong mỗi đơn vị công việc
+        """
+        self.blockchain = blockchain
+        self.network = network
+        self.consensus = consensus
+        self.miner_address = miner_address
+        self.host = host
+        self.port = port
+        self.range_size = range_size
+
+        self.server_socket = None
+        self.is_running = False
+        self.stats = MiningStats()
+        self.workers = {}  # {tên worker: {"hashes", "accepted", "rejected", "last_seen"}}
+
+        self._lock = threading.Lock()
+        self._job_counter = 0
+        self._job = None
+        self._recent_jobs = {}
+        self._reward = None
+
+    def start(self):
+        """
+        Khởi động server của pool.
+
+        Returns:
+            bool: True nếu khởi động thành công
+        """
+        if self.is_running:
+            return True
+
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            self.server_socket.bind((self.host, self.port))
+            self.server_socket.listen(32)
+        except Exception as e:
+            print(f"Không thể khởi động pool: {e}")
+            return False
+
+        self.is_running = True
+        threading.Thread(target=self.listen_for_workers, daemon=True).start()
+        print(f"Pool đào đang lắng nghe tại cổng {self.port}")
+        return True
+
+    def stop(self):
+        """Dừng server của pool"""
+        self.is_running = False
+        if self.server_socket:
+            self.server_socket.close()
+            self.server_socket = None
+
+    def listen_for_workers(self):
+        """Chấp nhận kết nối từ các worker"""
+        while self.is_running:
+            try:
+                client_socket, address = self.server_socket.accept()
+                threading.Thread(target=self.handle_worker, args=(client_socket, address),
+                                 daemon=True).start()
+            except Exception as e:
+                if self.is_running:
+                    print(f"Lỗi khi chấp nhận worker: {e}")
+
+    def handle_worker(self, client_socket, address):
+        """
+        Xử lý các yêu cầu của một worker cho tới khi mất kết nối.
+
+        Args:
+            client_socket: Socket của worker
+            address: Địa chỉ của worker
+        """
+        try:
+            reader = client_socket.makefile("rb")
+            for line in reader:
+                # Message sai định dạng chỉ bị trả lời lỗi, không làm mất kết nối
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    send_message(client_socket, error_message("invalid json"))
+                    continue
+                if not isinstance(message, dict) or not isinstance(message.get("worker", ""), str):
+                    send_message(client_socket, error_message("invalid message"))
+                    continue
+                message_type = message.get("type")
+
+                if message_type == "get_work":
+                    send_message(client_socket, self.get_work(message))
+                elif message_type == "submit":
+                    send_message(client_socket, self.submit(message))
+                else:
+                    send_message(client_socket, error_message(f"unknown type {message_type!r}"))
+        except (OSError, ValueError) as e:
+            print(f"Mất kết nối với worker {address[0]}:{address[1]}: {e}")
+        finally:
+            client_socket.close()
+
+    def _worker_entry(self, name):
+        entry = self.workers.get(name)
+        if entry is None:
+            entry = self.workers[name] = {"hashes": 0, "accepted": 0, "rejected": 0}
+        entry["last_seen"] = time.time()
+        return entry
+
+    def _current_job(self):
+        """
+        Lấy công việc hiện tại, dựng template mới nếu đỉnh chain đã thay đổi
+        hoặc có giao dịch mới trong danh sách chờ (gọi khi đã giữ lock).
+        """
+        last_block = self.blockchain.get_last_block()
+        job = self._job
+        if job is not None and job.template.previous_hash == last_block.hash:
+            if not self.consensus.template_outdated(self.blockchain, job.mempool_version,
+                                                    job.mempool_size, job.created_at):
+                return job
+            self.stats.record_refresh()
+
+        # Giao dịch thưởng giữ nguyên giữa các template cho tới khi đào được khối
+        if self._reward is None:
+            self._reward = self.blockchain.create_transaction("0", self.miner_address, 100)
+
+        mempool_version = self.blockchain.mempool_version
+        pending = self.blockchain.pending_transactions.copy()
+        template = BlockTemplate(
+            last_block.index + 1,
+            block_timestamp(),
+            pending + [self._reward],
+            last_block.hash,
+            self.blockchain.get_next_target(last_block)
+        )
+        self._job_counter += 1
+        job = self._job = PoolJob(self._job_counter, template, mempool_version, len(pending))
+        self.stats.record_template()
+
+        self._recent_jobs[job.job_id] = job
+        for old_id in sorted(self._recent_jobs)[:-MAX_RECENT_JOBS]:
+            del self._recent_jobs[old_id]
+        return job
+
+    def get_work(self, message):
+        """
+        Cấp một đơn vị công việc mới cho worker.
+
+        Args:
+            message: Yêu cầu get_work (có thể kèm số hash đã thử)
+
+        Returns:
+            dict: Message "work", hoặc message "error" nếu số hash không hợp lệ
+        """
+        hashes = message.get("hashes", 0)
+        if not is_count(hashes):
+            return error_message("invalid hashes")
+        with self._lock:
+            entry = self._worker_entry(message.get("worker", "unknown"))
+            entry["hashes"] += hashes
+            job = self._current_job()
+            start, end = job.next_range(self.range_size)
+        self.stats.record_hashes(hashes)
+        return job.to_message(start, end)
+
+    def submit(self, message):
+        """
+        Nhận kết quả từ worker, xác thực và thêm khối vào chain.
+
+        Args:
+            message: Message "submit" gồm job_id và nonce
+
+        Returns:
+            dict: Message "result"
+        """
+        with self._lock:
+            entry = self._worker_entry(message.get("worker", "unknown"))
+            if not is_count(message.get("job_id")) or not is_count(message.get("nonce")):
+                entry["rejected"] += 1
+                return {"type": "result", "accepted": False, "reason": "invalid message"}
+            job = self._recent_jobs.get(message["job_id"])
+
+            # Công việc cũ trên cùng đỉnh chain (chỉ khác danh sách giao dịch)
+            # vẫn hợp lệ, chỉ từ chối khi đỉnh chain đã thay đổi
+            if job is None or job.template.previous_hash != self.blockchain.get_last_block().hash:
+                entry["rejected"] += 1
+                return {"type": "result", "accepted": False, "reason": "stale"}
+
+            block = job.template.to_block(message["nonce"])
+            rule = self.blockchain.check_block(block, self.blockchain.get_last_block(), self.consensus)
+            if rule is not None:
+                entry["rejected"] += 1
+                return {"type": "result", "accepted": False, "reason": f"invalid {rule}"}
+
+            # Đỉnh chain có thể đã đổi (khối từ mạng) sau lần kiểm tra ở trên
+            if not self.blockchain.add_block(block):
+                entry["rejected"] += 1
+                return {"type": "result", "accepted": False, "reason": "stale"}
+            self.stats.record_block(time.time() - job.created_at)
+            entry["accepted"] += 1
+            self._reward = None
+            self._job = None
+
+        print(f"Pool đã đào được khối #{block.index} (worker {message.get('worker')})")
+        if self.network:
+            self.network.broadcast_block(block)
+        return {"type": "result", "accepted": True, "reason": "ok", "index": block.index}
+
+
+class PoolWorker:
+    """
+    Worker kết nối tới MiningPool, nhận các khoảng nonce và gửi lại kết quả.
+    """
+
+    def __init__(self, host, port, name=None, backend="hashlib"):
+        """
+        Khởi tạo worker.
+
+        Args:
+            host: Địa chỉ của pool
+            port: Cổng của pool
+            name: Tên worker (mặc định: hostname)
+            backend: Backend tìm nonce ("hashlib" hoặc "numpy")
+        """
+        self.host = host
+        self.port = port
+        self.name = name or socket.gethostname()
+        self.search = get_search_backend(backend)
+        self.is_running = False
+
+    def request(self, sock, reader, message):
+        """
+        Gửi một message tới pool và đọc câu trả lời.
+
+        Returns:
+            dict: Message trả lời của pool
+
+        Raises:
+            ConnectionError: Pool đóng kết nối hoặc trả lời sai định dạng
+        """
+        send_message(sock, message)
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Pool đã đóng kết nối")
+        try:
+            reply = json.loads(line)
+        except ValueError:
+            raise ConnectionError("Pool trả lời không phải JSON")
+        if not isinstance(reply, dict):
+            raise ConnectionError("Pool trả lời sai định dạng")
+        return reply
+
+    def run(self, max_units=None):
+        """
+        Vòng lặp nhận việc - tìm nonce - nộp kết quả.
+
+        Args:
+            max_units: Số đơn vị công việc tối đa (None = chạy mãi)
+        """
+        self.is_running = True
+        with socket.create_connection((self.host, self.port)) as sock:
+            reader = sock.makefile("rb")
+            hashes = 0
+            units = 0
+            while self.is_running and (max_units is None or units < max_units):
+                work = self.request(sock, reader, {
+                    "type": "get_work", "worker": self.name, "hashes": hashes
+                })
+                if work.get("type") != "work":
+                    # Pool trả lỗi thay vì cấp việc: kết nối lại sau thay vì dừng worker
+                    raise ConnectionError(f"Pool không cấp việc ({work.get('reason', work.get('type'))})")
+                template = BlockTemplate.from_parts(bytes.fromhex(work["prefix"]),
+                                                    bytes.fromhex(work["suffix"]))
+                nonce, hashes = self.search(template, work["start"], work["end"],
+                                            int(work["target"], 16))
+                units += 1
+
+                if nonce is not None:
+                    result = self.request(sock, reader, {
+                        "type": "submit", "worker": self.name,
+                        "job_id": work["job_id"], "nonce": nonce
+                    })
+                    if result.get("type") != "result":
+                        print(f"[{self.name}] Pool trả lỗi khi nộp nonce {nonce}: "
+                              f"{result.get('reason', result.get('type'))}")
+                        continue
+                    status = "được chấp nhận" if result.get("accepted") else f"bị từ chối ({result.get('reason')})"
+                    print(f"[{self.name}] Nonce {nonce} {status}")
+
+    def stop(self):
+        self.is_running = False
+
+
+def _run_worker(host, port, name, backend):
+    """Chạy một worker trong tiến trình riêng, tự kết nối lại khi mất kết nối"""
+    worker = PoolWorker(host, port, name, backend)
+    while True:
+        try:
+            worker.run()
+        except (OSError, ConnectionError) as e:
+            print(f"[{name}] Mất kết nối tới pool: {e}, thử lại sau 5 giây")
+            time.sleep(5)
+
+
+def main():
+    """Chạy các tiến trình worker kết nối tới một pool"""
+    parser = argparse.ArgumentParser(description='TuCoin pool worker')
+    parser.add_argument('pool', type=str, help='Địa chỉ IP:Port của pool')
+    parser.add_argument('--processes', type=int, default=mp.cpu_count(),
+                        help='Số tiến trình worker (mặc định: số lõi CPU)')
+    parser.add_argument('--backend', choices=['hashlib', 'numpy'], default='hashlib',
+                        help='Backend băm nonce')
+    args = parser.parse_args()
+
+    host, port = args.pool.split(':')
+    hostname = socket.gethostname()
+    processes = [
+        mp.Process(target=_run_worker, args=(host, int(port), f"{hostname}-{i}", args.backend),
+                   daemon=True)
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    print(f"Đã khởi động {len(processes)} worker kết nối tới pool {args.pool}")
+
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
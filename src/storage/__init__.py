@@ -0,0 +1,4 @@
+from .base import ChainStore, atomic_write
+from .block_log import BlockLog
+from .lazy_chain import LazyChain
+from .sqlite_store import SQLiteStore
@@ -0,0 +1,366 @@
+import itertools
+import json
+import threading
+import weakref
+from abc import ABC, abstractmethod
+
+from ..atomic_file import atomic_write
+from .lazy_chain import LazyChain
+
+# Số khối giữa hai lần báo tiến độ khi nhập dữ liệu
+PROGRESS_INTERVAL = 10000
+
+
+def apply_transactions(balances, transactions):
+    """
+    Cộng các giao dịch vào bảng số dư (giống cách Wallet.get_balance tính).
+
+    Args:
+        balances: Dict địa chỉ -> số dư (được cập nhật tại chỗ)
+        transactions: Danh sách giao dịch
+    """
+    for tx in transactions:
+        balances[tx["receiver"]] = balances.get(tx["receiver"], 0) + tx["amount"]
+        balances[tx["sender"]] = balances.get(tx["sender"], 0) - tx["amount"]
+
+
+class ChainStore(ABC):
+    """
+    Interface chung cho các cách lưu trữ chain trên đĩa.
+
+    Các lớp con chỉ cần hỗ trợ thêm khối vào cuối, cắt bớt từ một độ cao và
+    đọc khối theo độ cao; sync() dựa trên các thao tác đó để ghi phần thay
+    đổi của chain (chi phí tỷ lệ với số khối mới, không phải độ dài chain).
+    """
+
+    def __init__(self):
+        # Các LazyChain đang đọc store (xem pin_chains)
+        self._chains = weakref.WeakSet()
+        self._chains_lock = threading.Lock()
+
+    @property
+    @abstractmethod
+    def height(self):
+        """Số khối đang được lưu"""
+        pass
+
+    @abstractmethod
+    def block_hash(self, height):
+        """
+        Lấy hash của khối tại độ cao height.
+
+        Returns:
+            str: Hash của khối
+        """
+        pass
+
+    @abstractmethod
+    def append(self, block_data):
+        """
+        Thêm một khối vào cuối.
+
+        Args:
+            block_data: Dữ liệu khối dạng dict (Block.to_dict())
+        """
+        pass
+
+    @abstractmethod
+    def truncate(self, height):
+        """
+        Xóa các khối từ độ cao height trở đi (dùng khi reorg). Lớp con phải gọi
+        pin_chains(height) trước khi xóa.
+
+        Args:
+            height: Số khối được giữ lại
+        """
+        pass
+
+    @abstractmethod
+    def read(self, height):
+        """
+        Đọc một khối.
+
+        Returns:
+            dict: Dữ liệu khối
+        """
+        pass
+
+    @abstractmethod
+    def load_pending(self):
+        """
+        Đọc danh sách giao dịch chờ đã lưu.
+
+        Returns:
+            list: Danh sách giao dịch
+        """
+        pass
+
+    @abstractmethod
+    def save_pending(self, transactions):
+        """
+        Lưu danh sách giao dịch chờ.
+
+        Args:
+            transactions: Danh sách giao dịch
+        """
+        pass
+
+    def close(self):
+        """Đóng các file đang mở"""
+        pass
+
+    def height_of(self, block_hash):
+        """
+        Tìm độ cao của khối theo hash.
+
+        Args:
+            block_hash: Hash của khối
+
+        Returns:
+            int: Độ cao của khối, None nếu không có
+        """
+        for height in range(self.height - 1, -1, -1):
+            if self.block_hash(height) == block_hash:
+                return height
+        return None
+
+    def get_balance(self, address, height):
+        """
+        Tính số dư của một địa chỉ trong height khối đầu tiên.
+
+        Args:
+            address: Địa chỉ ví
+            height: Số khối được tính
+
+        Returns:
+            float: Số dư, None nếu store không có index theo địa chỉ và
+                   chưa pruning (hoặc height nằm trước checkpoint)
+        """
+        # Store đã pruning: số dư tại checkpoint cộng các khối còn giữ đủ giao dịch
+        checkpoint = self.load_checkpoint()
+        if checkpoint is None or height < checkpoint["height"]:
+            return None
+        balances = {address: checkpoint["balances"].get(address, 0)}
+        for block_data in itertools.islice(self.iter_blocks(checkpoint["height"]),
+                                           height - checkpoint["height"]):
+            apply_transactions(balances, block_data["transactions"])
+        return balances[address]
+
+    def get_transactions(self, address, height):
+        """
+        Lấy các giao dịch của một địa chỉ trong height khối đầu tiên.
+
+        Args:
+            address: Địa chỉ ví
+            height: Số khối được tính
+
+        Returns:
+            list: Các cặp (độ cao khối, giao dịch) theo thứ tự trong chain,
+                  None nếu store không có index theo địa chỉ và chưa pruning
+                  (hoặc height nằm trước checkpoint)
+        """
+        # Store đã pruning: lịch sử chỉ gồm các khối từ checkpoint trở đi, như số dư
+        checkpoint = self.load_checkpoint()
+        if checkpoint is None or height < checkpoint["height"]:
+            return None
+        transactions = []
+        for block_height, block_data in enumerate(
+                itertools.islice(self.iter_blocks(checkpoint["height"]), height - checkpoint["height"]),
+                checkpoint["height"]):
+            transactions.extend((block_height, tx) for tx in block_data["transactions"]
+                                if address in (tx["sender"], tx["receiver"]))
+        return transactions
+
+    def iter_blocks(self, start=0):
+        """
+        Đọc lần lượt các khối từ độ cao start.
+
+        Yields:
+            dict: Dữ liệu từng khối
+        """
+        for height in range(start, self.height):
+            yield self.read(height)
+
+    def import_blocks(self, blocks, on_progress=None, progress_interval=PROGRESS_INTERVAL):
+        """
+        Thêm lần lượt các khối vào cuối (dùng khi chuyển dữ liệu, khôi phục).
+
+        Các lớp con có thể gom nhiều khối vào một lần ghi bền vững.
+
+        Args:
+            blocks: Iterable các khối dạng dict (nối tiếp các khối đang lưu)
+            on_progress: Hàm nhận số khối đã thêm (tùy chọn)
+            progress_interval: Số khối giữa hai lần gọi on_progress
+
+        Returns:
+            int: Số khối đã thêm
+        """
+        count = 0
+        for block_data in blocks:
+            self.append(block_data)
+            count += 1
+            if on_progress and count % progress_interval == 0:
+                on_progress(count)
+        return count
+
+    def load_checkpoint(self):
+        """
+        Đọc checkpoint số dư của chế độ pruning.
+
+        Returns:
+            dict: {"height", "hash", "balances"}: số dư của mọi địa chỉ sau
+                  height khối đầu tiên (khối cuối có hash là hash), None nếu
+                  store chưa pruning
+        """
+        return None
+
+    def save_checkpoint(self, checkpoint):
+        """
+        Lưu checkpoint số dư (xem load_checkpoint).
+
+        Args:
+            checkpoint: Dict {"height", "hash", "balances"}
+        """
+        raise NotImplementedError(f"{type(self).__name__} không hỗ trợ pruning")
+
+    def prune_bodies(self, height):
+        """
+        Bỏ danh sách giao dịch của các khối dưới độ cao height, chỉ giữ header
+        (khối đọc lại có "transactions": [] và "pruned": True).
+
+        Args:
+            height: Độ cao của checkpoint hiện tại
+        """
+        raise NotImplementedError(f"{type(self).__name__} không hỗ trợ pruning")
+
+    @property
+    def pruned_height(self):
+        """Số khối đầu tiên chỉ còn header (0 nếu chưa pruning)"""
+        checkpoint = self.load_checkpoint()
+        return checkpoint["height"] if checkpoint else 0
+
+    def prune(self, keep):
+        """
+        Chỉ giữ đầy đủ giao dịch của keep khối cuối: số dư của các khối cũ hơn
+        được gộp vào checkpoint rồi giao dịch của chúng bị bỏ, chỉ giữ header.
+
+        Args:
+            keep: Số khối cuối được giữ đầy đủ
+
+        Returns:
+            int: Số khối vừa được gộp vào checkpoint
+        """
+        checkpoint = self.load_checkpoint() or {"height": 0, "hash": None, "balances": {}}
+        height = self.height - keep
+        if height <= checkpoint["height"]:
+            return 0
+
+        balances = dict(checkpoint["balances"])
+        for block_data in itertools.islice(self.iter_blocks(checkpoint["height"]),
+                                           height - checkpoint["height"]):
+            apply_transactions(balances, block_data["transactions"])
+
+        # Ghi checkpoint trước khi bỏ giao dịch: crash giữa hai bước chỉ để lại
+        # giao dịch chưa bị bỏ, số dư vẫn đúng và lần sau bỏ tiếp
+        self.save_checkpoint({"height": height, "hash": self.block_hash(height - 1), "balances": balances})
+        self.prune_bodies(height)
+        return height - checkpoint["height"]
+
+    def open_chain(self):
+        """
+        Lấy chain đọc khối từ store khi cần (không nạp toàn bộ vào bộ nhớ).
+
+        Returns:
+            LazyChain: Chain gồm các khối đang được lưu
+        """
+        return LazyChain(self)
+
+    def track_chain(self, chain):
+        """
+        Ghi nhận một LazyChain đọc khối từ store (giữ tham chiếu yếu).
+
+        Args:
+            chain: LazyChain mới tạo
+        """
+        with self._chains_lock:
+            self._chains.add(chain)
+
+    def pin_chains(self, height):
+        """
+        Trước khi cắt store tại height: các LazyChain còn sống (chain cũ, ảnh
+        chụp đang dùng) giữ lại trong bộ nhớ các khối từ height trở đi, để không
+        đọc phải khối của chain mới được ghi sau đó.
+
+        Args:
+            height: Số khối được giữ lại trong store
+        """
+        with self._chains_lock:
+            chains = list(self._chains)
+        for chain in chains:
+            chain.pin(height)
+
+    def common_height(self, chain):
+        """
+        Tìm số khối đầu tiên trùng nhau (theo hash) giữa dữ liệu đã lưu và chain.
+
+        Args:
+            chain: Danh sách Block
+
+        Returns:
+            int: Độ dài phần đầu chung
+        """
+        low, high = 0, min(self.height, len(chain))
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.block_hash(middle - 1) == chain[middle - 1].hash:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def sync(self, chain, pending_transactions=None):
+        """
+        Ghi các thay đổi của chain so với dữ liệu đã lưu: bỏ các khối không
+        còn thuộc chain (reorg) rồi thêm các khối mới.
+
+        Args:
+            chain: Danh sách Block hiện tại
+            pending_transactions: Danh sách giao dịch chờ (None = không lưu)
+
+        Returns:
+            int: Số khối đã ghi thêm
+        """
+        height = self.height
+        if height > len(chain) and self.block_hash(len(chain) - 1) == chain[-1].hash:
+            # Dữ liệu đã lưu mới hơn chain (ảnh chụp cũ được ghi sau ảnh chụp mới)
+            return 0
+        if height and (height > len(chain) or self.block_hash(height - 1) != chain[height - 1].hash):
+            height = self.common_height(chain)
+            if height < self.pruned_height:
+                # Giao dịch của các khối trước checkpoint đã bị bỏ, không thể reorg
+                raise ValueError(f"Chain rẽ nhánh tại khối {height}, trước điểm pruning "
+                                 f"{self.pruned_height}")
+            self.truncate(height)
+
+        for block in chain[height:]:
+            self.append(block.to_dict())
+
+        if pending_transactions is not None:
+            self.save_pending(pending_transactions)
+        return len(chain) - height
+
+
+class PendingFileMixin:
+    """Lưu danh sách giao dịch chờ trong một file JSON nhỏ cạnh dữ liệu chain"""
+
+    pending_filename = None
+
+    def load_pending(self):
+        try:
+            with open(self.pending_filename, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def save_pending(self, transactions):
+        atomic_write(self.pending_filename, json.dumps(transactions).encode())
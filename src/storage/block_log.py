@@ -0,0 +1,502 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+from .base import PROGRESS_INTERVAL, ChainStore, PendingFileMixin, atomic_write
+
+# Kích thước tối đa của một file segment (byte)
+SEGMENT_SIZE = 64 << 20
+
+# Header của mỗi bản ghi: độ dài payload, CRC32 của payload
+RECORD_HEADER = struct.Struct(">II")
+
+# Mỗi mục index: số segment, vị trí bản ghi, độ dài payload, hash của khối
+INDEX_ENTRY = struct.Struct(">IQI32s")
+
+# Bit đánh dấu số segment của khối đã pruning (bản ghi nằm trong file hdrNNNNN.log)
+PRUNED_SEGMENT = 1 << 31
+
+
+class BlockLog(PendingFileMixin, ChainStore):
+    """
+    Lưu chain dưới dạng log chỉ ghi thêm, chia thành nhiều file segment.
+
+    Thêm khối N chỉ ghi đúng bản ghi của khối N (JSON gọn kèm độ dài và
+    CRC32), một mục index kích thước cố định (tra khối theo độ cao trong
+    O(1)) và con trỏ tip (độ cao, hash khối cuối) được ghi nguyên tử.
+
+    Khi mở lại sau crash, các bản ghi ghi dở hoặc hỏng ở cuối log bị cắt bỏ,
+    các bản ghi hợp lệ chưa kịp ghi index được index lại.
+
+    Các segment được đọc qua mmap: đọc một khối chỉ sao chép đúng bản ghi
+    của khối đó, không đọc cả file vào bộ nhớ. Bảng hash -> độ cao được dựng
+    từ index ở lần tra cứu đầu tiên.
+
+    Khi pruning, mỗi segment nằm hoàn toàn trước checkpoint được chép sang
+    một file chỉ chứa header (hdrNNNNN.log), index được trỏ sang file mới
+    rồi segment cũ bị xóa, nên dung lượng của phần chain cũ chỉ còn header.
+
+    Cấu trúc thư mục:
+        blk00000.log, blk00001.log, ...   Các segment chứa bản ghi khối
+        hdr00000.log, ...                 Các segment đã pruning (chỉ header)
+        index.dat                         Index theo độ cao
+        tip.json                          Con trỏ tip
+        checkpoint.json                   Checkpoint số dư khi pruning
+        mempool.json                      Giao dịch chờ
+    """
+
+    def __init__(self, directory="data/blocks", segment_size=SEGMENT_SIZE, fsync=True):
+        """
+        Mở (hoặc tạo mới) block log.
+
+        Args:
+            directory: Thư mục chứa log
+            segment_size: Kích thước tối đa của một segment (byte)
+            fsync: Gọi fsync sau mỗi lần ghi để dữ liệu bền vững khi mất điện
+        """
+        super().__init__()
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self.pending_filename = os.path.join(directory, "mempool.json")
+        self.index_filename = os.path.join(directory, "index.dat")
+        self.tip_filename = os.path.join(directory, "tip.json")
+        self.checkpoint_filename = os.path.join(directory, "checkpoint.json")
+        self._lock = threading.RLock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._height = 0
+        self._segment = 0
+        self._segment_file = None
+        self._index_file = None
+        self._maps = {}
+        self._heights = None
+        self._bulk = False
+        self._checkpoint = self._read_checkpoint()
+        self.recover()
+
+    def _segment_filename(self, segment):
+        if segment & PRUNED_SEGMENT:
+            return os.path.join(self.directory, f"hdr{segment & ~PRUNED_SEGMENT:05d}.log")
+        return os.path.join(self.directory, f"blk{segment:05d}.log")
+
+    def _record_end(self, entry):
+        """Segment và vị trí ghi tiếp theo sau bản ghi của một mục index"""
+        segment, offset, length, _ = entry
+        if segment & PRUNED_SEGMENT:
+            # Segment đã pruning không bao giờ được ghi thêm
+            return (segment & ~PRUNED_SEGMENT) + 1, 0
+        return segment, offset + RECORD_HEADER.size + length
+
+    def _sync_file(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    # ------------------------------------------------------------------
+    # Khôi phục
+    # ------------------------------------------------------------------
+
+    def _read_tip(self):
+        try:
+            with open(self.tip_filename, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_tip(self):
+        tip = {"height": self._height, "hash": self.block_hash(self._height - 1) if self._height else None}
+        atomic_write(self.tip_filename, json.dumps(tip).encode())
+
+    def _read_record(self, f, offset):
+        """
+        Đọc bản ghi tại offset của một segment.
+
+        Returns:
+            bytes: Payload, None nếu bản ghi không đầy đủ hoặc sai CRC
+        """
+        f.seek(offset)
+        header = f.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            return None
+        length, crc = RECORD_HEADER.unpack(header)
+        payload = f.read(length)
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return None
+        return payload
+
+    def _unmap(self, first_segment=0):
+        """Bỏ mmap của các segment từ first_segment trở đi (trước khi cắt file)"""
+        for segment in [number for number in self._maps if number >= first_segment]:
+            self._maps.pop(segment).close()
+
+    def _read_mapped(self, segment, offset, length):
+        """
+        Đọc payload của bản ghi qua mmap, ánh xạ lại segment nếu file đã dài thêm.
+
+        Returns:
+            bytes: Payload, None nếu bản ghi hỏng
+        """
+        end = offset + RECORD_HEADER.size + length
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            if mapped is not None:
+                mapped.close()
+            with open(self._segment_filename(segment), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+            if len(mapped) < end:
+                return None
+        stored_length, crc = RECORD_HEADER.unpack_from(mapped, offset)
+        payload = mapped[offset + RECORD_HEADER.size:end]
+        if stored_length != length or zlib.crc32(payload) != crc:
+            return None
+        return payload
+
+    def recover(self):
+        """
+        Kiểm tra phần cuối của log và cắt bỏ bản ghi ghi dở hoặc hỏng.
+
+        Các mục index trước khối tip được coi là bền vững; khối tip và các mục
+        sau đó được kiểm tra lại, rồi log được quét tiếp để index các bản ghi
+        hợp lệ chưa có trong index.
+        """
+        with self._lock:
+            self.close()
+            self._heights = None
+
+            index_size = os.path.getsize(self.index_filename) if os.path.exists(self.index_filename) else 0
+            count = index_size // INDEX_ENTRY.size
+
+            # Các khối trước khối tip đã được fsync khi tip được ghi; khối tip
+            # và các mục phía sau được kiểm tra lại CRC. Chỉ đọc phần cuối của
+            # index nên thời gian mở không phụ thuộc độ dài chain.
+            tip = self._read_tip()
+            durable = max(min(tip["height"], count) - 1, 0) if tip else 0
+            first = max(durable - 1, 0)
+            entries = []
+            if count > first:
+                with open(self.index_filename, "rb") as f:
+                    f.seek(first * INDEX_ENTRY.size)
+                    data = f.read((count - first) * INDEX_ENTRY.size)
+                entries = [INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size)
+                           for i in range(count - first)]
+
+            segment, offset = 0, 0
+            valid = durable
+            new_entries = []
+            files = {}
+
+            def segment_file(number):
+                if number not in files:
+                    filename = self._segment_filename(number)
+                    files[number] = open(filename, "rb") if os.path.exists(filename) else None
+                return files[number]
+
+            try:
+                if durable:
+                    segment, offset = self._record_end(entries[durable - 1 - first])
+                for segment_number, record_offset, length, _ in entries[durable - first:]:
+                    f = segment_file(segment_number)
+                    payload = self._read_record(f, record_offset) if f else None
+                    if payload is None or len(payload) != length:
+                        break
+                    segment, offset = self._record_end((segment_number, record_offset, length, None))
+                    valid += 1
+
+                # Quét tiếp các bản ghi hợp lệ chưa được index
+                while True:
+                    f = segment_file(segment)
+                    payload = self._read_record(f, offset) if f else None
+                    if payload is None:
+                        next_file = segment_file(segment + 1)
+                        if f is not None and next_file is not None and offset == os.fstat(f.fileno()).st_size:
+                            segment, offset = segment + 1, 0
+                            continue
+                        break
+                    try:
+                        block_hash = bytes.fromhex(json.loads(payload)["hash"])
+                    except (ValueError, KeyError):
+                        break
+                    new_entries.append((segment, offset, len(payload), block_hash))
+                    offset += RECORD_HEADER.size + len(payload)
+            finally:
+                for f in files.values():
+                    if f:
+                        f.close()
+
+            # Cắt bỏ phần hỏng ở cuối segment hiện tại và các segment phía sau
+            filename = self._segment_filename(segment)
+            if os.path.exists(filename) and os.path.getsize(filename) != offset:
+                print(f"Block log: cắt bỏ {os.path.getsize(filename) - offset} byte hỏng ở cuối {filename}")
+                with open(filename, "r+b") as f:
+                    f.truncate(offset)
+            number = segment + 1
+            while os.path.exists(self._segment_filename(number)):
+                os.remove(self._segment_filename(number))
+                number += 1
+
+            # Sửa index tại chỗ: bỏ các mục hỏng, thêm các mục vừa index lại
+            height = valid + len(new_entries)
+            if index_size != height * INDEX_ENTRY.size:
+                with open(self.index_filename, "ab") as f:
+                    f.truncate(valid * INDEX_ENTRY.size)
+                    f.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in new_entries))
+                    self._sync_file(f)
+
+            self._height = height
+            self._segment = segment
+            self._segment_file = open(filename, "ab")
+            self._index_file = open(self.index_filename, "ab")
+            # Không dùng bộ đệm để luôn đọc được dữ liệu mới ghi hoặc vừa bị cắt
+            self._reader = open(self.index_filename, "rb", buffering=0)
+            if tip is None or tip.get("height") != height or (
+                    height and tip.get("hash") != self.block_hash(height - 1)):
+                self._write_tip()
+
+    # ------------------------------------------------------------------
+    # ChainStore
+    # ------------------------------------------------------------------
+
+    @property
+    def height(self):
+        return self._height
+
+    def _entry(self, height):
+        if not 0 <= height < self._height:
+            raise IndexError(f"Không có khối ở độ cao {height}")
+        self._reader.seek(height * INDEX_ENTRY.size)
+        return INDEX_ENTRY.unpack(self._reader.read(INDEX_ENTRY.size))
+
+    def block_hash(self, height):
+        with self._lock:
+            return self._entry(height)[3].hex()
+
+    def append(self, block_data):
+        with self._lock:
+            payload = json.dumps(block_data, separators=(",", ":")).encode()
+
+            # Chuyển sang segment mới khi segment hiện tại đã đầy
+            offset = self._segment_file.tell()
+            if offset and offset + RECORD_HEADER.size + len(payload) > self.segment_size:
+                self._segment_file.close()
+                self._segment += 1
+                self._segment_file = open(self._segment_filename(self._segment), "ab")
+                offset = 0
+
+            # Thứ tự ghi: bản ghi -> index -> tip, nên crash ở bất kỳ bước nào
+            # cũng có thể khôi phục được bằng recover()
+            self._segment_file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            if not self._bulk:
+                self._sync_file(self._segment_file)
+
+            entry = INDEX_ENTRY.pack(self._segment, offset, len(payload), bytes.fromhex(block_data["hash"]))
+            self._index_file.write(entry)
+            if not self._bulk:
+                self._sync_file(self._index_file)
+
+            if self._heights is not None:
+                self._heights[block_data["hash"]] = self._height
+            self._height += 1
+            if not self._bulk:
+                self._write_tip()
+
+    def import_blocks(self, blocks, on_progress=None, progress_interval=PROGRESS_INTERVAL):
+        # Ghi liên tục không fsync từng khối; cuối cùng fsync một lần rồi mới
+        # ghi tip (crash giữa chừng thì recover() index lại phần đã ghi)
+        with self._lock:
+            self._bulk = True
+            try:
+                return super().import_blocks(blocks, on_progress, progress_interval)
+            finally:
+                self._bulk = False
+                self._sync_file(self._segment_file)
+                self._sync_file(self._index_file)
+                self._write_tip()
+
+    def truncate(self, height):
+        with self._lock:
+            if height >= self._height:
+                return
+            self.pin_chains(height)
+
+            if height:
+                segment, offset = self._record_end(self._entry(height - 1))
+            else:
+                segment, offset = 0, 0
+
+            self._segment_file.close()
+            self._unmap(segment)
+            with open(self._segment_filename(segment), "ab") as f:
+                f.truncate(offset)
+            number = segment + 1
+            while os.path.exists(self._segment_filename(number)):
+                os.remove(self._segment_filename(number))
+                number += 1
+            self._segment = segment
+            self._segment_file = open(self._segment_filename(segment), "ab")
+
+            self._index_file.truncate(height * INDEX_ENTRY.size)
+            self._sync_file(self._index_file)
+            self._height = height
+            self._heights = None
+            self._write_tip()
+
+    def sync(self, chain, pending_transactions=None):
+        # Giữ khóa trong suốt quá trình so sánh và ghi (auto save, giao diện và
+        # mạng có thể cùng gọi Blockchain.save())
+        with self._lock:
+            return super().sync(chain, pending_transactions)
+
+    def read(self, height):
+        with self._lock:
+            segment, offset, length, _ = self._entry(height)
+            payload = self._read_mapped(segment, offset, length)
+        if payload is None:
+            raise IOError(f"Bản ghi của khối {height} bị hỏng")
+        block_data = json.loads(payload)
+        if height < self.pruned_height and not block_data.get("pruned"):
+            # Segment chưa đầy nên chưa bị pruning: vẫn đọc như khối chỉ còn header
+            # để mọi store cho cùng kết quả (giao dịch đã được gộp vào checkpoint)
+            block_data.update({"transactions": [], "pruned": True})
+        return block_data
+
+    def height_of(self, block_hash):
+        with self._lock:
+            if self._heights is None:
+                self._reader.seek(0)
+                data = self._reader.read(self._height * INDEX_ENTRY.size)
+                self._heights = {
+                    INDEX_ENTRY.unpack_from(data, height * INDEX_ENTRY.size)[3].hex(): height
+                    for height in range(self._height)
+                }
+            return self._heights.get(block_hash)
+
+    def get_balance(self, address, height):
+        # Giữ khóa để prune() không bỏ giao dịch giữa lúc đọc checkpoint và các khối
+        with self._lock:
+            return super().get_balance(address, height)
+
+    def get_transactions(self, address, height):
+        with self._lock:
+            return super().get_transactions(address, height)
+
+    # ------------------------------------------------------------------
+    # Pruning
+    # ------------------------------------------------------------------
+
+    def _read_checkpoint(self):
+        try:
+            with open(self.checkpoint_filename, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def load_checkpoint(self):
+        return self._checkpoint
+
+    def save_checkpoint(self, checkpoint):
+        atomic_write(self.checkpoint_filename, json.dumps(checkpoint).encode())
+        self._checkpoint = checkpoint
+
+    def prune(self, keep):
+        with self._lock:
+            return super().prune(keep)
+
+    def _entries(self, start, end):
+        """Đọc các mục index có độ cao trong [start, end)"""
+        self._reader.seek(start * INDEX_ENTRY.size)
+        data = self._reader.read((end - start) * INDEX_ENTRY.size)
+        return [INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size) for i in range(end - start)]
+
+    def _first_unpruned(self, height):
+        """Độ cao đầu tiên (trong height khối đầu) chưa nằm trong segment đã pruning"""
+        # Các segment được pruning theo thứ tự nên các mục đã pruning nằm liền ở đầu index
+        low, high = 0, height
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] & PRUNED_SEGMENT:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def prune_bodies(self, height):
+        with self._lock:
+            height = min(height, self._height)
+            start = self._first_unpruned(height)
+            if start == height:
+                return
+            # Chỉ pruning các segment đã đầy và nằm hoàn toàn trước height
+            limit = min(self._entry(height)[0] & ~PRUNED_SEGMENT if height < self._height else self._segment,
+                        self._segment)
+            segment = self._entry(start)[0]
+            if segment >= limit:
+                return
+
+            # Segment bị pruning dở (crash giữa lúc sửa index) được làm lại từ đầu
+            while start and self._entry(start - 1)[0] == segment | PRUNED_SEGMENT:
+                start -= 1
+
+            entries = self._entries(start, height)
+            position = 0
+            while position < len(entries) and entries[position][0] & ~PRUNED_SEGMENT < limit:
+                segment = entries[position][0] & ~PRUNED_SEGMENT
+                end = position
+                while end < len(entries) and entries[end][0] & ~PRUNED_SEGMENT == segment:
+                    end += 1
+                self._prune_segment(segment, start + position, entries[position:end])
+                position = end
+
+    def _prune_segment(self, segment, first_height, entries):
+        """
+        Chép header của một segment sang file hdr, trỏ index sang đó rồi xóa
+        segment cũ. Crash ở bất kỳ bước nào thì mọi mục index vẫn trỏ tới một
+        bản ghi còn tồn tại (file cũ chỉ bị xóa sau khi index đã được sửa).
+        """
+        records = bytearray()
+        new_entries = []
+        for number, offset, length, block_hash in entries:
+            payload = self._read_mapped(number, offset, length)
+            if payload is None:
+                raise IOError(f"Bản ghi của khối {first_height + len(new_entries)} bị hỏng")
+            block_data = json.loads(payload)
+            header = {key: value for key, value in block_data.items()
+                      if key not in ("transactions", "pruned")}
+            header.update({"transactions": [], "pruned": True})
+            header_payload = json.dumps(header, separators=(",", ":")).encode()
+            new_entries.append((segment | PRUNED_SEGMENT, len(records), len(header_payload), block_hash))
+            records += RECORD_HEADER.pack(len(header_payload), zlib.crc32(header_payload)) + header_payload
+
+        pruned = segment | PRUNED_SEGMENT
+        self._unmap_segment(pruned)
+        atomic_write(self._segment_filename(pruned), bytes(records))
+
+        with open(self.index_filename, "r+b") as f:
+            f.seek(first_height * INDEX_ENTRY.size)
+            f.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in new_entries))
+            self._sync_file(f)
+
+        self._unmap_segment(segment)
+        for number in (segment - 1, segment):
+            # Segment trước có thể còn sót lại nếu lần pruning trước bị crash
+            filename = self._segment_filename(number)
+            if number >= 0 and os.path.exists(filename):
+                os.remove(filename)
+
+    def _unmap_segment(self, segment):
+        mapped = self._maps.pop(segment, None)
+        if mapped is not None:
+            mapped.close()
+
+    def close(self):
+        with self._lock:
+            self._unmap()
+            for name in ("_segment_file", "_index_file", "_reader"):
+                f = getattr(self, name, None)
+                if f:
+                    f.close()
+                    setattr(self, name, None)
@@ -0,0 +1,167 @@
+import itertools
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+
+from ..blockchain import Block
+
+# Số khối đã giải mã được giữ lại
+DECODED_CACHE_SIZE = 1024
+
+
+class LazyChain(Sequence):
+    """
+    Chain chỉ giải mã khối từ store khi được truy cập (chain[i], lặp, cắt).
+
+    Các khối đã có trong store lúc tạo không được nạp sẵn vào bộ nhớ, nên
+    thời gian khởi động và bộ nhớ sử dụng gần như không phụ thuộc độ dài
+    chain. Khối mới được thêm bằng append() nằm trong bộ nhớ cho đến khi
+    Blockchain.save() ghi chúng xuống store.
+
+    Khi store bị cắt bớt (reorg), các khối từ điểm cắt trở đi được giữ lại
+    trong bộ nhớ trước (xem pin()), nên chain cũ và các ảnh chụp của nó vẫn
+    đọc đúng khối của chính nó sau khi chain mới được ghi đè lên store.
+    """
+
+    def __init__(self, store, cache_size=DECODED_CACHE_SIZE, base=None):
+        """
+        Args:
+            store: ChainStore chứa các khối
+            cache_size: Số khối đã giải mã được giữ lại (LRU)
+            base: Số khối đầu tiên được đọc từ store (mặc định: tất cả)
+        """
+        self.store = store
+        self.base = store.height if base is None else base
+        self.tail = []
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        store.track_chain(self)
+
+    def __len__(self):
+        with self._lock:
+            return self.base + len(self.tail)
+
+    def _decode(self, height):
+        with self._lock:
+            block = self._cache.get(height)
+            if block is not None:
+                self._cache.move_to_end(height)
+                return block
+
+        try:
+            block_data = self.store.read(height)
+        except IndexError:
+            block_data = None
+
+        with self._lock:
+            # Store có thể vừa bị cắt trong lúc đọc: khối đã được giữ lại trong
+            # tail, dữ liệu vừa đọc (nếu có) thuộc chain mới
+            if height >= self.base:
+                return self.tail[height - self.base]
+        if block_data is None:
+            raise IndexError(f"Không có khối ở độ cao {height}")
+
+        # Dữ liệu trong store do chính node này ghi, không cần tính lại Merkle root
+        block = Block.from_dict(block_data, verified=True)
+
+        with self._lock:
+            if height < self.base:
+                self._cache[height] = block
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return block
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        with self._lock:
+            base, tail = self.base, self.tail
+        if index < 0:
+            index += base + len(tail)
+        if not 0 <= index < base + len(tail):
+            raise IndexError("Chỉ số khối vượt quá độ dài chain")
+        if index >= base:
+            return tail[index - base]
+        return self._decode(index)
+
+    def __iter__(self):
+        # Đọc tuần tự từ store, không đưa vào cache để không đẩy các khối hay dùng ra
+        height = 0
+        for block_data in self.store.iter_blocks():
+            with self._lock:
+                if height >= self.base:
+                    break
+                block = self._cache.get(height)
+            yield block or Block.from_dict(block_data, verified=True)
+            height += 1
+        # Phần còn lại (kể cả các khối được giữ lại nếu store bị cắt giữa chừng)
+        with self._lock:
+            base, tail = self.base, list(self.tail)
+        yield from tail[height - base:]
+
+    def append(self, block):
+        """Thêm khối mới vào cuối chain"""
+        with self._lock:
+            self.tail.append(block)
+
+    def pin(self, height):
+        """
+        Giữ lại trong bộ nhớ các khối từ độ cao height trở đi đang được đọc từ
+        store. Store gọi hàm này trước khi cắt bớt khối tại height (reorg).
+
+        Args:
+            height: Độ cao store sắp bị cắt
+        """
+        if height >= self.base:
+            return
+        with self._lock:
+            cached = dict(self._cache)
+        blocks = [cached.get(index) or Block.from_dict(block_data, verified=True)
+                  for index, block_data in enumerate(
+                      itertools.islice(self.store.iter_blocks(height), self.base - height), height)]
+        with self._lock:
+            self.tail = blocks + self.tail
+            self.base = height
+            for index in [index for index in self._cache if index >= height]:
+                del self._cache[index]
+
+    def fork(self, height):
+        """
+        Tạo chain mới gồm height khối đầu tiên của chain này (dùng khi reorg).
+        Chain hiện tại không bị thay đổi vì các ảnh chụp có thể đang đọc nó.
+
+        Args:
+            height: Số khối được giữ lại
+
+        Returns:
+            LazyChain: Chain mới, dùng chung store và các khối đã giải mã
+        """
+        with self._lock:
+            base, tail = self.base, self.tail
+        chain = LazyChain(self.store, self.cache_size, base=min(height, base))
+        chain.tail = tail[:max(0, height - base)]
+        with self._lock:
+            chain._cache.update((index, block) for index, block in self._cache.items()
+                                if index < chain.base)
+        return chain
+
+    def index_of(self, block_hash):
+        """
+        Tìm độ cao của khối theo hash (dùng index của store).
+
+        Args:
+            block_hash: Hash của khối
+
+        Returns:
+            int: Độ cao của khối, None nếu không thuộc chain
+        """
+        with self._lock:
+            base, tail = self.base, self.tail
+        for position, block in enumerate(tail):
+            if block.hash == block_hash:
+                return base + position
+        height = self.store.height_of(block_hash)
+        if height is not None and height < base:
+            return height
+        return None
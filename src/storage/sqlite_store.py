@@ -0,0 +1,289 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from ..merkle import transaction_hash
+from .base import PROGRESS_INTERVAL, ChainStore
+
+# Số khối đọc trong mỗi truy vấn khi duyệt tuần tự
+READ_BATCH = 1000
+
+# Số khối ghi trong mỗi transaction khi nhập dữ liệu
+IMPORT_BATCH = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    height INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    header TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    height INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    txid TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    receiver TEXT NOT NULL,
+    amount NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (height, position)
+);
+CREATE INDEX IF NOT EXISTS transactions_txid ON transactions (txid);
+CREATE INDEX IF NOT EXISTS transactions_sender ON transactions (sender, height);
+CREATE INDEX IF NOT EXISTS transactions_receiver ON transactions (receiver, height);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SQLiteStore(ChainStore):
+    """
+    Lưu chain trong cơ sở dữ liệu SQLite (chế độ WAL).
+
+    Header của khối nằm trong bảng blocks, giao dịch nằm trong bảng
+    transactions với index theo txid, người gửi và người nhận, nên số dư và
+    lịch sử giao dịch của một địa chỉ được trả lời bằng truy vấn có index
+    thay vì duyệt mọi khối. Mỗi lần sync() được ghi trong một transaction
+    duy nhất (nhiều khối, một lần commit).
+
+    Khi pruning, các dòng giao dịch trước checkpoint bị xóa cùng transaction
+    với việc ghi checkpoint, sau đó trang trống được trả lại (file tạo trước
+    khi có pruning thì trang trống được dùng lại cho khối mới).
+    """
+
+    def __init__(self, filename="data/blockchain.db"):
+        """
+        Mở (hoặc tạo mới) cơ sở dữ liệu.
+
+        Args:
+            filename: Đường dẫn file SQLite
+        """
+        super().__init__()
+        self.filename = filename
+        self._lock = threading.RLock()
+        # Tự quản lý transaction (BEGIN/COMMIT) để gom nhiều khối vào một commit
+        self.conn = sqlite3.connect(filename, isolation_level=None, check_same_thread=False)
+        # Trả lại trang trống cho hệ điều hành sau khi pruning (chỉ có tác dụng với file mới)
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._height = self._count_blocks()
+        self._checkpoint = self._read_checkpoint()
+
+    def _count_blocks(self):
+        return self.conn.execute("SELECT COUNT(*) FROM blocks").fetchone()[0]
+
+    @contextmanager
+    def _transaction(self):
+        """Gom các lệnh ghi vào một transaction (lồng nhau thì dùng chung)"""
+        with self._lock:
+            if self.conn.in_transaction:
+                yield
+                return
+            self.conn.execute("BEGIN")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                self._height = self._count_blocks()
+                self._checkpoint = self._read_checkpoint()
+                raise
+            self.conn.execute("COMMIT")
+
+    # ------------------------------------------------------------------
+    # ChainStore
+    # ------------------------------------------------------------------
+
+    @property
+    def height(self):
+        return self._height
+
+    def block_hash(self, height):
+        with self._lock:
+            row = self.conn.execute("SELECT hash FROM blocks WHERE height = ?", (height,)).fetchone()
+        if row is None:
+            raise IndexError(f"Không có khối ở độ cao {height}")
+        return row[0]
+
+    def height_of(self, block_hash):
+        with self._lock:
+            row = self.conn.execute("SELECT height FROM blocks WHERE hash = ?", (block_hash,)).fetchone()
+        return row[0] if row else None
+
+    def append(self, block_data):
+        header = {key: value for key, value in block_data.items() if key != "transactions"}
+        with self._transaction():
+            height = self._height
+            self.conn.execute("INSERT INTO blocks (height, hash, header) VALUES (?, ?, ?)",
+                              (height, block_data["hash"], json.dumps(header)))
+            self.conn.executemany(
+                "INSERT INTO transactions (height, position, txid, sender, receiver, amount, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(height, position, transaction_hash(tx), tx["sender"], tx["receiver"],
+                  tx["amount"], json.dumps(tx))
+                 for position, tx in enumerate(block_data["transactions"])])
+            self._height += 1
+
+    def truncate(self, height):
+        with self._transaction():
+            if height >= self._height:
+                return
+            self.pin_chains(height)
+            self.conn.execute("DELETE FROM transactions WHERE height >= ?", (height,))
+            self.conn.execute("DELETE FROM blocks WHERE height >= ?", (height,))
+            self._height = height
+
+    def sync(self, chain, pending_transactions=None):
+        with self._transaction():
+            return super().sync(chain, pending_transactions)
+
+    def import_blocks(self, blocks, on_progress=None, progress_interval=PROGRESS_INTERVAL):
+        count = 0
+        iterator = iter(blocks)
+        while True:
+            # Mỗi transaction gồm IMPORT_BATCH khối
+            with self._transaction():
+                batch = 0
+                for block_data in iterator:
+                    self.append(block_data)
+                    batch += 1
+                    count += 1
+                    if on_progress and count % progress_interval == 0:
+                        on_progress(count)
+                    if batch == IMPORT_BATCH:
+                        break
+            if batch < IMPORT_BATCH:
+                return count
+
+    def _read_range(self, start, end):
+        """Đọc các khối có độ cao trong [start, end)"""
+        with self._lock:
+            headers = self.conn.execute(
+                "SELECT height, header FROM blocks WHERE height >= ? AND height < ? ORDER BY height",
+                (start, end)).fetchall()
+            rows = self.conn.execute(
+                "SELECT height, data FROM transactions WHERE height >= ? AND height < ? "
+                "ORDER BY height, position", (start, end)).fetchall()
+
+        transactions = {}
+        for height, data in rows:
+            transactions.setdefault(height, []).append(json.loads(data))
+
+        pruned_height = self.pruned_height
+        blocks = []
+        for height, header in headers:
+            block_data = json.loads(header)
+            block_data["transactions"] = transactions.get(height, [])
+            if height < pruned_height:
+                block_data["pruned"] = True
+            blocks.append(block_data)
+        return blocks
+
+    def read(self, height):
+        blocks = self._read_range(height, height + 1)
+        if not blocks:
+            raise IndexError(f"Không có khối ở độ cao {height}")
+        return blocks[0]
+
+    def iter_blocks(self, start=0):
+        for batch_start in range(start, self.height, READ_BATCH):
+            yield from self._read_range(batch_start, min(batch_start + READ_BATCH, self.height))
+
+    def load_pending(self):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'pending'").fetchone()
+        return json.loads(row[0]) if row else []
+
+    def save_pending(self, transactions):
+        with self._transaction():
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('pending', ?)",
+                              (json.dumps(transactions),))
+
+    # ------------------------------------------------------------------
+    # Pruning
+    # ------------------------------------------------------------------
+
+    def _read_checkpoint(self):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'checkpoint'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load_checkpoint(self):
+        return self._checkpoint
+
+    def save_checkpoint(self, checkpoint):
+        with self._transaction():
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('checkpoint', ?)",
+                              (json.dumps(checkpoint),))
+            self._checkpoint = checkpoint
+
+    def prune(self, keep):
+        with self._lock:
+            # Checkpoint và việc xóa giao dịch được commit cùng nhau
+            with self._transaction():
+                pruned = super().prune(keep)
+            if pruned:
+                # executescript chạy lệnh đến hết (execute chỉ giải phóng một trang)
+                self.conn.executescript("PRAGMA incremental_vacuum;")
+                self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return pruned
+
+    def prune_bodies(self, height):
+        with self._transaction():
+            self.conn.execute("DELETE FROM transactions WHERE height < ?", (height,))
+
+    def close(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    # ------------------------------------------------------------------
+    # Truy vấn theo địa chỉ
+    # ------------------------------------------------------------------
+
+    def get_balance(self, address, height):
+        with self._lock:
+            # Giao dịch trước checkpoint đã bị xóa, số dư của chúng nằm trong checkpoint
+            checkpoint = self._checkpoint
+            if checkpoint is not None and height < checkpoint["height"]:
+                return None
+            balance = checkpoint["balances"].get(address, 0) if checkpoint else 0
+            received = self.conn.execute(
+                "SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE receiver = ? AND height < ?",
+                (address, height)).fetchone()[0]
+            sent = self.conn.execute(
+                "SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE sender = ? AND height < ?",
+                (address, height)).fetchone()[0]
+        return balance + received - sent
+
+    def get_transactions(self, address, height):
+        with self._lock:
+            if self._checkpoint is not None and height < self._checkpoint["height"]:
+                return None
+            # Giữ thứ tự giao dịch trong cùng một khối (position); UNION chỉ gộp
+            # giao dịch tự gửi cho chính mình (cùng height và position)
+            rows = self.conn.execute(
+                "SELECT height, position, data FROM transactions WHERE sender = ? AND height < ? "
+                "UNION "
+                "SELECT height, position, data FROM transactions WHERE receiver = ? AND height < ? "
+                "ORDER BY height, position", (address, height, address, height)).fetchall()
+        return [(height, json.loads(data)) for height, _, data in rows]
+
+    def find_transaction(self, txid):
+        """
+        Tìm giao dịch theo txid (hash của giao dịch).
+
+        Args:
+            txid: Hash của giao dịch
+
+        Returns:
+            tuple: (độ cao khối, giao dịch), None nếu không tìm thấy
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT height, data FROM transactions WHERE txid = ?",
+                                    (txid,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
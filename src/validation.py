@@ -0,0 +1,386 @@
+import itertools
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from types import SimpleNamespace
+
+from src.blockchain import (Block, RULE_HASH, RULE_MERKLE_ROOT, check_linkage,
+                            check_transactions, header_hash)
+from src.difficulty import hash_meets_target
+from src.merkle import compute_merkle_root
+
+# Chain ngắn hơn ngưỡng này được xác thực ngay trong tiến trình hiện tại
+PARALLEL_THRESHOLD = 2000
+
+# Số khối trong mỗi đoạn giao cho một worker
+SEGMENT_SIZE = 1000
+
+# Khối có nhiều giao dịch hơn ngưỡng này được kiểm tra thân khối trên pool
+BODY_POOL_THRESHOLD = 256
+
+# Biến toàn cục trong tiến trình worker (được gán bởi _init_worker)
+_current_job = None
+
+
+def _init_worker(current_job):
+    """
+    Khởi tạo tiến trình worker.
+
+    Args:
+        current_job: Giá trị dùng chung chứa mã lần xác thực đang chạy
+    """
+    global _current_job
+    _current_job = current_job
+
+
+def block_header(block_data):
+    """
+    Lấy header của khối từ dữ liệu dạng dict mà không dựng Block (không đọc
+    danh sách giao dịch, không tính Merkle root).
+
+    Args:
+        block_data: Dữ liệu khối dạng dict
+
+    Returns:
+        SimpleNamespace: Header với index, timestamp, merkle_root (None với
+                         dữ liệu cũ), previous_hash, proof, target và hash
+    """
+    target = block_data.get("target")
+    return SimpleNamespace(
+        index=block_data["index"],
+        timestamp=block_data["timestamp"],
+        merkle_root=block_data.get("merkle_root"),
+        previous_hash=block_data["previous_hash"],
+        proof=block_data["proof"],
+        target=int(target, 16) if target is not None else Block.DEFAULT_TARGET,
+        hash=block_data["hash"]
+    )
+
+
+def check_body(block_data):
+    """
+    Xác thực thân khối (giai đoạn 2): cấu trúc các giao dịch và Merkle root
+    ghi trong header. Với dữ liệu cũ không có Merkle root, hash của khối
+    được kiểm tra tại đây.
+
+    Args:
+        block_data: Dữ liệu khối dạng dict (header đã được xác thực)
+
+    Returns:
+        str: Tên quy tắc bị vi phạm, None nếu hợp lệ
+    """
+    transactions = block_data["transactions"]
+    rule = check_transactions(transactions)
+    if rule is not None:
+        return rule
+
+    root = compute_merkle_root(transactions)
+    if block_data.get("merkle_root") is None:
+        header = block_header(block_data)
+        if header_hash(header.index, header.timestamp, root, header.previous_hash,
+                       header.proof, header.target) != header.hash:
+            return RULE_HASH
+    elif root != block_data["merkle_root"]:
+        return RULE_MERKLE_ROOT
+    return None
+
+
+def common_prefix_length(chain, local_chain):
+    """
+    Tìm độ dài phần đầu chung (theo hash) giữa chain nhận được và chain cục bộ.
+
+    Hash của mỗi khối phụ thuộc previous_hash nên phần trùng nhau luôn là một
+    đoạn đầu liên tục; dùng tìm kiếm nhị phân để chỉ so sánh O(log n) khối.
+
+    Args:
+        chain: Chain nhận được (dạng list các dict)
+        local_chain: Chain cục bộ (danh sách Block đã xác thực)
+
+    Returns:
+        int: Số khối đầu tiên có hash giống nhau
+    """
+    low, high = 0, min(len(chain), len(local_chain))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if chain[middle - 1]["hash"] == local_chain[middle - 1].hash:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def find_invalid_link(blocks, retargeter, history=(), known=None):
+    """
+    Giai đoạn header: kiểm tra tuần tự index, liên kết previous_hash,
+    timestamp, hash của header, target theo điều chỉnh độ khó và hash đạt
+    target. Bước này không đọc danh sách giao dịch nên chạy rất nhanh.
+
+    Args:
+        blocks: Các khối cần kiểm tra (dạng list các dict)
+        retargeter: Bộ điều chỉnh độ khó dùng để tính target
+        history: Header của các khối cục bộ đã xác thực ngay trước blocks
+                 (chỉ cần window + 1 khối cuối); rỗng nếu blocks bắt đầu từ
+                 genesis
+        known: {vị trí: Block đã xác thực} (từ ValidatedBlockCache): header
+               của các khối này không bị băm lại
+
+    Returns:
+        int: Vị trí (trong blocks) của khối không hợp lệ đầu tiên, None nếu hợp lệ
+    """
+    known = known or {}
+    if history:
+        history = list(history[-(retargeter.window + 1):])
+        first = 0
+    else:
+        if not blocks or blocks[0]["index"] != 0:
+            return 0
+        history = [block_header(blocks[0])]
+        first = 1
+    previous = history[-1]
+
+    for i in range(first, len(blocks)):
+        # Khối đã xác thực: dùng header đã lưu, không băm lại
+        cached = known.get(i)
+        header = cached or block_header(blocks[i])
+
+        if check_linkage(header, previous, history) is not None:
+            return i
+
+        # Hash của header (dữ liệu cũ không có Merkle root được kiểm tra ở
+        # giai đoạn thân khối)
+        if cached is None and header.merkle_root is not None and header_hash(
+                header.index, header.timestamp, header.merkle_root, header.previous_hash,
+                header.proof, header.target) != header.hash:
+            return i
+
+        if header.target != retargeter.next_target(history):
+            return i
+        if not hash_meets_target(header.hash, header.target):
+            return i
+
+        history.append(header)
+        if len(history) > retargeter.window + 1:
+            history.pop(0)
+        previous = header
+
+    return None
+
+
+def find_invalid_body(entries, should_stop=None):
+    """
+    Xác thực thân của từng khối (xem check_body).
+
+    Args:
+        entries: Danh sách (vị trí trong chain, khối dạng dict)
+        should_stop: Hàm không tham số, trả về True nếu cần dừng
+
+    Returns:
+        int: Vị trí khối không hợp lệ đầu tiên, None nếu tất cả đều đúng
+             (hoặc đã bị dừng)
+    """
+    for position, block_data in entries:
+        if should_stop and should_stop():
+            return None
+        if check_body(block_data) is not None:
+            return position
+    return None
+
+
+def _verify_segment(task):
+    """
+    Xác thực thân của một đoạn khối trong tiến trình worker.
+
+    Args:
+        task: Tuple (job_id, entries)
+
+    Returns:
+        int: Vị trí khối không hợp lệ đầu tiên, None nếu hợp lệ
+    """
+    job_id, entries = task
+
+    # Dừng sớm nếu lần xác thực đã kết thúc (một đoạn khác không hợp lệ)
+    return find_invalid_body(entries, should_stop=lambda: _current_job.value != job_id)
+
+
+class ChainValidator:
+    """
+    Xác thực khối và chain nhận từ node khác theo hai giai đoạn.
+
+    Phần đầu trùng với chain cục bộ (đã được xác thực) được bỏ qua, chỉ phần
+    khác biệt phía sau cần xác thực. Giai đoạn header (index, previous_hash,
+    timestamp, hash, target) được kiểm tra tuần tự trước và loại bỏ dữ liệu
+    rác ngay. Khi header đã đúng, thân của mỗi khối (giao dịch, Merkle root)
+    được kiểm tra độc lập, nên chain được chia thành các đoạn liên tiếp và
+    kiểm tra song song trên một pool tiến trình; lần xác thực dừng ngay khi
+    một đoạn phát hiện khối sai. Các khối đã có
+    trong cache (ValidatedBlockCache) không cần băm lại.
+    """
+
+    def __init__(self, retargeter, workers=None, segment_size=SEGMENT_SIZE,
+                 parallel_threshold=PARALLEL_THRESHOLD, cache=None):
+        """
+        Khởi tạo bộ xác thực.
+
+        Args:
+            retargeter: Bộ điều chỉnh độ khó dùng để tính target
+            workers: Số tiến trình worker (mặc định: số lõi CPU)
+            segment_size: Số khối trong mỗi đoạn
+            parallel_threshold: Độ dài chain tối thiểu để băm song song
+            cache: ValidatedBlockCache dùng chung với Blockchain (tùy chọn)
+        """
+        self.retargeter = retargeter
+        self.cache = cache
+        self.workers = workers or os.cpu_count() or 1
+        self.segment_size = segment_size
+        self.parallel_threshold = parallel_threshold
+        self._context = mp.get_context("spawn")
+        self._executor = None
+        self._current_job = None
+        self._job_counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        """Tạo pool worker ở lần dùng đầu tiên và giữ lại cho các lần sau"""
+        if self._executor is None:
+            self._current_job = self._context.RawValue('q', 0)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=self._context,
+                initializer=_init_worker,
+                initargs=(self._current_job,)
+            )
+        return self._executor
+
+    def _lookup_known(self, blocks, first):
+        """Tìm các khối đã xác thực trong cache, theo vị trí trong blocks"""
+        known = {}
+        if self.cache is not None:
+            for position in range(first, len(blocks)):
+                block = self.cache.lookup(blocks[position])
+                if block is not None:
+                    known[position] = block
+        return known
+
+    def find_invalid(self, blocks, history=(), known=None):
+        """
+        Tìm khối không hợp lệ đầu tiên được phát hiện trong các khối nhận được.
+
+        Args:
+            blocks: Các khối cần xác thực (dạng list các dict): cả chain, hoặc
+                    phần phía sau đoạn đầu chung với chain cục bộ (xem
+                    common_prefix_length)
+            history: Header (hoặc Block) của các khối cục bộ ngay trước blocks,
+                     chỉ cần window + 1 khối cuối; rỗng nếu blocks bắt đầu từ genesis
+            known: {vị trí: Block đã xác thực} không cần băm lại
+                   (mặc định: tra trong cache)
+
+        Returns:
+            int: Vị trí (trong blocks) của khối không hợp lệ, None nếu hợp lệ
+        """
+        first = 0 if history else 1
+        if known is None:
+            known = self._lookup_known(blocks, first)
+
+        invalid = find_invalid_link(blocks, self.retargeter, history, known)
+        if invalid is not None:
+            return invalid
+
+        entries = [(position, blocks[position]) for position in range(first, len(blocks))
+                   if position not in known]
+
+        if self.workers <= 1 or len(entries) < self.parallel_threshold:
+            return find_invalid_body(entries)
+
+        with self._lock:
+            executor = self._get_executor()
+            job_id = next(self._job_counter)
+            self._current_job.value = job_id
+
+            pending = {
+                executor.submit(_verify_segment, (job_id, entries[start:start + self.segment_size]))
+                for start in range(0, len(entries), self.segment_size)
+            }
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        invalid = future.result()
+                        if invalid is not None:
+                            return invalid
+                return None
+            finally:
+                # Hủy các đoạn chưa chạy và báo cho các đoạn đang chạy dừng lại
+                self._current_job.value = 0
+                for future in pending:
+                    future.cancel()
+
+    def check_body(self, block_data):
+        """
+        Xác thực thân của một khối (header đã được xác thực). Khối lớn được
+        kiểm tra trên pool tiến trình để không chiếm thread mạng.
+
+        Args:
+            block_data: Dữ liệu khối dạng dict
+
+        Returns:
+            str: Tên quy tắc bị vi phạm, None nếu hợp lệ
+        """
+        if self.workers <= 1 or len(block_data["transactions"]) < BODY_POOL_THRESHOLD:
+            return check_body(block_data)
+        with self._lock:
+            executor = self._get_executor()
+        return executor.submit(check_body, block_data).result()
+
+    def validate(self, blocks, history=()):
+        """
+        Xác thực các khối nhận được (xem find_invalid).
+
+        Args:
+            blocks: Các khối cần xác thực (dạng list các dict)
+            history: Header của các khối cục bộ ngay trước blocks
+
+        Returns:
+            bool: True nếu hợp lệ, False nếu không
+        """
+        return self.find_invalid(blocks, history) is None
+
+    def resolve(self, blocks, history=()):
+        """
+        Xác thực các khối nhận được và dựng danh sách Block tương ứng.
+
+        Các khối đã có trong cache dùng lại đối tượng Block đã lưu thay cho dữ
+        liệu nhận được; các khối còn lại được dựng từ dict và thêm vào cache.
+        Chỉ các khối trong blocks được dựng, phần đầu chung với chain cục bộ
+        không bị sao chép hay xác thực lại.
+
+        Args:
+            blocks: Các khối cần xác thực (dạng list các dict)
+            history: Header của các khối cục bộ ngay trước blocks (tối đa
+                     window + 1 khối); rỗng nếu blocks bắt đầu từ genesis
+
+        Returns:
+            list: Danh sách Block tương ứng với blocks nếu hợp lệ, None nếu không
+        """
+        first = 0 if history else 1
+        known = self._lookup_known(blocks, first)
+        if self.find_invalid(blocks, history, known) is not None:
+            return None
+
+        resolved = [] if history else [Block.from_dict(blocks[0])]
+        for position in range(first, len(blocks)):
+            block = known.get(position)
+            if block is None:
+                # Merkle root đã được xác thực ở giai đoạn thân khối
+                block = Block.from_dict(blocks[position], verified=True)
+                if self.cache is not None:
+                    self.cache.add(block)
+            resolved.append(block)
+        return resolved
+
+    def close(self):
+        """Dừng các tiến trình worker"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
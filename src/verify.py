@@ -0,0 +1,235 @@
+import json
+import time
+
+from src.blockchain import (Block, RULE_HASH, RULE_INDEX, RULE_PROOF, RULE_TARGET,
+                            check_linkage, check_transactions)
+from src.difficulty import Retargeter, hash_meets_target
+
+# Số byte đọc mỗi lần từ file
+READ_SIZE = 1 << 16
+
+# Kích thước tối đa của một khối (byte), tránh đọc hết file khi dữ liệu hỏng
+MAX_VALUE_SIZE = 64 << 20
+
+# Số khối giữa hai lần báo tiến độ
+PROGRESS_INTERVAL = 10000
+
+_decoder = json.JSONDecoder()
+
+
+class _JsonStream:
+    """
+    Đọc tuần tự các giá trị JSON từ file, chỉ giữ trong bộ nhớ phần dữ liệu
+    chưa được phân tích (không lớn hơn một khối).
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.bytes_read = 0
+        self.eof = False
+
+    def _fill(self, size=READ_SIZE):
+        """Đọc thêm dữ liệu vào bộ đệm, bỏ phần đã phân tích"""
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.bytes_read += len(chunk.encode())
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Lấy ký tự khác khoảng trắng tiếp theo (không tiêu thụ), "" nếu hết file"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        """Tiêu thụ ký tự char (bỏ qua khoảng trắng phía trước)"""
+        if self.peek() != char:
+            raise ValueError(f"File chain không hợp lệ: cần '{char}' tại byte ~{self.bytes_read}")
+        self.pos += 1
+
+    def value(self):
+        """Phân tích một giá trị JSON hoàn chỉnh, đọc thêm dữ liệu nếu cần"""
+        self.peek()
+        read_size = READ_SIZE
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Giá trị chưa nằm trọn trong bộ đệm
+                if len(self.buffer) - self.pos > MAX_VALUE_SIZE or not self._fill(read_size):
+                    raise
+                read_size *= 2
+                continue
+            # Số ở cuối bộ đệm có thể còn chữ số chưa đọc
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(filename, key, on_bytes=None):
+    """
+    Đọc lần lượt từng phần tử của mảng tại khóa key trong file JSON dạng
+    object (ví dụ "chain" hoặc "pending_transactions" của file blockchain)
+    mà không nạp toàn bộ file vào bộ nhớ.
+
+    Args:
+        filename: Đường dẫn file
+        key: Khóa của mảng cần đọc
+        on_bytes: Hàm nhận số byte đã đọc sau mỗi phần tử (tùy chọn)
+
+    Yields:
+        Từng phần tử của mảng theo thứ tự trong file
+    """
+    with open(filename, 'r') as f:
+        stream = _JsonStream(f)
+        stream.expect("{")
+        while stream.peek() != "}":
+            name = stream.value()
+            stream.expect(":")
+            if stream.peek() != "[":
+                stream.value()
+            else:
+                # Mảng được đọc từng phần tử (kể cả khi chỉ bỏ qua), nên mảng
+                # lớn như chain không bao giờ phải nằm trọn trong bộ nhớ
+                stream.expect("[")
+                while stream.peek() != "]":
+                    item = stream.value()
+                    if name == key:
+                        yield item
+                        if on_bytes:
+                            on_bytes(stream.bytes_read)
+                    if stream.peek() == ",":
+                        stream.pos += 1
+                stream.expect("]")
+                if name == key:
+                    return
+            if stream.peek() == ",":
+                stream.pos += 1
+        raise ValueError(f"File không có khóa '{key}'")
+
+
+def iter_chain_file(filename="data/blockchain.json", on_bytes=None):
+    """
+    Đọc lần lượt từng khối trong file blockchain (định dạng của
+    Blockchain.save_to_file) mà không nạp toàn bộ file vào bộ nhớ.
+
+    Args:
+        filename: Đường dẫn file blockchain
+        on_bytes: Hàm nhận số byte đã đọc sau mỗi khối (tùy chọn)
+
+    Yields:
+        dict: Dữ liệu từng khối theo thứ tự trong chain
+    """
+    return iter_json_array(filename, "chain", on_bytes)
+
+
+def verify_blocks(blocks, retargeter=None, on_progress=None,
+                  progress_interval=PROGRESS_INTERVAL):
+    """
+    Xác thực một dãy khối được đọc tuần tự.
+
+    Chỉ giữ header của window + 1 khối gần nhất (cần cho điều chỉnh độ khó),
+    nên bộ nhớ sử dụng không phụ thuộc độ dài chain. Khối đã pruning (chỉ
+    còn header) được xác thực header theo Merkle root đã lưu.
+
+    Args:
+        blocks: Iterable các khối dạng dict, bắt đầu từ genesis
+        retargeter: Bộ điều chỉnh độ khó (mặc định: Retargeter())
+        on_progress: Hàm nhận (số khối đã xác thực, số giây đã chạy)
+        progress_interval: Số khối giữa hai lần gọi on_progress
+
+    Returns:
+        dict: {"valid", "blocks", "invalid_index", "rule", "seconds"}
+    """
+    retargeter = retargeter or Retargeter()
+    history = []
+    start_time = time.time()
+    previous = None
+    count = 0
+
+    def result(rule=None):
+        return {
+            "valid": rule is None,
+            "blocks": count,
+            "invalid_index": count if rule is not None else None,
+            "rule": rule,
+            "seconds": time.time() - start_time
+        }
+
+    for block_data in blocks:
+        pruned = block_data.get("pruned", False)
+        block = Block.from_dict(block_data, verified=pruned)
+
+        if previous is None:
+            # Khối genesis
+            if block.index != 0:
+                return result(RULE_INDEX)
+        else:
+            rule = check_linkage(block, previous, history)
+            if rule is not None:
+                return result(rule)
+
+            block_hash = block.calculate_hash()
+            if block_hash != block.hash:
+                return result(RULE_HASH)
+            if block.target != retargeter.next_target(history):
+                return result(RULE_TARGET)
+            if not hash_meets_target(block_hash, block.target):
+                return result(RULE_PROOF)
+            rule = None if pruned else check_transactions(block.transactions)
+            if rule is not None:
+                return result(rule)
+
+        # Chỉ giữ lại header, bỏ danh sách giao dịch
+        block.transactions = None
+        history.append(block)
+        if len(history) > retargeter.window + 1:
+            history.pop(0)
+        previous = block
+        count += 1
+
+        if on_progress and count % progress_interval == 0:
+            on_progress(count, time.time() - start_time)
+
+    if previous is None:
+        return result(RULE_INDEX)
+    return result()
+
+
+def verify_chain_file(filename="data/blockchain.json", retargeter=None, on_progress=None,
+                      progress_interval=PROGRESS_INTERVAL):
+    """
+    Xác thực toàn bộ chain trong file, đọc và kiểm tra từng khối một.
+
+    Args:
+        filename: Đường dẫn file blockchain
+        retargeter: Bộ điều chỉnh độ khó (mặc định: Retargeter())
+        on_progress: Hàm nhận (số khối, số giây, số byte đã đọc)
+        progress_interval: Số khối giữa hai lần gọi on_progress
+
+    Returns:
+        dict: Kết quả như verify_blocks, thêm "bytes" đã đọc
+    """
+    bytes_read = [0]
+
+    def track(count):
+        bytes_read[0] = count
+
+    def progress(count, seconds):
+        on_progress(count, seconds, bytes_read[0])
+
+    result = verify_blocks(iter_chain_file(filename, track), retargeter,
+                           progress if on_progress else None, progress_interval)
+    result["bytes"] = bytes_read[0]
+    return result
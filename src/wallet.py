@@ -5,6 +5,8 @@ import random
 import string
 from datetime import datetime
 
+from src.atomic_file import atomic_write
+
 class Wallet:
     def __init__(self, blockchain):
         self.blockchain = blockchain
@@ -31,6 +33,29 @@ class Wallet:
         
         return address
     
+    def _indexed_height(self, chain):
+        """
+        Số khối đầu tiên của chain đã được lưu trong store (có thể truy vấn
+        theo địa chỉ thay vì duyệt từng khối).
+        
+        Args:
+            chain: Danh sách khối hiện tại
+            
+        Returns:
+            int: Số khối, 0 nếu không có store hoặc store không khớp với chain.
+                 Store đã pruning thì không nhỏ hơn độ cao checkpoint: giao dịch
+                 của các khối trước đó chỉ còn trong số dư của checkpoint
+        """
+        store = self.blockchain.store
+        if store is None:
+            return 0
+        height = min(store.height, len(chain))
+        # Hash khối cuối khớp nghĩa là toàn bộ phần trước cũng khớp
+        if not (height and store.block_hash(height - 1) == chain[height - 1].hash):
+            # Chain đã reorg nhưng chưa lưu: dùng phần đầu chung
+            height = store.common_height(chain)
+        return max(height, store.pruned_height)
+    
     def get_balance(self, address=None):
         """
         Lấy số dư của một địa chỉ.
@@ -48,9 +73,19 @@ class Wallet:
             return 0
         
         balance = 0
-        
-        # Duyệt qua tất cả các khối
-        for block in self.blockchain.chain:
+        # Đọc từ ảnh chụp để chain và giao dịch chờ nhất quán với nhau
+        snapshot = self.blockchain.snapshot()
+        start = 0
+        
+        # Phần chain đã lưu trong store có index theo địa chỉ được truy vấn trực tiếp
+        height = self._indexed_height(snapshot)
+        if height:
+            stored = self.blockchain.store.get_balance(address, height)
+            if stored is not None:
+                balance, start = stored, height
+        
+        # Duyệt qua các khối còn lại
+        for block in snapshot[start:]:
             for tx in block.transactions:
                 if tx["receiver"] == address:
                     balance += tx["amount"]
@@ -58,7 +93,7 @@ class Wallet:
                     balance -= tx["amount"]
         
         # Kiểm tra cả giao dịch đang chờ
-        for tx in self.blockchain.pending_transactions:
+        for tx in snapshot.pending_transactions:
             if tx["receiver"] == address:
                 balance += tx["amount"]
             if tx["sender"] == address:
@@ -107,9 +142,23 @@ class Wallet:
             return []
         
         transactions = []
-        
-        # Duyệt qua tất cả các khối
-        for block in self.blockchain.chain:
+        # Đọc từ ảnh chụp để chain và giao dịch chờ nhất quán với nhau
+        snapshot = self.blockchain.snapshot()
+        start = 0
+        
+        # Phần chain đã lưu trong store có index theo địa chỉ được truy vấn trực tiếp
+        height = self._indexed_height(snapshot)
+        if height:
+            stored = self.blockchain.store.get_transactions(address, height)
+            if stored is not None:
+                for block_index, tx in stored:
+                    tx["block_index"] = block_index
+                    tx["confirmed"] = True
+                    transactions.append(tx)
+                start = height
+        
+        # Duyệt qua các khối còn lại
+        for block in snapshot[start:]:
             for tx in block.transactions:
                 if tx["sender"] == address or tx["receiver"] == address:
                     tx_copy = tx.copy()
@@ -118,7 +167,7 @@ class Wallet:
                     transactions.append(tx_copy)
         
         # Thêm giao dịch đang chờ
-        for tx in self.blockchain.pending_transactions:
+        for tx in snapshot.pending_transactions:
             if tx["sender"] == address or tx["receiver"] == address:
                 tx_copy = tx.copy()
                 tx_copy["confirmed"] = False
@@ -144,8 +193,7 @@ class Wallet:
             "current_address": self.current_address
         }
         
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=4)
+        atomic_write(filename, json.dumps(data, indent=4).encode())
     
     def load_from_file(self, filename="data/wallet.json"):
         """
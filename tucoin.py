@@ -4,23 +4,212 @@ import sys
 import threading
 import time
 import argparse
-from src.blockchain import Blockchain
+from src.blockchain import Block, Blockchain
+from src.difficulty import Retargeter
 from src.wallet import Wallet
 from src.network import Network
-from src.consensus import set_consensus
+from src.persistence import PersistenceService
+from src.pool import MiningPool
+from src.storage import BlockLog, SQLiteStore
+from src.storage.block_log import SEGMENT_SIZE
+from src.bootstrap import export_bootstrap, import_bootstrap
+from src.verify import iter_chain_file, iter_json_array, verify_blocks, verify_chain_file
+from src.consensus import pow_consensus
 from ui.main_window import MainWindow
 
+# Số khối tối thiểu được giữ đầy đủ khi pruning (cũng là độ sâu reorg tối đa)
+MIN_PRUNE_DEPTH = 100
+
 def create_data_dir():
     """Tạo thư mục data nếu chưa tồn tại"""
     os.makedirs("data", exist_ok=True)
 
+def migrate_json(store, filename="data/blockchain.json", retargeter=None):
+    """
+    Chuyển chain từ file JSON cũ sang store, đọc và ghi từng khối một (không
+    nạp toàn bộ file vào bộ nhớ), in tiến độ ra màn hình.
+    
+    Chain được xác thực trước khi chuyển: chain không hợp lệ (ví dụ tạo theo
+    quy tắc hash cũ) không được nhập, vì các node khác sẽ từ chối mọi khối
+    đào tiếp trên nó.
+    
+    Args:
+        store: ChainStore nhận các khối (đang trống)
+        filename: File blockchain JSON
+        retargeter: Bộ điều chỉnh độ khó dùng để xác thực (mặc định: Retargeter())
+    
+    Returns:
+        bool: True nếu chuyển thành công
+    """
+    try:
+        result = verify_chain_file(filename, retargeter)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Không thể đọc {filename}: {e}")
+        return False
+    if not result["valid"]:
+        print(f"Không chuyển {filename}: chain không hợp lệ tại khối #{result['invalid_index']} "
+              f"(sai {result['rule']})")
+        return False
+    
+    start = time.time()
+    bytes_read = [0]
+    
+    def track(count):
+        bytes_read[0] = count
+    
+    def progress(blocks):
+        print(f"Đã chuyển {blocks} khối ({bytes_read[0] / (1 << 20):.1f} MB, "
+              f"{time.time() - start:.1f} giây)")
+    
+    try:
+        # Chuẩn hóa qua Block để khối định dạng cũ có đủ merkle_root và target
+        blocks = (Block.from_dict(block_data).to_dict()
+                  for block_data in iter_chain_file(filename, track))
+        count = store.import_blocks(blocks, progress)
+        store.save_pending(list(iter_json_array(filename, "pending_transactions")))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Không thể chuyển dữ liệu từ {filename}: {e}")
+        store.truncate(0)
+        return False
+    
+    print(f"Đã chuyển {count} khối trong {time.time() - start:.1f} giây")
+    return True
+
+def open_store(storage):
+    """
+    Mở kho lưu trữ chain theo tùy chọn --storage.
+    
+    Returns:
+        ChainStore: Block log (data/blocks) hoặc SQLite (data/blockchain.db)
+    """
+    if storage == 'sqlite':
+        return SQLiteStore("data/blockchain.db")
+    return BlockLog("data/blocks")
+
+def export_command(args):
+    """
+    Xuất chain trong kho lưu trữ ra file bootstrap.
+    
+    Returns:
+        int: Mã thoát (0 nếu thành công)
+    """
+    create_data_dir()
+    store = open_store(args.storage)
+    start = time.time()
+    print(f"Đang xuất {store.height} khối ra {args.file}...")
+    try:
+        count = export_bootstrap(store, args.file,
+                                 on_progress=lambda blocks: print(f"Đã xuất {blocks} khối"))
+    except (OSError, ValueError) as e:
+        print(f"Không thể xuất file bootstrap: {e}")
+        return 1
+    finally:
+        store.close()
+    
+    size = os.path.getsize(args.file)
+    print(f"Đã xuất {count} khối ({size / (1 << 20):.1f} MB) trong {time.time() - start:.1f} giây")
+    return 0
+
+def import_command(args):
+    """
+    Nhập chain từ file bootstrap vào kho lưu trữ (xác thực theo lô).
+    
+    Returns:
+        int: Mã thoát (0 nếu thành công)
+    """
+    def progress(blocks, total):
+        print(f"Đã nhập {blocks}/{total} khối ({blocks / max(time.time() - start, 1e-9):.0f} khối/giây)")
+    
+    create_data_dir()
+    store = open_store(args.storage)
+    start = time.time()
+    print(f"Đang nhập {args.file} vào kho lưu trữ ({store.height} khối đã có)...")
+    try:
+        count = import_bootstrap(store, args.file, Retargeter(),
+                                 on_progress=progress)
+    except (OSError, ValueError) as e:
+        print(f"Không thể nhập file bootstrap: {e}")
+        return 1
+    finally:
+        store.close()
+    
+    print(f"Đã nhập {count} khối trong {time.time() - start:.1f} giây")
+    return 0
+
+def verify_command(args):
+    """
+    Xác thực chain trong file theo kiểu streaming, in tiến độ ra màn hình.
+    
+    Returns:
+        int: Mã thoát (0 nếu chain hợp lệ)
+    """
+    def progress(blocks, seconds, bytes_read):
+        print(f"Đã xác thực {blocks} khối ({bytes_read / (1 << 20):.1f} MB, "
+              f"{blocks / max(seconds, 1e-9):.0f} khối/giây)")
+    
+    print(f"Đang xác thực {args.file}...")
+    retargeter = Retargeter()
+    try:
+        if os.path.isdir(args.file) or args.file.endswith(".db"):
+            # Thư mục block log hoặc cơ sở dữ liệu SQLite
+            store = BlockLog(args.file) if os.path.isdir(args.file) else SQLiteStore(args.file)
+            try:
+                result = verify_blocks(store.iter_blocks(), retargeter,
+                                       on_progress=lambda blocks, seconds: progress(blocks, seconds, 0))
+            finally:
+                store.close()
+        else:
+            result = verify_chain_file(args.file, retargeter, on_progress=progress)
+    except (OSError, ValueError) as e:
+        print(f"Không thể đọc file chain: {e}")
+        return 2
+    
+    if result["valid"]:
+        print(f"Chain hợp lệ: {result['blocks']} khối, {result['seconds']:.1f} giây")
+        return 0
+    print(f"Chain không hợp lệ tại khối #{result['invalid_index']} (sai {result['rule']})")
+    return 1
+
 def main():
     """Hàm chính của ứng dụng"""
     # Xử lý tham số dòng lệnh
     parser = argparse.ArgumentParser(description='TuCoin Blockchain App')
     parser.add_argument('--port', type=int, default=5000, help='Cổng để lắng nghe (mặc định: 5000)')
     parser.add_argument('--connect', type=str, help='Địa chỉ IP:Port để kết nối khi khởi động')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Số tiến trình dùng để đào PoW (mặc định: 1, 0 = số lõi CPU)')
+    parser.add_argument('--backend', choices=['hashlib', 'numpy'], default='hashlib',
+                        help='Backend băm nonce khi đào PoW (numpy cần cài thêm thư viện numpy)')
+    parser.add_argument('--pool-port', type=int,
+                        help='Chạy pool đào tại cổng này (worker: python -m src.pool IP:Port)')
+    parser.add_argument('--storage', choices=['log', 'sqlite'], default='log',
+                        help='Cách lưu chain: block log (data/blocks) hoặc SQLite (data/blockchain.db)')
+    parser.add_argument('--prune', type=int, metavar='N',
+                        help='Chế độ pruning: chỉ giữ đầy đủ giao dịch của N khối cuối '
+                             f'(tối thiểu {MIN_PRUNE_DEPTH}), các khối cũ hơn chỉ giữ header. '
+                             'Với block log, dung lượng đĩa chỉ được giải phóng khi cả một segment '
+                             f'({SEGMENT_SIZE >> 20} MB) nằm trước checkpoint')
+    subparsers = parser.add_subparsers(dest='command')
+    verify_parser = subparsers.add_parser('verify', help='Xác thực toàn bộ chain trong file (không mở giao diện)')
+    verify_parser.add_argument('--file', type=str, default='data/blockchain.json',
+                               help='File blockchain JSON, thư mục block log hoặc file SQLite (.db) '
+                                    'cần xác thực (mặc định: data/blockchain.json)')
+    export_parser = subparsers.add_parser('export', help='Xuất chain ra file bootstrap nén (không mở giao diện)')
+    export_parser.add_argument('--file', type=str, default='data/bootstrap.dat',
+                               help='File bootstrap cần ghi (mặc định: data/bootstrap.dat)')
+    import_parser = subparsers.add_parser('import', help='Nhập chain từ file bootstrap (không mở giao diện)')
+    import_parser.add_argument('--file', type=str, default='data/bootstrap.dat',
+                               help='File bootstrap cần đọc (mặc định: data/bootstrap.dat)')
     args = parser.parse_args()
+    if args.prune is not None and args.prune < MIN_PRUNE_DEPTH:
+        parser.error(f"--prune phải lớn hơn hoặc bằng {MIN_PRUNE_DEPTH}")
+    
+    if args.command == 'verify':
+        sys.exit(verify_command(args))
+    if args.command == 'export':
+        sys.exit(export_command(args))
+    if args.command == 'import':
+        sys.exit(import_command(args))
     
     port = args.port
     connect_to = args.connect
@@ -30,13 +219,28 @@ def main():
     # Tạo thư mục data
     create_data_dir()
     
+    # Cấu hình số tiến trình đào PoW
+    pow_consensus.set_workers(args.workers or os.cpu_count() or 1)
+    pow_consensus.set_backend(args.backend)
+    
     # Khởi tạo blockchain
-    blockchain = Blockchain()
+    store = open_store(args.storage)
+    blockchain = Blockchain(retargeter=Retargeter(), store=store,
+                            prune_depth=args.prune)
+    if store.pruned_height and not args.prune:
+        print(f"Kho lưu trữ đã pruning tới khối {store.pruned_height}: các khối cũ hơn chỉ còn header")
+    
+    # Chuyển dữ liệu từ file JSON cũ nếu kho lưu trữ còn trống
+    if not store.height and os.path.exists("data/blockchain.json"):
+        print("Đang chuyển blockchain từ file JSON sang kho lưu trữ mới...")
+        migrate_json(store, retargeter=blockchain.retargeter)
     
-    # Tải blockchain từ file nếu có
-    if os.path.exists("data/blockchain.json"):
-        print("Đang tải blockchain từ file...")
-        blockchain.load_from_file()
+    # Chỉ đọc tip và index; thân các khối được đọc khi cần
+    if store.height:
+        start = time.time()
+        blockchain.load()
+        print(f"Đã tải blockchain: {store.height} khối, tip {blockchain.get_last_block().hash[:16]}... "
+              f"({time.time() - start:.2f} giây)")
     
     # Khởi tạo ví
     wallet = Wallet(blockchain)
@@ -61,6 +265,14 @@ def main():
     else:
         print("Không thể khởi động server mạng. Ứng dụng sẽ chạy ở chế độ offline.")
     
+    # Khởi động pool đào nếu được chỉ định
+    pool = None
+    if args.pool_port:
+        pool = MiningPool(blockchain, network, pow_consensus, wallet.current_address,
+                          port=args.pool_port)
+        if not pool.start():
+            pool = None
+    
     # Kết nối đến node khác nếu được chỉ định
     if connect_to:
         try:
@@ -80,23 +292,13 @@ def main():
         except Exception as e:
             print(f"Lỗi khi phân tích địa chỉ kết nối: {e}")
     
-    # Tạo thread để tự động lưu blockchain và ví
-    def auto_save():
-        while True:
-            time.sleep(60)  # Lưu mỗi 60 giây
-            try:
-                blockchain.save_to_file()
-                wallet.save_to_file()
-                print("Đã tự động lưu blockchain và ví")
-            except Exception as e:
-                print(f"Lỗi khi tự động lưu: {e}")
-    
-    save_thread = threading.Thread(target=auto_save, daemon=True)
-    save_thread.start()
+    # Lưu blockchain và ví trên thread nền (chỉ ghi khi có thay đổi)
+    persistence = PersistenceService(blockchain, wallet)
+    persistence.start()
     
     # Khởi động giao diện người dùng
     print("Khởi động giao diện người dùng...")
-    app = MainWindow(blockchain, wallet, network)
+    app = MainWindow(blockchain, wallet, network, persistence)
     
     # Đặt tiêu đề cửa sổ để phân biệt các node
     app.root.title(f"TuCoin Blockchain App - Node {port}")
@@ -105,8 +307,15 @@ def main():
     
     # Lưu dữ liệu trước khi thoát
     print("Đang lưu dữ liệu trước khi thoát...")
-    blockchain.save_to_file()
-    wallet.save_to_file()
+    persistence.stop()
+    if persistence.error is not None:
+        print(f"Blockchain chưa được lưu: {persistence.error}")
+    store.close()
+    
+    # Dừng pool và các tiến trình đào song song
+    if pool:
+        pool.stop()
+    pow_consensus.close()
     
     print("Ứng dụng đã đóng.")
 
@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import os
 import sys
+import threading
 
 # Thêm thư mục gốc vào đường dẫn để import các module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -11,10 +12,11 @@ from ui.wallet_tab import WalletTab
 from ui.network_tab import NetworkTab
 
 class MainWindow:
-    def __init__(self, blockchain, wallet, network):
+    def __init__(self, blockchain, wallet, network, persistence):
         self.blockchain = blockchain
         self.wallet = wallet
         self.network = network
+        self.persistence = persistence
         
         self.root = tk.Tk()
         self.root.title("TuCoin Blockchain App")
@@ -29,8 +31,9 @@ class MainWindow:
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         # Tạo các tab
-        self.wallet_tab = WalletTab(self.notebook, self.blockchain, self.wallet)
-        self.mining_tab = MiningTab(self.notebook, self.blockchain, self.wallet, self.network)
+        self.wallet_tab = WalletTab(self.notebook, self.blockchain, self.wallet, self.persistence)
+        self.mining_tab = MiningTab(self.notebook, self.blockchain, self.wallet, self.network,
+                                    self.persistence)
         self.network_tab = NetworkTab(self.notebook, self.network)
         
         # Thêm các tab vào notebook
@@ -46,6 +49,7 @@ class MainWindow:
         self.status_label.pack(side=tk.LEFT, padx=5)
         
         # Cập nhật trạng thái mỗi 5 giây
+        self._save_error = None
         self.update_status()
     
     def create_menu(self):
@@ -90,17 +94,26 @@ class MainWindow:
     def create_new_wallet(self):
         """Tạo ví mới"""
         address = self.wallet.create_address()
+        self.persistence.request_save()
         messagebox.showinfo("Ví mới", f"Đã tạo ví mới với địa chỉ:\n{address}")
         self.wallet_tab.update_wallet_info()
     
     def backup_blockchain(self):
         """Sao lưu blockchain"""
-        try:
-            self.blockchain.save_to_file()
-            self.wallet.save_to_file()
-            messagebox.showinfo("Sao lưu", "Đã sao lưu blockchain và ví thành công!")
-        except Exception as e:
-            messagebox.showerror("Lỗi", f"Không thể sao lưu: {str(e)}")
+        def backup():
+            try:
+                self.persistence.flush()
+                # Bản sao lưu đầy đủ dạng JSON (đọc được bởi "tucoin.py verify")
+                self.blockchain.save_to_file()
+                self.root.after(0, lambda: messagebox.showinfo(
+                    "Sao lưu", "Đã sao lưu blockchain và ví thành công!"))
+            except Exception as e:
+                message = f"Không thể sao lưu: {str(e)}"
+                self.root.after(0, lambda: messagebox.showerror("Lỗi", message))
+        
+        # Ghi file ở thread riêng để giao diện không bị treo; hộp thoại kết quả
+        # được mở trên thread giao diện (Tkinter không an toàn với thread khác)
+        threading.Thread(target=backup, daemon=True).start()
     
     def change_consensus(self):
         """Thay đổi cơ chế đồng thuận"""
@@ -197,6 +210,14 @@ class MainWindow:
         consensus = get_consensus().get_name()
         
         status_text = f"Khối: {blocks} | Nodes: {nodes} | Cơ chế: {consensus}"
+        
+        # Báo cho người dùng khi blockchain không lưu được (mỗi lỗi một lần)
+        error = self.persistence.error
+        if error is not None:
+            status_text += " | Chưa lưu được blockchain"
+            if str(error) != self._save_error:
+                messagebox.showerror("Lỗi lưu dữ liệu", f"Không thể lưu blockchain: {error}")
+        self._save_error = str(error) if error is not None else None
         self.status_label.config(text=status_text)
         
         # Lập lịch cập nhật tiếp theo
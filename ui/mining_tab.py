@@ -5,17 +5,33 @@ import time
 from datetime import datetime
 
 from src.consensus import get_consensus
+from src.difficulty import target_to_difficulty
+
+# Số giây hiển thị trên biểu đồ hashrate và chu kỳ cập nhật (ms)
+CHART_SECONDS = 60
+STATS_REFRESH_MS = 1000
+
+
+def format_hashrate(rate):
+    """Định dạng hashrate dễ đọc (H/s, kH/s, MH/s)"""
+    for unit in ("H/s", "kH/s", "MH/s"):
+        if rate < 1000:
+            return f"{rate:.1f} {unit}"
+        rate /= 1000
+    return f"{rate:.1f} GH/s"
 
 class MiningTab:
-    def __init__(self, parent, blockchain, wallet, network):
+    def __init__(self, parent, blockchain, wallet, network, persistence):
         self.parent = parent
         self.blockchain = blockchain
         self.wallet = wallet
         self.network = network
+        self.persistence = persistence
         
         self.frame = ttk.Frame(parent)
         self.mining_thread = None
         self.is_mining = False
+        self.stop_event = threading.Event()
         
         self.create_widgets()
     
@@ -56,6 +72,27 @@ class MiningTab:
         self.mining_button = ttk.Button(mining_frame, text="Bắt đầu đào", command=self.toggle_mining)
         self.mining_button.grid(row=1, column=0, columnspan=2, padx=10, pady=10)
         
+        # Frame thống kê hiệu suất đào
+        stats_frame = ttk.LabelFrame(self.frame, text="Hiệu suất đào")
+        stats_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        self.stats_labels = {}
+        stats_fields = [
+            ("hashrate", "Hashrate (10s / 60s / 5m):"),
+            ("hashes", "Tổng số hash:"),
+            ("templates", "Template đã dựng / làm mới / bị bỏ:"),
+            ("block_time", "Thời gian mỗi khối (gần nhất / TB):")
+        ]
+        for row, (key, text) in enumerate(stats_fields):
+            ttk.Label(stats_frame, text=text).grid(row=row, column=0, padx=10, pady=2, sticky=tk.W)
+            self.stats_labels[key] = ttk.Label(stats_frame, text="-")
+            self.stats_labels[key].grid(row=row, column=1, padx=10, pady=2, sticky=tk.W)
+        
+        # Biểu đồ hashrate theo từng giây
+        self.chart = tk.Canvas(stats_frame, height=80, bg="white", highlightthickness=1)
+        self.chart.grid(row=0, column=2, rowspan=len(stats_fields), padx=10, pady=5, sticky=tk.NSEW)
+        stats_frame.columnconfigure(2, weight=1)
+        
         # Frame log
         log_frame = ttk.LabelFrame(self.frame, text="Log đào coin")
         log_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -71,7 +108,7 @@ class MiningTab:
         
         # Cập nhật thông tin
         self.update_consensus_info()
-        self.update_blockchain_info()
+        self.update_mining_stats()
     
     def update_wallet_addresses(self):
         """Cập nhật danh sách địa chỉ ví"""
@@ -86,11 +123,56 @@ class MiningTab:
         consensus = get_consensus()
         self.consensus_label.config(text=consensus.get_name())
         self.difficulty_label.config(text=str(consensus.get_difficulty()))
+        self.update_blockchain_info()
     
     def update_blockchain_info(self):
         """Cập nhật thông tin blockchain"""
         current_block = len(self.blockchain.chain) - 1
         self.current_block_label.config(text=str(current_block))
+        
+        # Với PoW, độ khó thực tế do chain tự điều chỉnh theo thời gian tạo khối
+        if get_consensus().get_name() == "Proof of Work":
+            difficulty = target_to_difficulty(self.blockchain.get_next_target())
+            self.difficulty_label.config(text=f"{difficulty:.2f}")
+    
+    def update_mining_stats(self):
+        """Cập nhật số liệu và biểu đồ hiệu suất đào (chạy định kỳ)"""
+        consensus = get_consensus()
+        
+        if hasattr(consensus, "get_stats"):
+            stats = consensus.get_stats()
+            self.stats_labels["hashrate"].config(text=" / ".join(
+                format_hashrate(stats[f"hashrate_{window}s"]) for window in consensus.stats.windows
+            ))
+            self.stats_labels["hashes"].config(text=f"{stats['hashes']:,}")
+            self.stats_labels["templates"].config(
+                text=f"{stats['templates_built']} / {stats['template_refreshes']} / {stats['stale_templates']}"
+            )
+            if stats["last_block_time"] is not None:
+                self.stats_labels["block_time"].config(
+                    text=f"{stats['last_block_time']:.2f}s / {stats['avg_block_time']:.2f}s"
+                )
+            self.draw_hashrate_chart(consensus.stats.history(CHART_SECONDS))
+        
+        self.frame.after(STATS_REFRESH_MS, self.update_mining_stats)
+    
+    def draw_hashrate_chart(self, history):
+        """Vẽ biểu đồ hashrate từ danh sách số hash mỗi giây"""
+        self.chart.delete("all")
+        width = self.chart.winfo_width()
+        height = self.chart.winfo_height()
+        if width <= 1 or height <= 1 or not history:
+            return
+        
+        peak = max(history) or 1
+        step = width / max(len(history) - 1, 1)
+        points = []
+        for i, count in enumerate(history):
+            points.extend((i * step, height - 5 - (height - 15) * count / peak))
+        
+        self.chart.create_line(*points, fill="#2a7ae2", width=2)
+        self.chart.create_text(5, 5, anchor=tk.NW, text=f"max {format_hashrate(peak)}",
+                               fill="gray", font=("TkDefaultFont", 8))
     
     def toggle_mining(self):
         """Bắt đầu hoặc dừng quá trình đào"""
@@ -126,6 +208,7 @@ class MiningTab:
         
         # Bắt đầu thread đào
         self.is_mining = True
+        self.stop_event.clear()
         self.mining_button.config(text="Dừng đào")
         self.log("Bắt đầu quá trình đào...")
         
@@ -136,6 +219,7 @@ class MiningTab:
     def stop_mining(self):
         """Dừng quá trình đào"""
         self.is_mining = False
+        self.stop_event.set()
         self.mining_button.config(text="Bắt đầu đào")
         self.log("Đã dừng quá trình đào.")
     
@@ -149,8 +233,14 @@ class MiningTab:
                 self.log(f"Đang đào khối mới với cơ chế {consensus.get_name()}...")
                 start_time = time.time()
                 
-                # Đào khối
-                new_block = consensus.mine(self.blockchain, wallet_address)
+                # Đào khối (tự đào lại trên đỉnh mới nếu nhận được khối khác)
+                stats = getattr(consensus, "stats", None)
+                stale_before = stats.stale_templates if stats else 0
+                new_block = consensus.mine(self.blockchain, wallet_address, stop_event=self.stop_event)
+                
+                # Quá trình đào bị hủy
+                if new_block is None:
+                    break
                 
                 # Tính thời gian đào
                 mining_time = time.time() - start_time
@@ -161,11 +251,17 @@ class MiningTab:
                 self.log(f"Thời gian: {mining_time:.2f} giây")
                 self.log(f"Phần thưởng: 100 TuCoin")
                 
+                if stats and stats.stale_templates > stale_before:
+                    self.log(f"Đã bỏ {stats.stale_templates - stale_before} template cũ do có khối mới từ mạng "
+                             f"(tổng ~{stats.stale_hashes_avoided} hash đã tránh được)")
+                if stats:
+                    self.log(f"Hashrate: {format_hashrate(stats.hashrate(60))}")
+                
                 # Cập nhật thông tin blockchain
                 self.update_blockchain_info()
                 
-                # Lưu blockchain
-                self.blockchain.save_to_file()
+                # Lưu blockchain (ghi ở thread nền, không chờ ghi đĩa)
+                self.persistence.request_save()
                 
                 # Broadcast khối mới
                 self.network.broadcast_block(new_block)
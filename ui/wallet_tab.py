@@ -4,10 +4,16 @@ import threading
 from datetime import datetime
 
 class WalletTab:
-    def __init__(self, parent, blockchain, wallet):
+    def __init__(self, parent, blockchain, wallet, persistence):
         self.parent = parent
         self.blockchain = blockchain
         self.wallet = wallet
+        self.persistence = persistence
+        
+        # Số dư của địa chỉ hiện tại ở lần tải gần nhất (None khi đang tải)
+        self.balance = None
+        # Tăng mỗi lần tải lại, kết quả của lần tải cũ hơn bị bỏ qua
+        self.load_id = 0
         
         self.frame = ttk.Frame(parent)
         
@@ -116,31 +122,63 @@ class WalletTab:
         self.update_wallet_addresses()
         self.update_wallet_info()
         
-        # Lưu ví
-        self.wallet.save_to_file()
+        # Lưu ví (ghi ở thread nền)
+        self.persistence.request_save()
     
     def update_wallet_info(self):
         """Cập nhật thông tin ví"""
-        # Cập nhật số dư
-        if self.wallet.current_address:
-            balance = self.wallet.get_balance()
+        self.load_id += 1
+        self.balance = None
+        address = self.wallet.current_address
+        if not address:
+            self.show_wallet_info(self.load_id, address, 0, [])
+            return
+        
+        self.balance_label.config(text="Đang tính...")
+        load_id = self.load_id
+        
+        # Số dư và lịch sử có thể phải duyệt cả chain (store không có index
+        # theo địa chỉ) nên được tính ở thread nền, kết quả đưa về thread giao diện
+        def load():
+            balance = self.wallet.get_balance(address)
+            transactions = self.wallet.get_transaction_history(address)
+            self.frame.after(0, lambda: self.show_wallet_info(load_id, address, balance, transactions))
+        
+        threading.Thread(target=load, daemon=True).start()
+    
+    def show_wallet_info(self, load_id, address, balance, transactions):
+        """
+        Hiển thị số dư và lịch sử giao dịch đã tính (chạy trên thread giao diện).
+        
+        Args:
+            load_id: Lần tải tạo ra kết quả
+            address: Địa chỉ ví đã tính
+            balance: Số dư
+            transactions: Danh sách giao dịch
+        """
+        if load_id != self.load_id:
+            # Đã có lần tải mới hơn (ví dụ người dùng đã chọn ví khác)
+            return
+        
+        if address:
+            self.balance = balance
             self.balance_label.config(text=f"{balance} TuCoin")
         
         # Cập nhật lịch sử giao dịch
-        self.update_transaction_history()
+        self.update_transaction_history(address, transactions)
     
-    def update_transaction_history(self):
-        """Cập nhật lịch sử giao dịch"""
+    def update_transaction_history(self, current_address, transactions):
+        """
+        Cập nhật lịch sử giao dịch.
+        
+        Args:
+            current_address: Địa chỉ ví đang xem
+            transactions: Danh sách giao dịch của địa chỉ đó
+        """
         # Xóa dữ liệu cũ
         for item in self.history_tree.get_children():
             self.history_tree.delete(item)
         
-        # Lấy lịch sử giao dịch
-        if not self.wallet.current_address:
-            return
-            
-        transactions = self.wallet.get_transaction_history()
-        
         # Thêm vào treeview
         for tx in transactions:
             # Xác định loại giao dịch và địa chỉ hiển thị
@@ -148,7 +186,7 @@ class WalletTab:
                 tx_type = "Đào coin"
                 address = "Hệ thống"
                 amount = f"+{tx['amount']}"
-            elif tx["sender"] == self.wallet.current_address:
+            elif tx["sender"] == current_address:
                 tx_type = "Gửi"
                 address = tx["receiver"]
                 amount = f"-{tx['amount']}"
@@ -194,14 +232,29 @@ class WalletTab:
             messagebox.showerror("Lỗi", "Số lượng không hợp lệ")
             return
         
-        # Kiểm tra số dư
-        balance = self.wallet.get_balance()
-        if balance < amount:
-            messagebox.showerror("Lỗi", f"Số dư không đủ. Bạn chỉ có {balance} TuCoin")
+        # Kiểm tra số dư theo lần tải gần nhất (wallet.send kiểm tra lại)
+        if self.balance is not None and self.balance < amount:
+            messagebox.showerror("Lỗi", f"Số dư không đủ. Bạn chỉ có {self.balance} TuCoin")
             return
         
-        # Gửi coin
-        if self.wallet.send(receiver, amount):
+        # Gửi coin ở thread nền (wallet.send tính lại số dư), kết quả đưa về
+        # thread giao diện
+        def send():
+            sent = self.wallet.send(receiver, amount)
+            self.frame.after(0, lambda: self.on_coins_sent(sent, receiver, amount))
+        
+        threading.Thread(target=send, daemon=True).start()
+    
+    def on_coins_sent(self, sent, receiver, amount):
+        """
+        Hiển thị kết quả gửi coin (chạy trên thread giao diện).
+        
+        Args:
+            sent: True nếu giao dịch đã được thêm
+            receiver: Địa chỉ người nhận
+            amount: Số lượng coin gửi
+        """
+        if sent:
             messagebox.showinfo("Thành công", f"Đã gửi {amount} TuCoin đến {receiver}")
             
             # Xóa dữ liệu đã nhập
@@ -211,8 +264,8 @@ class WalletTab:
             # Cập nhật thông tin ví
             self.update_wallet_info()
             
-            # Lưu blockchain
-            self.blockchain.save_to_file()
+            # Lưu blockchain (ghi ở thread nền)
+            self.persistence.request_save()
             
             # Broadcast giao dịch (nếu có network)
             if hasattr(self, 'network') and self.network: